@@ -1,6 +1,54 @@
-from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+import os
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Query
+from fastapi.responses import PlainTextResponse, RedirectResponse
+from api.middleware import CompressionMiddleware, MetricsMiddleware, ResponseCacheMiddleware
 from api.routers import auth, books
+from core import metrics, profiler
+from core.cache import ResponseCache
+from core.catalog import get_catalog, save_artifact
+from core.database import DatabaseBusy, QueryTimeout, query_executor, writer
+from core.loggin_config import logging_config, shutdown_logging
+from core.recommend import load_neighbors
+from core.schema import migrate_books
+from core.serialization import JSONBytesResponse
+
+def warm_up():
+    """
+    Prepara o banco e constrói o snapshot do catálogo (com o JSON de cada
+    livro e o índice de busca), carregando-o do artefato binário quando
+    ele está em dia e gravando um novo quando não está. Com `preload_app`
+    o mestre do gunicorn chama esta função antes do fork e os workers
+    herdam tudo pronto; no lifespan de cada worker ela só confirma o que
+    já existe.
+    """
+    # 🗂️ Migrações pendentes do esquema (tabelas, índices e resumo das estatísticas)
+    with writer().transaction() as conn:
+        migrate_books(conn)
+    # 👤 Migrações de users.db antes da primeira requisição (não no event loop)
+    auth.users.ensure_table()
+    # 📚 Constrói o snapshot do catálogo uma única vez na subida
+    catalog = get_catalog().prepare()
+    # 💾 Artefato binário do catálogo: a próxima subida carrega em milissegundos
+    save_artifact(catalog)
+    # 🧭 Vizinhos pré-calculados de cada livro (/similar e /recommendations)
+    load_neighbors(catalog)
+    return catalog
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 📝 Logging assíncrono (fila + thread de escrita), uma vez por worker
+    logging_config()
+    warm_up()
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    # 🔐 Encerra o pool de processos do bcrypt
+    auth.hasher.shutdown()
+    # 🗃️ Encerra as threads do executor de consultas
+    query_executor.shutdown()
+    # 📝 Grava o que ficou na fila de logs
+    shutdown_logging()
 
 app = FastAPI(
     title="Tech Challenge - API Livros",
@@ -10,8 +58,34 @@ app = FastAPI(
         "🔹 **Passo 2**: Faça login em `/auth/login`\n"
         "🔹 **Passo 3**: Use o token para acessar endpoints protegidos."
     ),
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=JSONBytesResponse,
+    lifespan=lifespan
 )
+# ⏳ Pronto só depois do warm_up (ver /api/v1/ready)
+app.state.ready = False
+
+# 🗃️ Cache de respostas das rotas do catálogo (ETag / 304)
+response_cache = ResponseCache()
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
+
+# 🗜️ Compressão gzip/brotli (fora do cache: ele guarda o corpo original)
+app.add_middleware(CompressionMiddleware)
+
+# 📈 Métricas por rota (mais externo: mede também as respostas do cache)
+app.add_middleware(MetricsMiddleware, routes=app.routes)
+
+# 🚦 Executor de consultas sobrecarregado (fila cheia) ou consulta interrompida
+@app.exception_handler(DatabaseBusy)
+async def database_busy(request, exc):
+    return JSONBytesResponse(
+        {"detail": "Banco de dados sobrecarregado. Tente novamente em instantes."},
+        status_code=503, headers={"Retry-After": "1"}
+    )
+
+@app.exception_handler(QueryTimeout)
+async def query_timeout(request, exc):
+    return JSONBytesResponse({"detail": "A consulta excedeu o tempo limite."}, status_code=504)
 
 # 🚀 Redireciona a raiz para /docs
 @app.get("/", include_in_schema=False)
@@ -23,3 +97,73 @@ app.include_router(auth.router, prefix="/api/v1", tags=["01 - Autenticação"])
 
 # 2️⃣ Depois os livros
 app.include_router(books.router, prefix="/api/v1", tags=["02 - Livros"])
+
+# 3️⃣ Operação
+@app.get("/api/v1/health", tags=["03 - Operação"])
+def health():
+    """
+    Liveness: o processo está de pé e atendendo.
+    """
+    return {"status": "ok", "pid": os.getpid()}
+
+@app.get("/api/v1/ready", tags=["03 - Operação"])
+def ready():
+    """
+    Readiness: 200 só depois que o banco e o snapshot do catálogo estão
+    prontos neste worker; antes disso, 503.
+    """
+    if not app.state.ready:
+        return JSONBytesResponse({"status": "starting"}, status_code=503)
+    catalog = get_catalog()
+    return {"status": "ready", "catalog_version": catalog.version, "books": len(catalog)}
+
+@app.get("/api/v1/cache/stats", tags=["03 - Operação"])
+def cache_stats():
+    """
+    Acertos, falhas, expulsões e ocupação do cache de respostas.
+    """
+    return response_cache.stats()
+
+@app.get("/metrics", tags=["03 - Operação"], response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Métricas no formato texto do Prometheus (valores deste worker).
+    """
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/v1/debug/profile", tags=["03 - Operação"], response_class=PlainTextResponse)
+def sampled_profile(
+    reset: bool = Query(False, description="Zera as amostras depois de ler"),
+    current_user: dict = Depends(auth.get_current_user)
+):
+    """
+    Pilhas amostradas (formato folded, para flamegraph/speedscope) das
+    requisições sorteadas por PROFILE_SAMPLE_RATE.
+    """
+    folded = profiler.sampler.folded()
+    if reset:
+        profiler.sampler.reset()
+    return PlainTextResponse(folded)
+
+def _cache_events():
+    stats = response_cache.stats()
+    return [({"event": event}, stats[event]) for event in ("hits", "misses", "not_modified", "evictions", "expirations", "invalidations")]
+
+def _hasher_state():
+    stats = auth.hasher.stats()
+    return [({"state": "pending"}, stats["pending"]), ({"state": "rejected"}, stats["rejected"])]
+
+def _query_executor_state():
+    stats = query_executor.stats()
+    return [({"state": state}, stats[state]) for state in ("pending", "rejected", "timeouts")]
+
+metrics.registry.register_collector("response_cache_events_total", "counter", "Eventos do cache de respostas.", _cache_events)
+metrics.registry.register_collector(
+    "response_cache_bytes", "gauge", "Bytes ocupados pelo cache de respostas.",
+    lambda: [({}, response_cache.stats()["bytes"])]
+)
+metrics.registry.register_collector("password_hasher_operations", "gauge", "Operações de bcrypt pendentes e rejeitadas.", _hasher_state)
+metrics.registry.register_collector(
+    "db_query_executor_operations", "gauge", "Consultas pendentes, rejeitadas e interrompidas no executor.",
+    _query_executor_state
+)
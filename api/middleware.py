@@ -0,0 +1,341 @@
+import hashlib
+import os
+import time
+import zlib
+from starlette.routing import Match
+import core.database as database
+from core import metrics, profiler
+from core.cache import LRUCache, ResponseCache
+from core.catalog import get_catalog, read_data_version
+
+CACHE_MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", "60"))
+
+# Rotas públicas de leitura cujas respostas dependem só do catálogo
+CACHEABLE_PREFIXES = ("/api/v1/books", "/api/v1/categories", "/api/v1/stats")
+# Rotas que leem o banco direto (não o snapshot): a chave inclui também a
+# versão dos dados, incrementada a cada lote gravado durante um crawl
+LIVE_PATHS = ("/api/v1/books", "/api/v1/books/export")
+
+# Compressão das respostas (Content-Encoding negociado pelo Accept-Encoding)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+# Em ordem de preferência do servidor
+ENCODINGS = ("br", "gzip")
+
+# --- Dependência opcional ---
+# brotli é importado no primeiro uso; None depois da tentativa significa
+# "não instalado" (só gzip é oferecido).
+_NOT_LOADED = object()
+brotli = _NOT_LOADED
+
+
+def _load_brotli():
+    global brotli
+    if brotli is _NOT_LOADED:
+        try:
+            import brotli
+        except ImportError:
+            brotli = None
+    return brotli
+
+
+# ===============================
+# Cache de respostas (ETag / 304)
+# ===============================
+class ResponseCacheMiddleware:
+    """
+    Middleware ASGI que guarda as respostas GET das rotas do catálogo.
+
+    A chave é (versão do catálogo, caminho, query string). A ETag forte é
+    derivada dessa mesma chave, então um `If-None-Match` com a ETag atual é
+    respondido com 304 antes de chegar ao endpoint, sem nenhum acesso ao
+    banco nem serialização. Quando a ingestão muda a versão do catálogo,
+    todas as chaves mudam juntas. A ETag aqui é a do corpo sem compressão;
+    o CompressionMiddleware acrescenta a codificação (`"...-gzip"`) quando
+    comprime, e o `If-None-Match` aceita qualquer uma das formas.
+
+    As rotas de `live_paths` leem o banco, que muda a cada lote de um crawl
+    antes de o snapshot mudar de versão; para elas a chave inclui a versão
+    dos dados (catalog_meta.data_version), lida pelo executor de consultas.
+    """
+
+    def __init__(self, app, cache=None, prefixes=CACHEABLE_PREFIXES, max_age=CACHE_MAX_AGE, live_paths=LIVE_PATHS):
+        self.app = app
+        self.cache = cache or ResponseCache()
+        self.prefixes = prefixes
+        self.live_paths = live_paths
+        self.cache_control = f"public, max-age={max_age}".encode()
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in ("GET", "HEAD")
+            or not scope["path"].startswith(self.prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        version = get_catalog().version
+        self.cache.set_version(version)
+        key = (version, scope["path"], scope["query_string"])
+        if scope["path"] in self.live_paths:
+            try:
+                data_version = await database.query_executor.run(read_data_version)
+            except (database.DatabaseBusy, database.QueryTimeout):
+                # Sem como validar: a própria rota responde (e trata a sobrecarga)
+                await self.app(scope, receive, send)
+                return
+            key = (version, data_version, scope["path"], scope["query_string"])
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=12).hexdigest()
+        etag = f'"{version}-{digest}"'.encode()
+        validators = [(b"etag", etag), (b"cache-control", self.cache_control)]
+
+        matched = _matches(scope, etag)
+        if matched is not None:
+            self.cache.record_not_modified()
+            # Devolve a ETag na forma que o cliente tem (com ou sem codificação)
+            headers = [(b"etag", matched), (b"cache-control", self.cache_control)]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            await send({"type": "http.response.start", "status": entry.status, "headers": entry.headers})
+            await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else entry.body})
+            return
+
+        # Repassa a resposta enquanto guarda uma cópia (até o limite por entrada)
+        state = {"status": None, "headers": None, "chunks": [], "size": 0}
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                if message["status"] == 200:
+                    headers = [
+                        (name, value) for name, value in message.get("headers", [])
+                        if name.lower() not in (b"etag", b"cache-control")
+                    ] + validators
+                    message = {**message, "headers": headers}
+                state["headers"] = message.get("headers", [])
+            elif message["type"] == "http.response.body" and state["chunks"] is not None:
+                body = message.get("body", b"")
+                state["size"] += len(body)
+                if state["size"] > self.cache.entry_max_bytes:
+                    state["chunks"] = None
+                else:
+                    state["chunks"].append(body)
+                    if not message.get("more_body", False) and state["status"] == 200 and scope["method"] == "GET":
+                        self.cache.put(key, state["status"], state["headers"], b"".join(state["chunks"]))
+            await send(message)
+
+        await self.app(scope, receive, capture)
+
+
+def encoded_etag(etag, encoding):
+    """
+    '"v-abc"' -> '"v-abc-gzip"': cada codificação do corpo tem a sua ETag forte.
+    """
+    return etag[:-1] + b"-" + encoding.encode() + b'"'
+
+
+def _matches(scope, etag):
+    """
+    ETag do `If-None-Match` que corresponde a `etag` (comparação fraca:
+    aceita `W/` e as variantes com sufixo de codificação), ou None.
+    """
+    for name, value in scope["headers"]:
+        if name == b"if-none-match":
+            variants = {etag, *(encoded_etag(etag, encoding) for encoding in ENCODINGS)}
+            for candidate in value.split(b","):
+                candidate = candidate.strip()
+                if candidate == b"*":
+                    return etag
+                if candidate.removeprefix(b"W/") in variants:
+                    return candidate
+    return None
+
+
+# ===============================
+# Compressão de respostas
+# ===============================
+def negotiate_encoding(accept_encoding, available):
+    """
+    Codificação preferida pelo cliente dentre `available` (em ordem de
+    preferência do servidor), respeitando os pesos `q`; None se nenhuma.
+    """
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Compressor:
+    def __init__(self, encoding, level):
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=level)
+            self._flush = self._obj.flush
+            self._finish = self._obj.finish
+            self._compress = self._obj.process
+        else:
+            # wbits 16+: cabeçalho e rodapé do formato gzip
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._flush = lambda: self._obj.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._obj.flush
+            self._compress = self._obj.compress
+
+    def chunk(self, data, last):
+        out = self._compress(data)
+        return out + (self._finish() if last else self._flush())
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime as respostas com brotli (se instalado) ou
+    gzip, conforme o `Accept-Encoding` do cliente.
+
+    Respostas de um único corpo abaixo de `min_size` bytes saem como estão
+    (o cabeçalho e a CPU não compensam). Respostas em fluxo são comprimidas
+    bloco a bloco, sem Content-Length. Respostas que já têm
+    Content-Encoding (ex.: `/books/export?compression=gzip`) passam
+    intactas. Uma ETag forte recebe o sufixo da codificação, para que o
+    corpo comprimido e o original não compartilhem o mesmo validador.
+    """
+
+    def __init__(self, app, min_size=COMPRESSION_MIN_SIZE, gzip_level=GZIP_LEVEL, brotli_quality=BROTLI_QUALITY):
+        self.app = app
+        self.min_size = min_size
+        self.levels = {"br": brotli_quality, "gzip": gzip_level}
+
+    def available(self):
+        return ENCODINGS if _load_brotli() is not None else ("gzip",)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept = next((value for name, value in scope["headers"] if name == b"accept-encoding"), b"")
+        encoding = negotiate_encoding(accept.decode("latin-1"), self.available()) if accept else None
+        state = {"start": None, "compressor": None, "passthrough": False}
+
+        async def compress(message):
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                if message["status"] in (204, 304) or any(name.lower() == b"content-encoding" for name, _ in headers):
+                    state["passthrough"] = True
+                    await send(message)
+                else:
+                    # Só decide ao ver o primeiro bloco do corpo
+                    state["start"] = message
+                return
+            if message["type"] != "http.response.body" or state["passthrough"]:
+                await send(message)
+                return
+
+            body, more = message.get("body", b""), message.get("more_body", False)
+            start = state.pop("start", None)
+            if start is not None:
+                headers = [(name, value) for name, value in start.get("headers", []) if name.lower() != b"vary"]
+                vary = [value for name, value in start.get("headers", []) if name.lower() == b"vary"]
+                headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+                if encoding is None or (not more and len(body) < self.min_size):
+                    state["passthrough"] = True
+                    await send({**start, "headers": headers})
+                    await send(message)
+                    return
+                state["compressor"] = _Compressor(encoding, self.levels[encoding])
+                headers = [
+                    (name, encoded_etag(value, encoding) if name.lower() == b"etag" and value.startswith(b'"') else value)
+                    for name, value in headers if name.lower() != b"content-length"
+                ]
+                headers.append((b"content-encoding", encoding.encode()))
+                if not more:
+                    body = state["compressor"].chunk(body, last=True)
+                    headers.append((b"content-length", str(len(body)).encode()))
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": state["compressor"].chunk(body, not more), "more_body": more})
+
+        await self.app(scope, receive, compress)
+
+
+# ===============================
+# Métricas por rota e profiler amostral
+# ===============================
+class MetricsMiddleware:
+    """
+    Registra, para cada requisição, latência, tamanho da resposta e os
+    tempos de banco e serialização acumulados pela requisição (ver
+    core/metrics.py), rotulados pelo template da rota. Uma fração das
+    requisições (PROFILE_SAMPLE_RATE) liga o amostrador de pilhas enquanto
+    está em andamento.
+    """
+
+    def __init__(self, app, registry=None, sampler=None, routes=()):
+        self.app = app
+        self.registry = registry or metrics.registry
+        self.sampler = sampler or profiler.sampler
+        self.routes = routes
+        # Caminho concreto -> template, aprendido das requisições roteadas
+        self._templates = LRUCache(max_entries=10000, ttl=float("inf"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        phases = metrics.start_request()
+        sampled = self.sampler.should_sample()
+        if sampled:
+            self.sampler.begin()
+        state = {"status": 500, "size": 0}
+
+        async def observe(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["size"] += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, observe)
+        finally:
+            if sampled:
+                self.sampler.end()
+            self.registry.observe_request(
+                scope["method"], self._route(scope), state["status"],
+                time.perf_counter() - start, state["size"], phases
+            )
+
+    def _route(self, scope):
+        key = (scope["method"], scope["path"])
+        route = scope.get("route")
+        if route is not None and hasattr(route, "path"):
+            self._templates.put(key, route.path)
+            return route.path
+        # Respostas que não chegaram ao roteador (cache, 304)
+        template = self._templates.get(key)
+        if template is not None:
+            return template
+        for route in self.routes:
+            if hasattr(route, "path") and route.matches(scope)[0] == Match.FULL:
+                return route.path
+        return "unmatched"
@@ -1,31 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Body
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from passlib.context import CryptContext
 from jose import JWTError, jwt
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+import os
+import time
+from core import passwords
+from core.cache import LRUCache
+from core.passwords import HasherBusy, PasswordHasher
+from core.ratelimit import ConcurrencyLimit, TokenBucket
+from core.users import UserRepository
 
 # Configurações do JWT
 SECRET_KEY = "chave_secreta_super_segura"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Cache de tokens já verificados (validade curta e nunca além do `exp`)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "60"))
+
+# Limites do caminho de senha (bcrypt): taxa por worker e concorrência por IP
+LOGIN_RATE = float(os.getenv("LOGIN_RATE", "20"))
+LOGIN_BURST = float(os.getenv("LOGIN_BURST", "40"))
+LOGIN_IP_CONCURRENCY = int(os.getenv("LOGIN_IP_CONCURRENCY", "4"))
+
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt roda em um pool de processos dedicado (core/passwords.py)
+hasher = PasswordHasher()
+login_bucket = TokenBucket(LOGIN_RATE, LOGIN_BURST)
+login_ip_limit = ConcurrencyLimit(LOGIN_IP_CONCURRENCY)
 
-# Banco de usuários fake (apenas para testes)
-fake_users_db = {}
+# Usuários persistidos em data/users.db (compartilhados entre workers)
+users = UserRepository()
+verified_tokens = LRUCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
 
 # --------------------------
 # Funções utilitárias
 # --------------------------
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return passwords.verify_password(plain_password, hashed_password)[0]
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return passwords.hash_password(password)
+
+@asynccontextmanager
+async def password_work(request: Request):
+    """
+    Reserva capacidade para uma operação de bcrypt: 429 se a taxa de logins
+    ou a concorrência do IP estourou, 503 se a fila do pool está cheia.
+    """
+    if not login_bucket.try_acquire():
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas de login. Tente novamente em instantes.",
+            headers={"Retry-After": "1"},
+        )
+    client_ip = request.client.host if request.client else "desconhecido"
+    if not login_ip_limit.try_acquire(client_ip):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas requisições simultâneas deste endereço.",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        yield
+    except HasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Serviço de autenticação sobrecarregado. Tente novamente em instantes.",
+            headers={"Retry-After": "1"},
+        )
+    finally:
+        login_ip_limit.release(client_ip)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -39,6 +89,9 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         detail="Credenciais inválidas.",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    user = verified_tokens.get(token)
+    if user is not None:
+        return user
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -46,9 +99,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = fake_users_db.get(username)
+    user = await users.get_async(username)
     if user is None:
         raise credentials_exception
+    # `exp` é horário absoluto; o cache usa tempo monotônico
+    expires = time.monotonic() + (payload["exp"] - time.time()) if "exp" in payload else None
+    verified_tokens.put(token, user, expires=expires)
     return user
 
 # --------------------------
@@ -64,14 +120,17 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         400: {"description": "Usuário já existe."}
     }
 )
-def register_user(
+async def register_user(
+    request: Request,
     username: str = Body(..., example="meu_usuario"),
     password: str = Body(..., example="minha_senha123")
 ):
-    if username in fake_users_db:
+    if await users.get_async(username) is not None:
+        raise HTTPException(status_code=400, detail="Usuário já existe.")
+    async with password_work(request):
+        hashed_password = await hasher.hash(password)
+    if not await users.create_async(username, hashed_password):
         raise HTTPException(status_code=400, detail="Usuário já existe.")
-    hashed_password = get_password_hash(password)
-    fake_users_db[username] = {"username": username, "hashed_password": hashed_password}
     return {"msg": "Usuário registrado com sucesso."}
 
 @router.post(
@@ -81,13 +140,22 @@ def register_user(
     description="Realiza login e retorna um token de acesso JWT.",
     responses={
         200: {"description": "Login realizado com sucesso. Retorna token JWT."},
-        400: {"description": "Usuário ou senha inválidos."}
+        400: {"description": "Usuário ou senha inválidos."},
+        429: {"description": "Limite de tentativas de login atingido."},
+        503: {"description": "Fila de verificação de senhas cheia."}
     }
 )
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = fake_users_db.get(form_data.username)
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    user = await users.get_async(form_data.username)
+    valid, new_hash = False, None
+    if user:
+        async with password_work(request):
+            valid, new_hash = await hasher.verify(form_data.password, user["hashed_password"])
+    if not valid:
         raise HTTPException(status_code=400, detail="Usuário ou senha inválidos.")
+    # O custo do bcrypt mudou desde o cadastro: grava o hash refeito
+    if new_hash:
+        await users.update_password_async(form_data.username, new_hash)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": form_data.username}, expires_delta=access_token_expires
@@ -1,128 +1,416 @@
-from fastapi import APIRouter, Query, Depends, HTTPException
-from typing import Optional
-import pandas as pd
-import sqlite3
+from fastapi import APIRouter, Body, Query, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, model_validator
+from typing import Annotated, List, Literal, Optional, Union
 from api.routers.auth import get_current_user
+from core.catalog import COLUMNS, get_catalog, refresh_catalog
+from core.database import query_executor
+from core.export import COMPRESSIONS, FORMATS, ExportUnavailable, check_available, export_books
+from core.jobs import JobManager
+from core.query import BookQuery, InvalidCursor, SORTS, DEFAULT_LIMIT, MAX_LIMIT
+from core.recommend import NEIGHBORS_K, get_neighbors, load_neighbors
+from core.serialization import JSONBytesResponse, encode_rows, join_encoded
 
 router = APIRouter()
 
-# ===============================
-# Função de conexão com o banco
-# ===============================
-def get_db_connection():
-    conn = sqlite3.connect("data/books.db")
-    conn.row_factory = sqlite3.Row
-    return conn
+# Consultas por requisição em /books/multi
+MAX_MULTI_QUERIES = 50
+
+
+def _parse_ids(values):
+    """
+    Ids repetidos (`ids=1&ids=2`) ou separados por vírgula (`ids=1,2`).
+    """
+    try:
+        ids = [int(part) for value in values for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids deve conter apenas números inteiros")
+    if len(ids) > MAX_LIMIT:
+        raise HTTPException(status_code=422, detail=f"Informe no máximo {MAX_LIMIT} ids")
+    return ids
+
+def _parse_fields(value):
+    """
+    Projeção `fields=id,title,price`: colunas na ordem pedida, sem
+    repetições; None devolve todas.
+    """
+    if value is None:
+        return None
+    fields = tuple(dict.fromkeys(part.strip() for part in value.split(",") if part.strip()))
+    unknown = [field for field in fields if field not in COLUMNS]
+    if not fields or unknown:
+        raise HTTPException(
+            status_code=422, detail=f"fields aceita apenas: {', '.join(COLUMNS)}"
+        )
+    return fields
+
+FIELDS_DESCRIPTION = "Colunas a devolver, separadas por vírgula (fields=id,title,price)"
 
 # ===============================
 # Endpoints Core
 # ===============================
 
 # 🔹 Endpoints com caminho fixo primeiro para evitar conflito
+# Todos os endpoints de leitura respondem a partir do snapshot em memória
+# (core/catalog.py), sem abrir conexão com o banco por requisição, e
+# devolvem o JSON já codificado de cada livro (JSONBytesResponse).
 @router.get("/books/search", tags=["02 - Livros"])
 def search_books(
     title: Optional[str] = Query(None, description="Título do livro"),
-    category: Optional[str] = Query(None, description="Categoria do livro")
+    category: Optional[str] = Query(None, description="Categoria do livro"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT, description="Número máximo de livros a retornar"),
+    offset: int = Query(0, ge=0, description="Quantidade de livros a pular"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
+    """
+    Busca por trecho do título e/ou da categoria, sem diferenciar maiúsculas
+    nem acentos. Com título, os resultados vêm ordenados por relevância.
+    """
     if title is None and category is None:
         raise HTTPException(status_code=422, detail="Informe ao menos um parâmetro de busca (title ou category)")
 
-    conn = get_db_connection()
-    df = pd.read_sql_query("SELECT * FROM books", conn)
-    conn.close()
-
-    if title:
-        df = df[df["title"].str.contains(title, case=False, na=False)]
-    if category:
-        df = df[df["category"].str.contains(category, case=False, na=False)]
-
-    return df.to_dict(orient="records")
+    catalog = get_catalog()
+    return JSONBytesResponse(catalog.encode(
+        catalog.search(title=title, category=category, limit=limit, offset=offset),
+        _parse_fields(fields)
+    ))
 
 @router.get("/books/top-rated", tags=["02 - Livros"])
 def top_rated_books(
     limit: int = Query(..., ge=1, description="Número de livros a retornar")
 ):
-    conn = get_db_connection()
-    df = pd.read_sql_query(
-        "SELECT * FROM books ORDER BY rating DESC, price DESC LIMIT ?",
-        conn,
-        params=(limit,)
-    )
-    conn.close()
-    return df.to_dict(orient="records")
+    catalog = get_catalog()
+    return JSONBytesResponse(catalog.encode(catalog.top_rated(limit)))
 
 @router.get("/books/price-range",tags=["02 - Livros"])
 def books_by_price_range(
     min: float = Query(..., description="Preço mínimo"),
-    max: float = Query(..., description="Preço máximo")
+    max: float = Query(..., description="Preço máximo"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT, description="Número máximo de livros a retornar"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
-    conn = get_db_connection()
-    df = pd.read_sql_query(
-        "SELECT * FROM books WHERE price >= ? AND price <= ?",
-        conn,
-        params=(min, max)
-    )
-    conn.close()
-    return df.to_dict(orient="records")
+    catalog = get_catalog()
+    return JSONBytesResponse(catalog.encode(catalog.price_range(min, max, limit=limit), _parse_fields(fields)))
 
 @router.get("/books", tags=["02 - Livros"])
-def list_books():
-    conn = get_db_connection()
-    df = pd.read_sql_query("SELECT * FROM books", conn)
-    conn.close()
-    return df.to_dict(orient="records")
+async def list_books(
+    request: Request,
+    category: Optional[str] = Query(None, description="Categoria exata"),
+    min_price: Optional[float] = Query(None, description="Preço mínimo"),
+    max_price: Optional[float] = Query(None, description="Preço máximo"),
+    min_rating: Optional[int] = Query(None, ge=0, le=5, description="Avaliação mínima"),
+    max_rating: Optional[int] = Query(None, ge=0, le=5, description="Avaliação máxima"),
+    in_stock: Optional[bool] = Query(None, description="Apenas livros em estoque (true) ou fora de estoque (false)"),
+    sort: Literal[tuple(SORTS)] = Query("id", description="Ordenação; prefixo '-' para decrescente"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT, description="Tamanho da página"),
+    cursor: Optional[str] = Query(None, description="Cursor devolvido pela página anterior"),
+    ids: Optional[List[str]] = Query(None, description="Busca em lote: ids separados por vírgula (ids=1,2,3)"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    """
+    Lista livros com filtros combináveis, ordenação e paginação por cursor,
+    executados direto no banco com SQL parametrizado e índices compostos.
+    O cursor da próxima página vem nos cabeçalhos `X-Next-Cursor` e `Link`;
+    sem eles, a página é a última. A consulta roda no executor de consultas
+    (core/database.py): 503 com a fila cheia, 504 no tempo limite.
+
+    Com `ids`, devolve esses livros na ordem pedida (ids inexistentes são
+    ignorados), direto do índice por id do snapshot; não combina com
+    filtros nem cursor. `fields` limita as colunas lidas e devolvidas.
+    """
+    fields = _parse_fields(fields)
+    if ids is not None:
+        if cursor is not None or any(
+            value is not None for value in (category, min_price, max_price, min_rating, max_rating, in_stock)
+        ):
+            raise HTTPException(status_code=400, detail="ids não pode ser combinado com filtros ou cursor")
+        catalog = get_catalog()
+        return JSONBytesResponse(catalog.encode(catalog.get_many(_parse_ids(ids)), fields))
+
+    try:
+        query = BookQuery(
+            category=category,
+            min_price=min_price,
+            max_price=max_price,
+            min_rating=min_rating,
+            max_rating=max_rating,
+            in_stock=in_stock,
+            sort=sort,
+            limit=limit,
+            cursor=cursor,
+            fields=fields
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rows, next_cursor = await query_executor.run(query.execute)
+
+    headers = {}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return JSONBytesResponse(encode_rows(query.fields, rows), headers=headers)
+
+@router.get("/books/export", tags=["02 - Livros"])
+def export_books_endpoint(
+    format: Literal[tuple(FORMATS)] = Query("ndjson", description="ndjson, csv, arrow (IPC stream) ou parquet"),
+    compression: Literal[COMPRESSIONS] = Query("none", description="Compressão do fluxo (Content-Encoding)"),
+    category: Optional[str] = Query(None, description="Categoria exata"),
+    min_price: Optional[float] = Query(None, description="Preço mínimo"),
+    max_price: Optional[float] = Query(None, description="Preço máximo"),
+    min_rating: Optional[int] = Query(None, ge=0, le=5, description="Avaliação mínima"),
+    max_rating: Optional[int] = Query(None, ge=0, le=5, description="Avaliação máxima"),
+    in_stock: Optional[bool] = Query(None, description="Apenas livros em estoque (true) ou fora de estoque (false)")
+):
+    """
+    Exporta o catálogo (ou o resultado dos filtros) em fluxo, lendo o banco
+    em blocos: a memória do servidor não cresce com o tamanho do catálogo.
+    `arrow`/`parquet` dependem do pyarrow e `zstd` do zstandard (opcionais).
+    """
+    try:
+        check_available(format, compression)
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    query = BookQuery(
+        category=category,
+        min_price=min_price,
+        max_price=max_price,
+        min_rating=min_rating,
+        max_rating=max_rating,
+        in_stock=in_stock,
+        limit=None
+    )
+    media_type, extension = FORMATS[format]
+    headers = {"Content-Disposition": f'attachment; filename="books.{extension}"'}
+    if compression != "none":
+        headers["Content-Encoding"] = compression
+    return StreamingResponse(export_books(query, format, compression), media_type=media_type, headers=headers)
+
+# ===============================
+# Endpoints em lote
+# ===============================
+# Uma única ida e volta no lugar de N chamadas a /books/{book_id}: tudo é
+# resolvido nos índices em memória do snapshot (id, busca, ranking, preço).
+@router.post("/books/batch", tags=["02 - Livros"])
+def get_books_batch(
+    ids: List[int] = Body(..., embed=True, max_length=MAX_LIMIT, examples=[[1, 2, 3]])
+):
+    """
+    Livros dos `ids` informados, na ordem pedida; ids inexistentes são ignorados.
+    """
+    catalog = get_catalog()
+    return JSONBytesResponse(catalog.encode(catalog.get_many(ids)))
+
+class SearchQuery(BaseModel):
+    type: Literal["search"]
+    title: Optional[str] = None
+    category: Optional[str] = None
+    limit: int = Field(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT)
+    offset: int = Field(0, ge=0)
+
+    @model_validator(mode="after")
+    def _has_term(self):
+        if self.title is None and self.category is None:
+            raise ValueError("Informe ao menos um parâmetro de busca (title ou category)")
+        return self
+
+class TopRatedQuery(BaseModel):
+    type: Literal["top_rated"]
+    limit: int = Field(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT)
+
+class PriceRangeQuery(BaseModel):
+    type: Literal["price_range"]
+    min: float
+    max: float
+    limit: int = Field(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT)
+
+class IdsQuery(BaseModel):
+    type: Literal["ids"]
+    ids: List[int] = Field(..., max_length=MAX_LIMIT)
+
+MultiQuery = Annotated[Union[SearchQuery, TopRatedQuery, PriceRangeQuery, IdsQuery], Field(discriminator="type")]
+
+def _run_query(catalog, query):
+    if query.type == "search":
+        return catalog.search(title=query.title, category=query.category, limit=query.limit, offset=query.offset)
+    if query.type == "top_rated":
+        return catalog.top_rated(query.limit)
+    if query.type == "price_range":
+        return catalog.price_range(query.min, query.max, limit=query.limit)
+    return catalog.get_many(query.ids)
+
+@router.post("/books/multi", tags=["02 - Livros"])
+def multi_query(
+    queries: List[MultiQuery] = Body(
+        ..., embed=True, max_length=MAX_MULTI_QUERIES,
+        examples=[[
+            {"type": "search", "title": "light", "limit": 5},
+            {"type": "top_rated", "limit": 3},
+            {"type": "price_range", "min": 10, "max": 20, "limit": 5},
+            {"type": "ids", "ids": [1, 2]},
+        ]]
+    )
+):
+    """
+    Várias consultas (`search`, `top_rated`, `price_range`, `ids`) em uma
+    única requisição, todas sobre o mesmo snapshot. A resposta é um array
+    com o resultado de cada consulta, na ordem enviada.
+    """
+    catalog = get_catalog()
+    return JSONBytesResponse(join_encoded([catalog.encode(_run_query(catalog, query)) for query in queries]))
 
 @router.get("/books/{book_id}", tags=["02 - Livros"])
 def get_book_by_id(book_id: int):
-    conn = get_db_connection()
-    df = pd.read_sql_query("SELECT * FROM books WHERE id = ?", conn, params=(book_id,))
-    conn.close()
-    if df.empty:
+    catalog = get_catalog()
+    book = catalog.get(book_id)
+    if book is None:
+        raise HTTPException(status_code=404, detail="Livro não encontrado")
+    return JSONBytesResponse(catalog.encoded[book_id])
+
+def _neighbors(catalog):
+    """
+    Índice de vizinhos do snapshot da requisição; enquanto o índice da nova
+    versão do catálogo é calculado em segundo plano, 503.
+    """
+    index = get_neighbors(catalog)
+    if index is None:
+        raise HTTPException(
+            status_code=503, detail="Índice de recomendações em atualização", headers={"Retry-After": "5"}
+        )
+    return index
+
+@router.get("/books/{book_id}/similar", tags=["02 - Livros"])
+def similar_books(
+    book_id: int,
+    limit: int = Query(10, ge=1, le=NEIGHBORS_K, description="Número de livros a retornar")
+):
+    """
+    Livros mais parecidos com `book_id` (categoria, preço, avaliação, estoque
+    e palavras do título), em ordem decrescente de similaridade. Os vizinhos
+    são pré-calculados; a consulta só lê a lista do livro.
+    """
+    catalog = get_catalog()
+    ids = _neighbors(catalog).similar(book_id, limit)
+    if ids is None:
         raise HTTPException(status_code=404, detail="Livro não encontrado")
-    return df.to_dict(orient="records")[0]
+    return JSONBytesResponse(catalog.encode(catalog.get_many(ids)))
+
+@router.get("/recommendations", tags=["02 - Livros"])
+def recommendations(
+    ids: Optional[List[str]] = Query(None, description="Livros de referência, separados por vírgula (ids=1,2)"),
+    limit: int = Query(10, ge=1, le=NEIGHBORS_K, description="Número de livros a retornar")
+):
+    """
+    Recomendações para quem gostou dos livros `ids`: os vizinhos de todos
+    eles, somando a similaridade de quem aparece em mais de uma lista. Sem
+    `ids`, devolve os mais bem avaliados.
+    """
+    catalog = get_catalog()
+    ids = _parse_ids(ids or [])
+    if not ids:
+        return JSONBytesResponse(catalog.encode(catalog.top_rated(limit)))
+    if all(catalog.get(book_id) is None for book_id in ids):
+        raise HTTPException(status_code=404, detail="Nenhum dos livros informados foi encontrado")
+    recommended = _neighbors(catalog).recommend(ids, limit)
+    return JSONBytesResponse(catalog.encode(catalog.get_many(recommended)))
 
 @router.get("/categories", tags=["02 - Livros"])
 def list_categories():
-    conn = get_db_connection()
-    df = pd.read_sql_query("SELECT DISTINCT category FROM books", conn)
-    conn.close()
-    return sorted(df["category"].dropna().tolist())
+    return get_catalog().category_names
 
 # ===============================
 # Endpoints de Estatísticas
 # ===============================
 @router.get("/stats/overview", tags=["02 - Livros"])
 def stats_overview():
-    conn = get_db_connection()
-    df = pd.read_sql_query("SELECT * FROM books", conn)
-    conn.close()
-    return {
-        "total_books": len(df),
-        "avg_price": round(df["price"].mean(), 2) if not df.empty else 0,
-        "rating_distribution": df["rating"].value_counts().to_dict()
-    }
+    return get_catalog().overview()
 
 @router.get("/stats/categories", tags=["02 - Livros"])
 def stats_by_category():
-    conn = get_db_connection()
-    df = pd.read_sql_query(
-        "SELECT category, COUNT(*) as count, ROUND(AVG(price),2) as avg_price FROM books GROUP BY category",
-        conn
-    )
-    conn.close()
-    return df.to_dict(orient="records")
+    return get_catalog().category_stats()
+
+def _stats_scope(category):
+    stats = get_catalog().stats
+    if category is not None and not stats.has_scope(category):
+        raise HTTPException(status_code=404, detail="Categoria não encontrada")
+    return stats
+
+@router.get("/stats/price-percentiles", tags=["02 - Livros"])
+def stats_price_percentiles(
+    category: Optional[str] = Query(None, description="Restringe a uma categoria")
+):
+    """
+    Percentis de preço (p10 a p99), mínimo e máximo do catálogo ou de uma categoria.
+    """
+    return _stats_scope(category).price_percentiles(category)
+
+@router.get("/stats/histogram", tags=["02 - Livros"])
+def stats_histogram(
+    field: Literal["price", "rating"] = Query("price", description="Campo do histograma"),
+    bucket_width: int = Query(5, ge=1, le=100, description="Largura das faixas de preço, em £"),
+    category: Optional[str] = Query(None, description="Restringe a uma categoria")
+):
+    """
+    Histograma de preços (faixas de `bucket_width` £) ou de avaliações.
+    """
+    stats = _stats_scope(category)
+    if field == "rating":
+        return stats.rating_histogram(category)
+    return stats.price_histogram(category, width=bucket_width)
 
 # ===============================
-# Endpoint Protegido — Trigger Scraping
+# Endpoints Protegidos — Scraping em segundo plano
 # ===============================
+# Execução única (inclusive entre workers): um novo disparo enquanto há um
+# scraping ativo devolve o job em andamento. O estado fica na tabela 'jobs',
+# então qualquer worker consulta ou cancela o job.
+scraping_jobs = JobManager("scraping")
+
+def _run_scraping_job(job, incremental):
+    from scripts import scrape_books
+    scrape_books.run_scraping(
+        incremental=incremental,
+        metrics=job.progress,
+        cancel_event=job.cancel_event
+    )
+    # O scraper já gravou o índice de vizinhos: só carrega e instala
+    load_neighbors(refresh_catalog())
+
 @router.post("/scraping/trigger", tags=["02 - Livros"])
-def trigger_scraping(current_user: dict = Depends(get_current_user)):
+def trigger_scraping(
+    incremental: bool = Query(False, description="Processa apenas as páginas alteradas desde a última raspagem"),
+    current_user: dict = Depends(get_current_user)
+):
     """
     Endpoint protegido para disparar scraping manualmente.
+    Retorna imediatamente o id do job; acompanhe em `/scraping/jobs/{job_id}`.
     """
-    try:
-        from scripts import scrape_books
-        scrape_books.run_scraping()
-        return {"message": "Scraping executado com sucesso."}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    from scripts.pipeline import PipelineMetrics
+    job, created = scraping_jobs.submit(
+        lambda job: _run_scraping_job(job, incremental),
+        progress=PipelineMetrics()
+    )
+    message = "Scraping iniciado." if created else "Já existe um scraping em andamento."
+    return {"message": message, **job.as_dict()}
+
+@router.get("/scraping/jobs/{job_id}", tags=["02 - Livros"])
+def get_scraping_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """
+    Estado e progresso (páginas, livros, erros, vazão) de um job de scraping.
+    """
+    job = scraping_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job.as_dict()
+
+@router.delete("/scraping/jobs/{job_id}", tags=["02 - Livros"])
+def cancel_scraping_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """
+    Solicita o cancelamento de um job de scraping. Os lotes já gravados são mantidos.
+    """
+    job = scraping_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job.as_dict()
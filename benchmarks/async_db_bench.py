@@ -0,0 +1,139 @@
+"""
+`GET /books` com 500 clientes concorrentes: consultas SQL no threadpool do
+Starlette (handler síncrono, comportamento anterior) contra o executor de
+consultas dedicado de core/database.py (handler assíncrono).
+
+- threadpool: cada consulta ocupa uma das 40 threads do AnyIO, as mesmas
+  que atendem as rotas síncronas em memória
+- executor: threads próprias (DB_QUERY_WORKERS) e fila limitada
+  (DB_QUERY_QUEUE_SIZE); o excedente recebe 503 na hora
+
+Junto com os clientes de /books, alguns clientes de sondagem chamam
+`/books/price-range` (síncrona, em memória) para mostrar quanto as rotas
+que não usam o banco esperam atrás das consultas. Uma fração das
+requisições pede páginas de 1000 livros (consultas lentas).
+
+Roda em processo, com httpx + ASGITransport, sobre um catálogo sintético.
+
+Uso:
+    python -m benchmarks.async_db_bench --clients 500 --duration 5 --books 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+
+class ThreadpoolQueries:
+    """
+    Mesmo contrato do QueryExecutor, mas rodando a consulta no threadpool
+    do servidor, como fazia o handler síncrono de /books.
+    """
+
+    async def run(self, fn, *args, path=None, timeout=None):
+        from anyio import to_thread
+        from core.database import read_connection
+
+        def call():
+            with read_connection(path) as conn:
+                return fn(conn, *args)
+
+        return await to_thread.run_sync(call)
+
+
+def percentiles(samples):
+    if not samples:
+        return 0.0, 0.0, 0.0
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+    return pick(0.50), pick(0.99), statistics.mean(samples) * 1000
+
+
+async def scenario(app, clients, probes, duration, heavy):
+    import httpx
+    transport = httpx.ASGITransport(app=app)
+    limits = httpx.Limits(max_connections=None)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits) as client:
+        latencies, probe_latencies, statuses = [], [], []
+        stop = time.perf_counter() + duration
+
+        async def reader():
+            while time.perf_counter() < stop:
+                # Query string variada para não cair no cache de respostas
+                params = {"min_price": round(random.uniform(10, 50), 4), "sort": "-price"}
+                params["limit"] = 1000 if random.random() < heavy else 20
+                start = time.perf_counter()
+                r = await client.get("/api/v1/books", params=params)
+                statuses.append(r.status_code)
+                if r.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    await asyncio.sleep(0.01)  # 503: o cliente recua um pouco
+
+        async def probe():
+            while time.perf_counter() < stop:
+                low = round(random.uniform(10, 50), 4)
+                start = time.perf_counter()
+                await client.get("/api/v1/books/price-range", params={"min": low, "max": low + 1, "limit": 10})
+                probe_latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(reader() for _ in range(clients)), *(probe() for _ in range(probes)))
+        return latencies, probe_latencies, statuses, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--probes", type=int, default=4, help="clientes de rotas em memória")
+    parser.add_argument("--duration", type=float, default=5.0, help="segundos por cenário")
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--heavy", type=float, default=0.1, help="fração de páginas de 1000 livros")
+    parser.add_argument("--queue-size", type=int, nargs="+", default=[8, 128], help="filas do executor a medir")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="async_db_")
+    os.environ["BOOKS_DB_PATH"] = os.path.join(tmp, "books.db")
+    os.environ["USERS_DB_PATH"] = os.path.join(tmp, "users.db")
+    os.environ["LOG_FILE"] = ""
+
+    from benchmarks.synthetic import build_database
+    build_database(os.environ["BOOKS_DB_PATH"], args.books)
+
+    from api.main import app
+    from api.routers import books
+    from core.catalog import get_catalog
+    from core.database import QueryExecutor
+    get_catalog()
+
+    print(f"{args.books} livros, {args.clients} clientes de /books + {args.probes} de sondagem, {args.duration:.0f} s")
+    print(
+        f"{'cenário':>18} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'média ms':>9} "
+        f"{'503':>6} {'sonda p99':>10}"
+    )
+    try:
+        modes = [("threadpool", ThreadpoolQueries())]
+        modes += [(f"executor fila {size}", QueryExecutor(queue_size=size)) for size in args.queue_size]
+        for label, executor in modes:
+            books.query_executor = executor
+            latencies, probe_latencies, statuses, elapsed = asyncio.run(
+                scenario(app, args.clients, args.probes, args.duration, args.heavy)
+            )
+            p50, p99, mean = percentiles(latencies)
+            probe_p99 = percentiles(probe_latencies)[1]
+            print(
+                f"{label:>18} {len(latencies) / elapsed:>8.0f} {p50:>9.1f} {p99:>9.1f} {mean:>9.1f} "
+                f"{statuses.count(503):>6} {probe_p99:>10.1f}"
+            )
+            if hasattr(executor, "shutdown"):
+                executor.shutdown()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
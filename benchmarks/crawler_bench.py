@@ -0,0 +1,98 @@
+"""
+Mede a vazão do scraper contra o site local de benchmarks/fixture_site.py.
+
+Compara o fluxo sequencial original (um `requests.get` por página, sem
+Session e com `time.sleep(0.1)`) com o Crawler concorrente em diferentes
+níveis de concorrência e, por fim, uma re-raspagem incremental
+(requisições condicionais sobre o estado da primeira passada).
+
+Uso:
+    python -m benchmarks.crawler_bench --latency 0.02 --workers 1 4 8 16
+"""
+import argparse
+import logging
+import time
+import requests
+from bs4 import BeautifulSoup
+from benchmarks.fixture_site import start_fixture_server
+from scripts import scrape_books
+from scripts.scrape_books import CrawlState
+from scripts.crawler import Crawler
+
+
+class CountingCrawler(Crawler):
+    pages = 0
+
+    def fetch(self, url, headers=None):
+        response = super().fetch(url, headers)
+        self.pages += 1
+        return response
+
+
+def legacy_crawl(base_url):
+    """
+    Reproduz o laço sequencial anterior ao Crawler.
+    """
+    pages, books = 0, 0
+    home = BeautifulSoup(requests.get(base_url, timeout=10).content, "html.parser")
+    links = home.find("div", class_="side_categories").find("ul", class_="nav").find("ul").find_all("a")
+    for link in links:
+        url = requests.compat.urljoin(base_url, link["href"])
+        while url:
+            soup = BeautifulSoup(requests.get(url, timeout=10).content, "html.parser")
+            pages += 1
+            books += len(soup.find_all("article", class_="product_pod"))
+            next_button = soup.find("li", class_="next")
+            url = requests.compat.urljoin(url, next_button.find("a")["href"]) if next_button else None
+            time.sleep(0.1)
+    return pages, books
+
+
+def report(label, elapsed, pages, books):
+    print(f"{label:>24} {elapsed:>8.2f} s {pages / elapsed:>10.1f} pág/s {books / elapsed:>10.1f} livros/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.02, help="atraso artificial do servidor (s)")
+    parser.add_argument("--copies", type=int, default=1)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--rate", type=float, default=0, help="limite de req/s do Crawler (0 = sem limite)")
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    server, base_url = start_fixture_server(latency=args.latency, copies=args.copies)
+    try:
+        if not args.skip_legacy:
+            start = time.perf_counter()
+            pages, books = legacy_crawl(base_url)
+            report("sequencial (original)", time.perf_counter() - start, pages, books)
+
+        for workers in args.workers:
+            crawler = CountingCrawler(max_workers=workers, per_host_limit=workers, rate=args.rate)
+            start = time.perf_counter()
+            books = scrape_books.scrape_all_books_by_category(base_url, crawler)
+            elapsed = time.perf_counter() - start
+            crawler.close()
+            report(f"crawler {workers} workers", elapsed, crawler.pages, len(books))
+
+        # Re-raspagem incremental: primeira passada registra o estado, a
+        # segunda só envia requisições condicionais (todas respondem 304).
+        workers = max(args.workers)
+        state = CrawlState()
+        with CountingCrawler(max_workers=workers, per_host_limit=workers, rate=args.rate) as crawler:
+            scrape_books.scrape_all_books_by_category(base_url, crawler, state)
+        state = CrawlState(state.pages(), conditional=True)
+        with CountingCrawler(max_workers=workers, per_host_limit=workers, rate=args.rate) as crawler:
+            start = time.perf_counter()
+            books = scrape_books.scrape_all_books_by_category(base_url, crawler, state)
+            elapsed = time.perf_counter() - start
+        report(f"incremental {workers} workers", elapsed, crawler.pages, len(books))
+        print(f"{'':>24} {state.pages_unchanged} páginas sem alteração puladas")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
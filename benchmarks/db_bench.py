@@ -0,0 +1,95 @@
+"""
+Latência p50/p99 da busca de um livro por id (`/books/{id}`) antes e
+depois da camada de conexões de core/database.py.
+
+- original: `sqlite3.connect` + `pd.read_sql_query` por requisição (handler antigo)
+- pool: conexão reaproveitada do pool de leitura + statement preparado
+- endpoint: `GET /api/v1/books/{id}` completo via TestClient
+
+Roda sobre uma cópia temporária de data/books.db.
+
+Uso:
+    python -m benchmarks.db_bench --requests 2000 --clients 8
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def original_lookup(db_path, book_id):
+    import pandas as pd
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    df = pd.read_sql_query("SELECT * FROM books WHERE id = ?", conn, params=(book_id,))
+    conn.close()
+    return df.to_dict(orient="records")[0]
+
+
+def pooled_lookup(db_path, book_id):
+    from core.database import read_connection
+    with read_connection(db_path) as conn:
+        return dict(conn.execute("SELECT * FROM books WHERE id = ?", (book_id,)).fetchone())
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+    return pick(0.50), pick(0.99), statistics.mean(samples) * 1000
+
+
+def run(label, fn, ids, clients):
+    def timed(book_id):
+        start = time.perf_counter()
+        fn(book_id)
+        return time.perf_counter() - start
+
+    fn(ids[0])  # aquecimento
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        samples = list(pool.map(timed, ids))
+    elapsed = time.perf_counter() - start
+    p50, p99, mean = percentiles(samples)
+    print(f"{label:>10} {p50:>10.3f} {p99:>10.3f} {mean:>10.3f} {len(ids) / elapsed:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="data/books.db")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=8)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "books.db")
+    shutil.copy(args.db, db_path)
+    os.environ["BOOKS_DB_PATH"] = db_path
+
+    from core import database
+    database.BOOKS_DB_PATH = db_path
+    with sqlite3.connect(db_path) as conn:
+        max_id = conn.execute("SELECT MAX(id) FROM books").fetchone()[0]
+    rng = random.Random(0)
+    ids = [rng.randint(1, max_id) for _ in range(args.requests)]
+
+    print(f"{args.requests} requisições, {args.clients} clientes concorrentes (latências em ms)")
+    print(f"{'modo':>10} {'p50':>10} {'p99':>10} {'média':>10} {'req/s':>10}")
+    run("original", lambda i: original_lookup(db_path, i), ids, args.clients)
+    run("pool", lambda i: pooled_lookup(db_path, i), ids, args.clients)
+
+    from fastapi.testclient import TestClient
+    from api.main import app
+    client = TestClient(app)
+    run("endpoint", lambda i: client.get(f"/api/v1/books/{i}"), ids, args.clients)
+
+    database.close_all()
+    shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
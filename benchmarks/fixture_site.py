@@ -0,0 +1,202 @@
+"""
+Servidor HTTP local que imita a estrutura de https://books.toscrape.com/
+(página inicial com a barra de categorias e páginas de categoria paginadas
+com 20 `article.product_pod`), gerado a partir de data/books.csv.
+
+Permite testar e medir o scraper sem acesso à internet.
+
+Uso:
+    python -m benchmarks.fixture_site --port 8001 --latency 0.02
+    python -m scripts.scrape_books  # com SCRAPER_BASE_URL=http://127.0.0.1:8001/
+"""
+import argparse
+import csv
+import hashlib
+import html
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+CSV_PATH = "data/books.csv"
+PAGE_SIZE = 20
+RATING_WORDS = {1: "One", 2: "Two", 3: "Three", 4: "Four", 5: "Five"}
+
+
+def load_books(csv_path=CSV_PATH, copies=1):
+    """
+    Lê o catálogo de referência; `copies` > 1 replica os livros com URLs
+    únicas para simular catálogos maiores.
+    """
+    with open(csv_path, encoding="utf-8") as f:
+        books = list(csv.DictReader(f))
+    if copies <= 1:
+        return books
+    replicated = []
+    for copy in range(copies):
+        for book in books:
+            book = dict(book)
+            if copy:
+                book["title"] = f"{book['title']} ({copy})"
+                book["book_page_url"] = book["book_page_url"].replace("/index.html", f"-{copy}/index.html")
+            replicated.append(book)
+    return replicated
+
+
+def _slug(text):
+    return "-".join(text.lower().split())
+
+
+def render_article(book):
+    book_path = urlsplit(book["book_page_url"]).path.lstrip("/")
+    image_path = urlsplit(book["image_url"]).path.lstrip("/")
+    title = html.escape(book["title"])
+    availability = html.escape(book["availability_text"])
+    icon = "icon-ok" if book["is_in_stock"] == "True" else "icon-remove"
+    stars = "\n".join('            <i class="icon-star"></i>' for _ in range(5))
+    return f"""
+<article class="product_pod">
+    <div class="image_container">
+        <a href="../../../{book_path}"><img src="../../../../{image_path}" alt="{title}" class="thumbnail"></a>
+    </div>
+    <p class="star-rating {RATING_WORDS.get(int(book['rating']), 'Zero')}">
+{stars}
+    </p>
+    <h3><a href="../../../{book_path}" title="{title}">{html.escape(book["title"][:30])}...</a></h3>
+    <div class="product_price">
+        <p class="price_color">£{float(book['price']):.2f}</p>
+        <p class="instock availability">
+            <i class="{icon}"></i>
+                {availability}
+        </p>
+        <form>
+            <button type="submit" class="btn btn-primary btn-block" data-loading-text="Adding...">Add to basket</button>
+        </form>
+    </div>
+</article>"""
+
+
+def render_page(title, body):
+    return f"""<!DOCTYPE html>
+<html lang="en-us" class="no-js">
+<head>
+    <title>{html.escape(title)} | Books to Scrape - Sandbox</title>
+    <meta http-equiv="content-type" content="text/html; charset=UTF-8" />
+</head>
+<body id="default" class="default">
+    <header class="header container-fluid">
+        <div class="page_inner"><div class="row"><div class="col-sm-8 h1"><a href="/index.html">Books to Scrape</a></div></div></div>
+    </header>
+    <div class="container-fluid page"><div class="page_inner">
+{body}
+    </div></div>
+</body>
+</html>""".encode("utf-8")
+
+
+def build_site(books):
+    """
+    Pré-renderiza todas as páginas do site em um dicionário caminho -> HTML.
+    """
+    by_category = {}
+    for book in books:
+        by_category.setdefault(book["category"], []).append(book)
+
+    pages = {}
+    links = []
+    for number, (category, category_books) in enumerate(by_category.items(), start=2):
+        folder = f"catalogue/category/books/{_slug(category)}_{number}"
+        links.append(f'<li><a href="{folder}/index.html">\n    {html.escape(category)}\n</a></li>')
+        chunks = [category_books[i:i + PAGE_SIZE] for i in range(0, len(category_books), PAGE_SIZE)]
+        for page_number, chunk in enumerate(chunks, start=1):
+            name = "index.html" if page_number == 1 else f"page-{page_number}.html"
+            pager = f'<li class="current">Page {page_number} of {len(chunks)}</li>'
+            if page_number < len(chunks):
+                pager += f'<li class="next"><a href="page-{page_number + 1}.html">next</a></li>'
+            body = (
+                f'<div class="page-header action"><h1>{html.escape(category)}</h1></div>\n'
+                '<section><ol class="row">\n'
+                + "\n".join(f'<li class="col-xs-6 col-sm-4 col-md-3 col-lg-3">{render_article(b)}</li>' for b in chunk)
+                + f'\n</ol><div><ul class="pager">{pager}</ul></div></section>'
+            )
+            pages[f"/{folder}/{name}"] = render_page(category, body)
+
+    sidebar = (
+        '<aside class="sidebar col-sm-4 col-md-3"><div class="side_categories">\n'
+        '<ul class="nav nav-list"><li><a href="catalogue/category/books_1/index.html">Books</a>\n'
+        "<ul>\n" + "\n".join(links) + "\n</ul></li></ul></div></aside>"
+    )
+    pages["/index.html"] = pages["/"] = render_page("All products", sidebar)
+    return pages
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    Serve as páginas pré-renderizadas com ETag/Last-Modified e responde 304
+    a requisições condicionais, como um servidor estático comum.
+    Alterar `pages` em tempo de execução simula mudanças no site.
+    """
+    protocol_version = "HTTP/1.1"
+    pages = {}
+    latency = 0.0
+    last_modified = formatdate(usegmt=True)
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        body = self.pages.get(urlsplit(self.path).path)
+        if body is None:
+            self.send_error(404)
+            return
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_server(host="127.0.0.1", port=0, latency=0.0, copies=1, csv_path=CSV_PATH):
+    """
+    Sobe o servidor em uma thread daemon e devolve (server, base_url).
+    Use `server.shutdown()` para encerrar.
+    """
+    handler = type("Handler", (FixtureHandler,), {
+        "pages": build_site(load_books(csv_path, copies)),
+        "latency": latency,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="atraso artificial por requisição (s)")
+    parser.add_argument("--copies", type=int, default=1, help="réplicas do catálogo de referência")
+    args = parser.parse_args()
+    server, base_url = start_fixture_server(args.host, args.port, args.latency, args.copies)
+    print(f"Servindo {base_url} (Ctrl+C para encerrar)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Latência das leituras (`GET /books`) durante uma rajada de logins.
+
+- sem logins: só leituras, referência
+- threadpool: bcrypt executado no threadpool que também atende as leituras
+  (comportamento anterior, endpoints síncronos)
+- pool: bcrypt no pool de processos dedicado (core/passwords.py)
+
+Roda em processo, com httpx + ASGITransport, sobre cópias temporárias dos
+bancos; os limites de taxa de login são desligados para gerar a rajada.
+
+Uso:
+    python -m benchmarks.login_storm_bench --logins 200 --readers 16 --rounds 12
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+
+class ThreadpoolHasher:
+    """
+    Mesmo contrato do PasswordHasher, mas rodando o bcrypt no threadpool do
+    servidor, como faziam os endpoints síncronos.
+    """
+
+    def __init__(self, rounds):
+        self.rounds = rounds
+
+    async def hash(self, password):
+        from anyio import to_thread
+        from core.passwords import hash_password
+        return await to_thread.run_sync(hash_password, password, self.rounds)
+
+    async def verify(self, password, hashed_password):
+        from anyio import to_thread
+        from core.passwords import verify_password
+        return await to_thread.run_sync(verify_password, password, hashed_password, self.rounds)
+
+    def shutdown(self):
+        pass
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+    return pick(0.50), pick(0.99), max(samples) * 1000
+
+
+async def scenario(app, logins, readers, duration):
+    import httpx
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies = []
+        stop = time.perf_counter() + duration
+
+        async def reader():
+            while time.perf_counter() < stop:
+                # Query string variada para não cair no cache de respostas
+                params = {"min_price": round(random.uniform(10, 50), 2), "limit": 20}
+                start = time.perf_counter()
+                r = await client.get("/api/v1/books", params=params)
+                latencies.append(time.perf_counter() - start)
+                assert r.status_code == 200
+
+        async def login():
+            r = await client.post("/api/v1/auth/login", data={"username": "bench", "password": "s3cr3t"})
+            return r.status_code
+
+        tasks = [reader() for _ in range(readers)]
+        login_started = time.perf_counter()
+        statuses = await asyncio.gather(*tasks, *(login() for _ in range(logins)))
+        return latencies, statuses[readers:], time.perf_counter() - login_started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--duration", type=float, default=5.0, help="Segundos de leituras por cenário")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="login_storm_")
+    books_db = os.path.join(tmp, "books.db")
+    shutil.copy("data/books.db", books_db)
+    os.environ["BOOKS_DB_PATH"] = books_db
+    os.environ["USERS_DB_PATH"] = os.path.join(tmp, "users.db")
+
+    from api.main import app
+    from api.routers import auth
+    from core.passwords import PasswordHasher, hash_password
+    from core.ratelimit import ConcurrencyLimit, TokenBucket
+
+    auth.login_bucket = TokenBucket(0)
+    auth.login_ip_limit = ConcurrencyLimit(0)
+    auth.users.create("bench", hash_password("s3cr3t", rounds=args.rounds))
+
+    print(f"{args.logins} logins (bcrypt custo {args.rounds}), {args.readers} leitores")
+    print(f"{'cenário':>12} {'leituras':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'logins ok':>10} {'503':>5}")
+    try:
+        for label, hasher, logins in (
+            ("sem logins", None, 0),
+            ("threadpool", ThreadpoolHasher(args.rounds), args.logins),
+            ("pool", PasswordHasher(rounds=args.rounds), args.logins),
+        ):
+            if hasher is not None:
+                auth.hasher = hasher
+            latencies, statuses, _ = asyncio.run(scenario(app, logins, args.readers, args.duration))
+            p50, p99, worst = percentiles(latencies)
+            print(
+                f"{label:>12} {len(latencies):>9} {p50:>9.1f} {p99:>9.1f} {worst:>9.1f} "
+                f"{statuses.count(200):>10} {statuses.count(503):>5}"
+            )
+            if hasher is not None:
+                hasher.shutdown()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
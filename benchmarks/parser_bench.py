@@ -0,0 +1,60 @@
+"""
+Micro-benchmark dos backends de parsing (scripts/parsers.py) sobre as
+páginas de categoria salvas em benchmarks/fixtures/.
+
+Mostra páginas/s de cada backend instalado e confere se todos extraem
+exatamente os mesmos livros que o html.parser.
+
+Uso:
+    python -m benchmarks.parser_bench --repeat 200
+"""
+import argparse
+import glob
+import os
+import time
+from scripts.parsers import available_parsers, get_parser, BeautifulSoup, get_book_details
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "*.html")
+PAGE_URL = "https://books.toscrape.com/catalogue/category/books/mystery_3/index.html"
+
+
+def legacy_parse(content, category_name, page_url):
+    """
+    Parsing original: árvore completa e `find()` por livro.
+    """
+    soup = BeautifulSoup(content, "html.parser")
+    books = [get_book_details(a, category_name) for a in soup.find_all("article", class_="product_pod")]
+    next_button = soup.find("li", class_="next")
+    return books, next_button.find("a")["href"] if next_button else None
+
+
+def measure(parse, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for content in pages:
+            parse(content, "Mystery", PAGE_URL)
+    return repeat * len(pages) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    pages = [open(path, "rb").read() for path in sorted(glob.glob(FIXTURES))]
+    reference = [get_parser("html.parser").parse_category_page(p, "Mystery", PAGE_URL) for p in pages]
+    print(f"{len(pages)} páginas de fixture, {args.repeat} repetições\n")
+    print(f"{'backend':>24} {'páginas/s':>12}")
+
+    baseline = measure(legacy_parse, pages, args.repeat)
+    print(f"{'html.parser (original)':>24} {baseline:>12.1f}")
+    for name in available_parsers():
+        backend = get_parser(name)
+        results = [backend.parse_category_page(p, "Mystery", PAGE_URL) for p in pages]
+        status = "ok" if results == reference else "DIVERGENTE"
+        rate = measure(backend.parse_category_page, pages, args.repeat)
+        print(f"{name:>24} {rate:>12.1f}   {rate / baseline:.1f}x  [{status}]")
+
+
+if __name__ == "__main__":
+    main()
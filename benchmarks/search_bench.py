@@ -0,0 +1,54 @@
+"""
+Compara a busca por título do índice de trigramas (core/search.py) com a
+varredura original em pandas (`str.contains`).
+
+Uso:
+    python -m benchmarks.search_bench --sizes 1000 100000 1000000
+"""
+import argparse
+import statistics
+import time
+import pandas as pd
+from benchmarks.synthetic import generate_books
+from core.catalog import COLUMNS
+from core.search import SearchIndex
+
+QUERIES = ("love", "secret garden", "história", "xyz", "winter", "#4242")
+
+
+def _timeit(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def run(size, repeat):
+    df = pd.DataFrame(generate_books(size), columns=COLUMNS)
+
+    start = time.perf_counter()
+    index = SearchIndex(df["title"].tolist(), df["category"].tolist())
+    build = time.perf_counter() - start
+    print(f"\n{size:>9} livros | construção do índice: {build * 1000:.0f} ms")
+    print(f"{'consulta':>15} {'resultados':>10} {'pandas (ms)':>12} {'índice (ms)':>12} {'speedup':>8}")
+
+    for query in QUERIES:
+        scan = _timeit(lambda: df[df["title"].str.contains(query, case=False, na=False)], repeat)
+        indexed = _timeit(lambda: index.search(title=query, limit=20), repeat)
+        hits = len(index.match_title(query))
+        print(f"{query:>15} {hits:>10} {scan * 1000:>12.2f} {indexed * 1000:>12.3f} {scan / indexed:>7.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Serialização do catálogo inteiro em JSON: vazão (MB/s) e pico de memória
+(tracemalloc) de cada caminho.
+
+- pandas: `read_sql_query` + `to_dict(orient="records")` + encoder padrão
+  do FastAPI (`jsonable_encoder` + JSONResponse) — handler original
+- dicts: linhas `sqlite3.Row` -> dict + JSONResponse
+- orjson: tuplas do cursor codificadas em uma chamada (`encode_rows`)
+- snapshot: JSON pré-codificado de cada livro concatenado (`CatalogSnapshot.encode`)
+
+Uso:
+    python -m benchmarks.serialization_bench --sizes 1000 100000
+"""
+import argparse
+import sqlite3
+import statistics
+import time
+import tracemalloc
+from benchmarks.synthetic import generate_books
+from core.catalog import COLUMNS, CatalogSnapshot
+from core.serialization import encode_rows
+
+SELECT_ALL = f"SELECT {', '.join(COLUMNS)} FROM books ORDER BY id"
+
+
+def build_db(n):
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.execute('''
+        CREATE TABLE books (
+            id INTEGER PRIMARY KEY, title TEXT, category TEXT, price REAL, rating INTEGER,
+            is_in_stock BOOLEAN, availability_text TEXT, image_url TEXT, book_page_url TEXT UNIQUE
+        )
+    ''')
+    conn.executemany("INSERT INTO books VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", generate_books(n))
+    return conn
+
+
+def pandas_path(conn):
+    import pandas as pd
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    df = pd.read_sql_query(SELECT_ALL, conn)
+    return JSONResponse(jsonable_encoder(df.to_dict(orient="records"))).body
+
+
+def dicts_path(conn):
+    from fastapi.responses import JSONResponse
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = [dict(row) for row in conn.execute(SELECT_ALL)]
+    finally:
+        conn.row_factory = None
+    return JSONResponse(rows).body
+
+
+def orjson_path(conn):
+    return encode_rows(COLUMNS, conn.execute(SELECT_ALL).fetchall())
+
+
+def measure(fn, arg, repeats):
+    fn(arg)  # aquecimento
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        body = fn(arg)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(body), statistics.median(times), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        conn = build_db(n)
+        snapshot = CatalogSnapshot(conn.execute(SELECT_ALL).fetchall())
+        snapshot.encoded  # o JSON de cada livro é montado uma vez, na carga
+
+        print(f"\n{n} livros")
+        print(f"{'caminho':>10} {'MB':>8} {'ms':>10} {'MB/s':>10} {'pico MB':>10}")
+        for label, fn, arg in (
+            ("pandas", pandas_path, conn),
+            ("dicts", dicts_path, conn),
+            ("orjson", orjson_path, conn),
+            ("snapshot", lambda s: s.encode(s.all()), snapshot),
+        ):
+            size, seconds, peak = measure(fn, arg, args.repeats)
+            mb = size / 1e6
+            print(f"{label:>10} {mb:>8.2f} {seconds * 1000:>10.1f} {mb / seconds:>10.1f} {peak / 1e6:>10.1f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
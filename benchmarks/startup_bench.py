@@ -0,0 +1,105 @@
+"""
+Subida a frio da API: quanto custa cada import e quanto tempo um processo
+novo leva até a primeira resposta 200.
+
+- imports: `python -X importtime -c "import api.main"`, agregado por pacote
+- primeira resposta: processo novo -> import de api.main -> lifespan
+  (warm_up) -> GET /api/v1/books/{id} com 200, medido de fora (relógio do
+  processo pai, incluindo a inicialização do interpretador), com e sem o
+  artefato do catálogo (`CATALOG_ARTIFACT`)
+
+O banco é sintético, em um diretório temporário (BOOKS_DB_PATH/USERS_DB_PATH).
+
+Uso:
+    python -m benchmarks.startup_bench --sizes 1000 100000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.synthetic import build_database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, time
+t0 = time.time()
+from fastapi.testclient import TestClient
+import api.main
+t1 = time.time()
+with TestClient(api.main.app) as client:
+    t2 = time.time()
+    assert client.get("/api/v1/books/1").status_code == 200
+    t3 = time.time()
+    print(json.dumps({"start": t0, "import": t1 - t0, "warm_up": t2 - t1, "request": t3 - t2, "ready": t3}))
+"""
+
+
+def import_breakdown(top):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api.main"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        if not own.strip().isdigit():
+            continue  # linha de título
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(own)
+    total = sum(packages.values())
+    print(f"\nimport api.main: {total / 1000:.0f} ms (tempo próprio dos módulos, por pacote)")
+    for package, micros in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:>20} {micros / 1000:>8.1f} ms")
+
+
+def first_request(env):
+    start = time.time()
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    phases["interpreter"] = phases["start"] - start
+    phases["total"] = phases["ready"] - start
+    return phases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top", type=int, default=12)
+    args = parser.parse_args()
+
+    import_breakdown(args.top)
+
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                "BOOKS_DB_PATH": build_database(os.path.join(directory, "books.db"), n),
+                "USERS_DB_PATH": os.path.join(directory, "users.db"),
+                "LOG_FILE": "",
+                "LOG_LEVEL": "WARNING",
+            }
+            first_request({**env, "CATALOG_ARTIFACT": "1"})  # grava o artefato
+
+            print(f"\n{n} livros: tempo até o primeiro 200 (mediana de {args.repeats}, ms)")
+            print(f"{'artefato':>10} {'python':>8} {'imports':>8} {'warm_up':>8} {'request':>8} {'total':>8}")
+            for label, flag in (("não", "0"), ("sim", "1")):
+                runs = [first_request({**env, "CATALOG_ARTIFACT": flag}) for _ in range(args.repeats)]
+                median = {key: statistics.median(run[key] for run in runs) * 1000 for key in runs[0]}
+                print(
+                    f"{label:>10} {median['interpreter']:>8.0f} {median['import']:>8.0f} "
+                    f"{median['warm_up']:>8.0f} {median['request']:>8.0f} {median['total']:>8.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""
+Suíte de carga da API e do scraper, com resultados em JSON e portão de
+regressão.
+
+- catálogo sintético de 1k, 100k ou 1M livros no esquema atual
+  (benchmarks/synthetic.py), reaproveitado entre execuções com --data-dir
+- um cenário por rota de api/routers/books.py e api/routers/auth.py, com
+  parâmetros sorteados por semente fixa e clientes concorrentes via TestClient
+- scraper offline: parsing das páginas de benchmarks/fixtures/ em cada
+  backend, crawl contra o site local de benchmarks/fixture_site.py e
+  gravação em lotes (`write_books`) em um banco temporário
+
+Cada cenário registra p50/p95/p99/média (ms), vazão e erros. Com
+--baseline, compara com um resultado anterior e termina com código 1 se
+algum p99 subir ou alguma vazão cair além dos limites.
+
+Os disparos de scraping (`POST /scraping/trigger` e `DELETE
+/scraping/jobs/{id}`) ficam de fora: iniciam uma raspagem real do site.
+
+Uso:
+    python -m benchmarks.suite --size 100k --output results.json
+    python -m benchmarks.suite --size 100k --baseline results.json --p99-threshold 0.25
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.synthetic import SIZES, build_database, generate_books
+
+API = "/api/v1"
+# Cenários que devolvem muitos livros por requisição rodam 1/HEAVY_FRACTION das requisições
+HEAVY_FRACTION = 10
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+    return {
+        "p50_ms": round(pick(0.50), 3),
+        "p95_ms": round(pick(0.95), 3),
+        "p99_ms": round(pick(0.99), 3),
+        "mean_ms": round(statistics.mean(samples) * 1000, 3),
+    }
+
+
+def summarize(samples, elapsed, operations=None, errors=0, unit="req/s"):
+    """
+    Resultado de um cenário. `operations` (padrão: uma por amostra) define a
+    vazão quando a unidade não é a própria amostra (ex.: linhas por lote).
+    """
+    operations = len(samples) if operations is None else operations
+    return {
+        **percentiles(samples),
+        "throughput": round(operations / elapsed, 1),
+        "unit": unit,
+        "requests": len(samples),
+        "errors": errors,
+    }
+
+
+# ===============================
+# Cenários da API
+# ===============================
+class ApiWorkload:
+    """
+    Gera as requisições de cada rota a partir do catálogo carregado: ids,
+    categorias e palavras de títulos reais, sorteados com semente fixa.
+    """
+
+    def __init__(self, client, seed=0):
+        from core.catalog import get_catalog
+        from core.query import SORTS
+        self.sorts = list(SORTS)
+        self.client = client
+        self.rng = random.Random(seed)
+        catalog = get_catalog()
+        self.ids = [int(i) for i in catalog.ids[:: max(1, len(catalog) // 5000)]]
+        self.categories = list(catalog.category_names)
+        self.words = sorted({
+            word for book_id in self.ids[:500] for word in catalog.get(book_id)["title"].split()[:2]
+        })
+        self.cursor = client.get(f"{API}/books", params={"limit": 50}).headers.get("X-Next-Cursor")
+        self.token = self._token()
+
+    def _token(self):
+        credentials = {"username": "bench", "password": "bench-password"}
+        self.client.post(f"{API}/auth/register", json=credentials)
+        r = self.client.post(f"{API}/auth/login", data=credentials)
+        r.raise_for_status()
+        return r.json()["access_token"]
+
+    def pick_ids(self, n):
+        return self.rng.sample(self.ids, min(n, len(self.ids)))
+
+    def scenarios(self):
+        """
+        (nome, peso, fábrica de requisições, status esperado). A fábrica é
+        chamada antes da medição e devolve (método, url, kwargs).
+        """
+        rng, auth = self.rng, {"Authorization": f"Bearer {self.token}"}
+        price = lambda: round(rng.uniform(10, 55), 2)
+        users = iter(range(10**9))
+        return [
+            ("books.search.title", 1, lambda: ("GET", f"{API}/books/search", {
+                "params": {"title": rng.choice(self.words), "limit": 20}}), 200),
+            ("books.search.category", 1, lambda: ("GET", f"{API}/books/search", {
+                "params": {"category": rng.choice(self.categories), "limit": 20}}), 200),
+            ("books.top_rated", 1, lambda: ("GET", f"{API}/books/top-rated", {
+                "params": {"limit": rng.choice((10, 50, 100))}}), 200),
+            ("books.price_range", 1, lambda: ("GET", f"{API}/books/price-range", {
+                "params": {"min": (low := price()), "max": low + 5, "limit": 50}}), 200),
+            ("books.list", 1, lambda: ("GET", f"{API}/books", {
+                "params": {"limit": 50, "sort": rng.choice(self.sorts)}}), 200),
+            ("books.list.filtered", 1, lambda: ("GET", f"{API}/books", {
+                "params": {"category": rng.choice(self.categories), "min_rating": rng.randint(1, 5),
+                           "in_stock": True, "sort": "-price", "limit": 50}}), 200),
+            ("books.list.cursor", 1, lambda: ("GET", f"{API}/books", {
+                "params": {"limit": 50, "cursor": self.cursor}}), 200),
+            ("books.list.ids", 1, lambda: ("GET", f"{API}/books", {
+                "params": {"ids": ",".join(map(str, self.pick_ids(20)))}}), 200),
+            ("books.export.ndjson", HEAVY_FRACTION, lambda: ("GET", f"{API}/books/export", {
+                "params": {"format": "ndjson", "category": rng.choice(self.categories)}}), 200),
+            ("books.export.csv", HEAVY_FRACTION, lambda: ("GET", f"{API}/books/export", {
+                "params": {"format": "csv", "category": rng.choice(self.categories)}}), 200),
+            ("books.batch", 1, lambda: ("POST", f"{API}/books/batch", {
+                "json": {"ids": self.pick_ids(50)}}), 200),
+            ("books.multi", 1, lambda: ("POST", f"{API}/books/multi", {"json": {"queries": [
+                {"type": "search", "category": rng.choice(self.categories), "limit": 10},
+                {"type": "top_rated", "limit": 10},
+                {"type": "price_range", "min": (low := price()), "max": low + 5, "limit": 10},
+                {"type": "ids", "ids": self.pick_ids(10)},
+            ]}}), 200),
+            ("books.by_id", 1, lambda: ("GET", f"{API}/books/{rng.choice(self.ids)}", {}), 200),
+            ("books.similar", 1, lambda: ("GET", f"{API}/books/{rng.choice(self.ids)}/similar", {
+                "params": {"limit": 10}}), 200),
+            ("recommendations", 1, lambda: ("GET", f"{API}/recommendations", {
+                "params": {"ids": ",".join(map(str, self.pick_ids(3))), "limit": 10}}), 200),
+            ("categories", 1, lambda: ("GET", f"{API}/categories", {}), 200),
+            ("stats.overview", 1, lambda: ("GET", f"{API}/stats/overview", {}), 200),
+            ("stats.categories", 1, lambda: ("GET", f"{API}/stats/categories", {}), 200),
+            ("stats.price_percentiles", 1, lambda: ("GET", f"{API}/stats/price-percentiles", {
+                "params": {"category": rng.choice(self.categories)}}), 200),
+            ("stats.histogram", 1, lambda: ("GET", f"{API}/stats/histogram", {
+                "params": {"field": rng.choice(("price", "rating")), "category": rng.choice(self.categories)}}), 200),
+            ("scraping.job_status", 1, lambda: ("GET", f"{API}/scraping/jobs/bench-{rng.randint(0, 10**6)}", {
+                "headers": auth}), 404),
+            ("auth.register", 1, lambda: ("POST", f"{API}/auth/register", {
+                "json": {"username": f"bench-{next(users)}", "password": "bench-password"}}), 200),
+            ("auth.login", 1, lambda: ("POST", f"{API}/auth/login", {
+                "data": {"username": "bench", "password": "bench-password"}}), 200),
+            ("auth.refresh", 1, lambda: ("POST", f"{API}/auth/refresh", {"headers": auth}), 200),
+        ]
+
+
+def run_requests(client, make_request, expected, requests, clients):
+    batch = [make_request() for _ in range(requests)]
+
+    def timed(request):
+        method, url, kwargs = request
+        start = time.perf_counter()
+        r = client.request(method, url, **kwargs)
+        return time.perf_counter() - start, r.status_code != expected
+
+    timed(make_request())  # aquecimento
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(timed, batch))
+    elapsed = time.perf_counter() - start
+    return summarize([seconds for seconds, _ in results], elapsed, errors=sum(failed for _, failed in results))
+
+
+def api_benchmarks(args, selected):
+    from fastapi.testclient import TestClient
+    from api.main import app
+
+    results = {}
+    with TestClient(app) as client:
+        workload = ApiWorkload(client, args.seed)
+        for name, weight, make_request, expected in workload.scenarios():
+            if not selected(name):
+                continue
+            requests = args.auth_requests if name.startswith("auth.") else args.requests
+            results[name] = run_requests(client, make_request, expected, max(1, requests // weight), args.clients)
+            print_result(name, results[name])
+    return results
+
+
+# ===============================
+# Cenários do scraper (offline)
+# ===============================
+def scraper_benchmarks(args, selected, workdir):
+    import logging
+    logging.disable(logging.CRITICAL)
+    from benchmarks.fixture_site import start_fixture_server
+    from benchmarks.parser_bench import FIXTURES, PAGE_URL
+    from scripts import scrape_books
+    from scripts.crawler import Crawler
+    from scripts.parsers import available_parsers, get_parser
+
+    results = {}
+    pages = [open(path, "rb").read() for path in sorted(glob.glob(FIXTURES))]
+    for backend in available_parsers():
+        name = f"scraper.parse.{backend}"
+        if not selected(name):
+            continue
+        parse = get_parser(backend).parse_category_page
+        samples = []
+        start = time.perf_counter()
+        for _ in range(args.parse_repeat):
+            for content in pages:
+                page_start = time.perf_counter()
+                parse(content, "Mystery", PAGE_URL)
+                samples.append(time.perf_counter() - page_start)
+        results[name] = summarize(samples, time.perf_counter() - start, unit="pages/s")
+        print_result(name, results[name])
+
+    if selected("scraper.crawl"):
+        class TimedCrawler(Crawler):
+            samples = []
+
+            def fetch(self, url, headers=None):
+                start = time.perf_counter()
+                response = super().fetch(url, headers)
+                self.samples.append(time.perf_counter() - start)
+                return response
+
+        server, base_url = start_fixture_server(latency=args.crawl_latency)
+        try:
+            with TimedCrawler(args.crawl_workers, args.crawl_workers, args.crawl_rate) as crawler:
+                start = time.perf_counter()
+                scrape_books.scrape_all_books_by_category(base_url, crawler)
+                elapsed = time.perf_counter() - start
+        finally:
+            server.shutdown()
+        results["scraper.crawl"] = summarize(TimedCrawler.samples, elapsed, unit="pages/s")
+        print_result("scraper.crawl", results["scraper.crawl"])
+
+    if selected("scraper.ingest"):
+        # Amostras por lote gravado; vazão em linhas/s
+        scrape_books.DB_FILE = os.path.join(workdir, "ingest.db")
+        scrape_books.init_books_db()
+        books = [
+            dict(zip(("title", "category", "price", "rating", "is_in_stock", "availability_text",
+                      "image_url", "book_page_url"), row[1:]))
+            for row in generate_books(args.ingest_rows, args.seed)
+        ]
+        samples = []
+        start = time.perf_counter()
+        for i in range(0, len(books), args.batch_size):
+            batch_start = time.perf_counter()
+            scrape_books.write_books(books[i:i + args.batch_size], args.batch_size)
+            samples.append(time.perf_counter() - batch_start)
+        results["scraper.ingest"] = summarize(
+            samples, time.perf_counter() - start, operations=len(books), unit="rows/s"
+        )
+        print_result("scraper.ingest", results["scraper.ingest"])
+    return results
+
+
+# ===============================
+# Portão de regressão
+# ===============================
+def compare(baseline, current, p99_threshold=0.2, throughput_threshold=0.2):
+    """
+    Cenários presentes nos dois resultados cujo p99 subiu mais que
+    `p99_threshold` ou cuja vazão caiu mais que `throughput_threshold`
+    (frações: 0.2 = 20%), ou que passaram a ter erros.
+    Devolve uma lista de mensagens; vazia quando não há regressão.
+    """
+    regressions = []
+    for name, before in baseline["results"].items():
+        after = current["results"].get(name)
+        if after is None:
+            continue
+        if after["p99_ms"] > before["p99_ms"] * (1 + p99_threshold):
+            regressions.append(f"{name}: p99 {before['p99_ms']:.3f} -> {after['p99_ms']:.3f} ms")
+        if after["throughput"] < before["throughput"] * (1 - throughput_threshold):
+            regressions.append(
+                f"{name}: vazão {before['throughput']:.1f} -> {after['throughput']:.1f} {after['unit']}"
+            )
+        if after["errors"] > before["errors"]:
+            regressions.append(f"{name}: erros {before['errors']} -> {after['errors']}")
+    return regressions
+
+
+# ===============================
+# Execução
+# ===============================
+def print_result(name, result):
+    print(
+        f"{name:>28} {result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f} {result['p99_ms']:>9.3f} "
+        f"{result['throughput']:>10.1f} {result['unit']:<7} {result['errors']:>5}"
+    )
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare_environment(args, workdir):
+    """
+    Banco sintético e variáveis de ambiente da API. Precisa rodar antes de
+    importar api.main: os limites de login e o custo do bcrypt são lidos na
+    importação.
+    """
+    data_dir = args.data_dir or workdir
+    db_path = os.path.join(data_dir, f"books-{args.books}-{args.seed}.db")
+    if not os.path.exists(db_path):
+        print(f"Gerando catálogo sintético com {args.books} livros em {db_path}...")
+        build_database(db_path, args.books, args.seed)
+    os.environ.update({
+        "BOOKS_DB_PATH": db_path,
+        "USERS_DB_PATH": os.path.join(workdir, "users.db"),
+        "BCRYPT_ROUNDS": str(args.bcrypt_rounds),
+        "LOGIN_RATE": "1000000",
+        "LOGIN_BURST": "1000000",
+        "LOGIN_IP_CONCURRENCY": "1000000",
+        "LOG_FILE": "",
+        "LOG_LEVEL": "WARNING",
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=SIZES, default="1k", help="tamanho do catálogo sintético")
+    parser.add_argument("--books", type=int, help="número exato de livros (substitui --size)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=500, help="requisições por cenário da API")
+    parser.add_argument("--auth-requests", type=int, default=100, help="requisições por cenário de autenticação")
+    parser.add_argument("--clients", type=int, default=8, help="clientes concorrentes")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    parser.add_argument("--parse-repeat", type=int, default=20)
+    parser.add_argument("--crawl-latency", type=float, default=0.0, help="atraso do site local (s)")
+    parser.add_argument("--crawl-workers", type=int, default=8)
+    parser.add_argument("--crawl-rate", type=float, default=0, help="limite de req/s do Crawler (0 = sem limite)")
+    parser.add_argument("--ingest-rows", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--only", nargs="+", default=[], help="prefixos dos cenários a rodar")
+    parser.add_argument("--skip", nargs="+", default=[], help="prefixos dos cenários a pular")
+    parser.add_argument("--data-dir", help="diretório que guarda os bancos sintéticos entre execuções")
+    parser.add_argument("--output", help="arquivo JSON de resultados")
+    parser.add_argument("--baseline", help="resultado anterior para o portão de regressão")
+    parser.add_argument("--p99-threshold", type=float, default=0.2, help="aumento tolerado do p99 (fração)")
+    parser.add_argument("--throughput-threshold", type=float, default=0.2, help="queda tolerada da vazão (fração)")
+    args = parser.parse_args()
+    args.books = args.books or SIZES[args.size]
+
+    selected = lambda name: (
+        (not args.only or any(name.startswith(prefix) for prefix in args.only))
+        and not any(name.startswith(prefix) for prefix in args.skip)
+    )
+
+    workdir = tempfile.mkdtemp()
+    prepare_environment(args, workdir)
+    print(f"{args.books} livros, {args.clients} clientes concorrentes (latências em ms)\n")
+    print(f"{'cenário':>28} {'p50':>9} {'p95':>9} {'p99':>9} {'vazão':>10} {'':<7} {'erros':>5}")
+    results = {**api_benchmarks(args, selected), **scraper_benchmarks(args, selected, workdir)}
+
+    report = {
+        "meta": {
+            "books": args.books,
+            "seed": args.seed,
+            "requests": args.requests,
+            "auth_requests": args.auth_requests,
+            "clients": args.clients,
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados gravados em {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for key in ("books", "clients"):
+            if baseline["meta"].get(key) != report["meta"][key]:
+                print(f"Aviso: '{key}' difere da linha de base ({baseline['meta'].get(key)} != {report['meta'][key]})")
+        regressions = compare(baseline, report, args.p99_threshold, args.throughput_threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressões em relação a {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nSem regressões em relação a {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Gerador de catálogos sintéticos no mesmo formato da tabela 'books'.
+"""
+import itertools
+import os
+import random
+import sqlite3
+from core.schema import BOOKS_TABLE, migrate_books
+
+# Tamanhos de referência da suíte de benchmarks
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+WORDS = (
+    "love night city river secret garden house shadow light winter summer "
+    "king queen war peace dream ocean mountain story history life death "
+    "journey island forest stars storm fire water heart mind world empire "
+    "café coração ação memória poesia música história noite amor cidade "
+    "the of and in a to my our last first little great lost hidden"
+).split()
+
+CATEGORIES = (
+    "Travel", "Mystery", "Historical Fiction", "Sequential Art", "Classics",
+    "Philosophy", "Romance", "Womens Fiction", "Fiction", "Childrens",
+    "Religion", "Nonfiction", "Music", "Science Fiction", "Sports and Games",
+    "Fantasy", "New Adult", "Young Adult", "Science", "Poetry", "Paranormal",
+    "Art", "Psychology", "Autobiography", "Parenting", "Adult Fiction",
+    "Humor", "Horror", "History", "Food and Drink", "Christian Fiction",
+    "Business", "Biography", "Thriller", "Contemporary", "Spirituality",
+    "Academic", "Self Help", "Historical", "Christian", "Suspense",
+    "Short Stories", "Novels", "Health", "Politics", "Cultural", "Erotica",
+    "Crime", "Default", "Add a comment"
+)
+
+
+def generate_books(n, seed=42):
+    """
+    Gera `n` tuplas (id, title, category, price, rating, is_in_stock,
+    availability_text, image_url, book_page_url) de forma determinística.
+    """
+    rng = random.Random(seed)
+    for book_id in range(1, n + 1):
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 7))).title()
+        in_stock = rng.random() < 0.9
+        slug = f"book-{book_id}"
+        yield (
+            book_id,
+            f"{title} #{book_id}",
+            rng.choice(CATEGORIES),
+            round(rng.uniform(10, 60), 2),
+            rng.randint(1, 5),
+            1 if in_stock else 0,
+            "In stock" if in_stock else "Out of stock",
+            f"https://books.toscrape.com/media/cache/{slug}.jpg",
+            f"https://books.toscrape.com/{slug}_{book_id}/index.html",
+        )
+
+
+def build_database(path, n, seed=42, batch_size=10_000):
+    """
+    Cria em `path` um banco no esquema atual (core/schema.py) com `n` livros
+    sintéticos. As linhas entram antes das migrações, então os índices e o
+    resumo das estatísticas são montados uma única vez no fim, em vez de
+    linha a linha pelos triggers.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(BOOKS_TABLE)
+        books = generate_books(n, seed)
+        with conn:
+            while batch := list(itertools.islice(books, batch_size)):
+                conn.executemany("INSERT INTO books VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+        migrate_books(conn)
+    finally:
+        conn.close()
+    return path
@@ -0,0 +1,182 @@
+import mmap
+import os
+import struct
+import numpy as np
+import orjson
+from core.search import SearchIndex
+
+# --- Configuração (sobrescrita por variáveis de ambiente) ---
+# "0" desliga a leitura e a gravação do artefato
+CATALOG_ARTIFACT = os.getenv("CATALOG_ARTIFACT", "1") != "0"
+
+MAGIC = b"BKCAT\x00\x01\x00"
+_PREFIX = struct.Struct("<8sQ")  # magic, tamanho do cabeçalho
+_ALIGN = 8
+
+
+class ArtifactError(ValueError):
+    """
+    Arquivo que não é um artefato do catálogo (ou de outra versão do formato).
+    """
+
+
+def artifact_path(db_path):
+    """
+    Artefato ao lado do banco: data/books.db -> data/books.catalog
+    """
+    return os.path.splitext(db_path)[0] + ".catalog"
+
+
+# ===============================
+# Gravação
+# ===============================
+def write_artifact(snapshot, path, updated_at, data_version=None):
+    """
+    Grava o snapshot (colunas, JSON de cada livro, índice de busca e células
+    das estatísticas) em um único arquivo binário pronto para `mmap`.
+
+    Layout: magic + tamanho do cabeçalho, cabeçalho JSON (versão do
+    catálogo, `updated_at`, `data_version` e a posição de cada seção) e as
+    seções alinhadas em 8 bytes. Arrays numéricos são gravados crus, para
+    virar views do mmap na leitura; o JSON dos livros é um único array
+    `[...]` com os limites de cada objeto. A troca do arquivo é atômica (os.replace).
+    """
+    encoded = snapshot.encoded
+    chunks = [encoded[int(book_id)] for book_id in snapshot.ids]
+    bounds = np.zeros(2 * len(chunks), dtype=np.int64)
+    cursor = 1
+    for i, chunk in enumerate(chunks):
+        bounds[2 * i] = cursor
+        cursor += len(chunk)
+        bounds[2 * i + 1] = cursor
+        cursor += 1  # vírgula
+    books_json = b"[" + b",".join(chunks) + b"]"
+
+    titles, postings, categories = snapshot.search_index.parts()
+    grams = list(postings)
+    gram_offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+    np.cumsum([len(postings[gram]) for gram in grams], out=gram_offsets[1:])
+    gram_positions = (
+        np.concatenate([postings[gram] for gram in grams]).astype(np.int32)
+        if grams else np.empty(0, dtype=np.int32)
+    )
+
+    sections = [
+        ("ids", np.ascontiguousarray(snapshot.ids, dtype=np.int64)),
+        ("prices", np.ascontiguousarray(snapshot.prices, dtype=np.float64)),
+        ("ratings", np.ascontiguousarray(snapshot.ratings, dtype=np.int64)),
+        ("in_stock", np.ascontiguousarray(snapshot.in_stock, dtype=np.bool_)),
+        ("book_bounds", bounds),
+        ("books", books_json),
+        ("titles", orjson.dumps(titles)),
+        ("grams", orjson.dumps(grams)),
+        ("gram_offsets", gram_offsets),
+        ("gram_positions", gram_positions),
+        ("categories", orjson.dumps({name: positions.tolist() for name, positions in categories.items()})),
+        ("stats_cells", orjson.dumps([list(cell) for cell in snapshot.stats_cells])),
+    ]
+
+    index, offset = {}, 0
+    for name, data in sections:
+        dtype = data.dtype.str if isinstance(data, np.ndarray) else None
+        nbytes = data.nbytes if isinstance(data, np.ndarray) else len(data)
+        index[name] = [offset, nbytes, dtype]
+        offset += _padded(nbytes)
+    header = orjson.dumps({
+        "version": snapshot.version,
+        "updated_at": updated_at,
+        "data_version": data_version,
+        "count": len(chunks),
+        "sections": index,
+    })
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, len(header)))
+        f.write(header)
+        f.write(b"\0" * (_padded(_PREFIX.size + len(header)) - _PREFIX.size - len(header)))
+        for name, data in sections:
+            raw = data.tobytes() if isinstance(data, np.ndarray) else data
+            f.write(raw)
+            f.write(b"\0" * (_padded(len(raw)) - len(raw)))
+    os.replace(tmp, path)
+
+
+def _padded(size):
+    return -(-size // _ALIGN) * _ALIGN
+
+
+# ===============================
+# Leitura
+# ===============================
+def read_header(path):
+    """
+    Cabeçalho do artefato, ou None se o arquivo não existe ou não é válido.
+    """
+    try:
+        with open(path, "rb") as f:
+            magic, size = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC:
+                return None
+            return orjson.loads(f.read(size))
+    except (OSError, struct.error, orjson.JSONDecodeError):
+        return None
+
+
+def read_artifact(path):
+    """
+    Abre o artefato com mmap e devolve (cabeçalho, partes do snapshot).
+
+    Os arrays numéricos e as listas de posições do índice são views
+    somente leitura do mmap (sem cópia; entre processos, as páginas ficam
+    no cache do sistema e são compartilhadas), e o JSON de cada livro é uma
+    fatia (memoryview) do mesmo buffer. Só os registros (dicts) e os
+    títulos normalizados são decodificados.
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, size = _PREFIX.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ArtifactError(f"{path} não é um artefato do catálogo.")
+    header = orjson.loads(buffer[_PREFIX.size:_PREFIX.size + size])
+    base = _padded(_PREFIX.size + size)
+    view = memoryview(buffer)
+
+    def raw(name):
+        offset, nbytes, _ = header["sections"][name]
+        return view[base + offset:base + offset + nbytes]
+
+    def array(name):
+        offset, nbytes, dtype = header["sections"][name]
+        dtype = np.dtype(dtype)
+        return np.frombuffer(buffer, dtype=dtype, count=nbytes // dtype.itemsize, offset=base + offset)
+
+    ids = array("ids")
+    books = raw("books")
+    bounds = array("book_bounds").tolist()
+    encoded = {
+        book_id: books[bounds[2 * i]:bounds[2 * i + 1]]
+        for i, book_id in enumerate(ids.tolist())
+    }
+
+    grams = orjson.loads(raw("grams"))
+    offsets = array("gram_offsets").tolist()
+    positions = array("gram_positions")
+    postings = {gram: positions[offsets[i]:offsets[i + 1]] for i, gram in enumerate(grams)}
+    categories = {
+        name: np.array(values, dtype=np.int32)
+        for name, values in orjson.loads(raw("categories")).items()
+    }
+
+    parts = {
+        "records": orjson.loads(books),
+        "ids": ids,
+        "prices": array("prices"),
+        "ratings": array("ratings"),
+        "in_stock": array("in_stock"),
+        "stats_cells": [tuple(cell) for cell in orjson.loads(raw("stats_cells"))],
+        "version": header["version"],
+        "encoded": encoded,
+        "search_index": SearchIndex.from_parts(orjson.loads(raw("titles")), postings, categories),
+    }
+    return header, parts
@@ -0,0 +1,422 @@
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+import numpy as np
+import core.database as database
+from core import artifact
+from core.database import read_connection
+from core.metrics import timed
+from core.schema import ensure_catalog_meta
+from core.search import SearchIndex
+from core.serialization import dumps, join_encoded
+from core.stats import CatalogStats, cells_from_rows, load_cells
+
+logger = logging.getLogger(__name__)
+
+# Intervalo (s) da verificação de nova versão publicada (servidor multi-worker)
+CATALOG_POLL_INTERVAL = float(os.getenv("CATALOG_POLL_INTERVAL", "10"))
+
+# Ordem das colunas expostas pela API (mesma da tabela 'books')
+COLUMNS = (
+    "id", "title", "category", "price", "rating",
+    "is_in_stock", "availability_text", "image_url", "book_page_url"
+)
+
+# ===============================
+# Snapshot colunar do catálogo
+# ===============================
+class CatalogSnapshot:
+    """
+    Fotografia imutável da tabela 'books' em memória.
+
+    As colunas numéricas ficam em arrays NumPy e os índices (id, categoria e
+    preço) são calculados uma única vez na construção, de forma que os
+    endpoints de leitura não precisem tocar no banco a cada requisição.
+
+    As estatísticas vêm das células da tabela de resumo 'book_stats'
+    (`stats_cells`); sem elas, são calculadas a partir das próprias linhas.
+    """
+
+    # `updated_at` e `data_version` de catalog_meta quando o snapshot veio do banco
+    updated_at = None
+    data_version = None
+
+    def __init__(self, rows, version=0, stats_cells=None):
+        n = len(rows)
+        self.version = version
+        self.records = tuple(dict(zip(COLUMNS, row)) for row in rows)
+
+        # Colunas
+        self.ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+        self.titles = np.array([r[1] or "" for r in rows], dtype=object)
+        self.categories = np.array([r[2] for r in rows], dtype=object)
+        self.prices = np.fromiter(
+            (np.nan if r[3] is None else r[3] for r in rows), dtype=np.float64, count=n
+        )
+        self.ratings = np.fromiter((r[4] or 0 for r in rows), dtype=np.int64, count=n)
+        self.in_stock = np.fromiter((bool(r[5]) for r in rows), dtype=np.bool_, count=n)
+
+        self._build(cells_from_rows(rows) if stats_cells is None else stats_cells)
+
+    @classmethod
+    def from_columns(cls, records, ids, prices, ratings, in_stock, stats_cells,
+                     version=0, encoded=None, search_index=None):
+        """
+        Monta o snapshot a partir de colunas já prontas (artefato do catálogo,
+        ver core/artifact.py), sem reprocessar as linhas. `encoded` e
+        `search_index`, quando vierem prontos, dispensam a construção sob
+        demanda.
+        """
+        snapshot = cls.__new__(cls)
+        snapshot.version = version
+        snapshot.records = tuple(records)
+        snapshot.ids, snapshot.prices, snapshot.ratings, snapshot.in_stock = ids, prices, ratings, in_stock
+        snapshot.titles = np.array([r["title"] or "" for r in snapshot.records], dtype=object)
+        snapshot.categories = np.array([r["category"] for r in snapshot.records], dtype=object)
+        snapshot._build(stats_cells)
+        snapshot._encoded = encoded
+        snapshot._search_index = search_index
+        return snapshot
+
+    def _build(self, stats_cells):
+        # Índice por id
+        self._id_index = {int(book_id): pos for pos, book_id in enumerate(self.ids)}
+
+        # Índice por categoria (posições em ordem de id)
+        by_category = {}
+        for pos, category in enumerate(self.categories):
+            if category is not None:
+                by_category.setdefault(category, []).append(pos)
+        self._category_index = {
+            category: np.array(positions, dtype=np.int64)
+            for category, positions in by_category.items()
+        }
+        self.category_names = sorted(self._category_index)
+
+        # Índice por preço (posições ordenadas pelo preço)
+        self._price_order = np.argsort(self.prices, kind="stable")
+        self._sorted_prices = self.prices[self._price_order]
+
+        # Ordem do ranking: rating DESC, price DESC
+        self._top_rated_order = np.lexsort((-self.prices, -self.ratings))
+
+        self.stats_cells = stats_cells
+        self.stats = CatalogStats(
+            stats_cells,
+            self._sorted_prices,
+            {
+                category: np.sort(self.prices[positions])
+                for category, positions in self._category_index.items()
+            },
+        )
+
+        # Índice de busca e JSON de cada livro construídos sob demanda
+        self._search_index = None
+        self._search_lock = threading.Lock()
+        self._encoded = None
+        self._encode_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.records)
+
+    # --------------------------
+    # Consultas
+    # --------------------------
+    def rows(self, positions):
+        records = self.records
+        return [records[pos] for pos in positions]
+
+    def all(self):
+        return list(self.records)
+
+    def get(self, book_id):
+        pos = self._id_index.get(book_id)
+        return None if pos is None else self.records[pos]
+
+    def get_many(self, book_ids):
+        """
+        Livros dos ids pedidos, na ordem pedida e sem repetições; ids
+        inexistentes são ignorados. Uma consulta ao índice por id.
+        """
+        index, records, seen, found = self._id_index, self.records, set(), []
+        for book_id in book_ids:
+            pos = index.get(book_id)
+            if pos is not None and book_id not in seen:
+                seen.add(book_id)
+                found.append(records[pos])
+        return found
+
+    @property
+    def search_index(self):
+        if self._search_index is None:
+            self._build_search_index()
+        return self._search_index
+
+    @property
+    def encoded(self):
+        """
+        JSON (bytes) de cada livro por id, codificado uma única vez por snapshot.
+        """
+        if self._encoded is None:
+            self._build_encoded()
+        return self._encoded
+
+    def _build_search_index(self):
+        with self._search_lock:
+            if self._search_index is None:
+                self._search_index = SearchIndex(self.titles, self.categories)
+
+    def _build_encoded(self):
+        with self._encode_lock:
+            if self._encoded is None:
+                self._encoded = {record["id"]: dumps(record) for record in self.records}
+
+    def prepare(self):
+        """
+        Monta já o JSON de cada livro e o índice de busca, que senão seriam
+        construídos na primeira consulta que os usa (aquecimento da API).
+        Devolve o próprio snapshot.
+        """
+        self._build_encoded()
+        self._build_search_index()
+        return self
+
+    def encode(self, records, fields=None):
+        """
+        Array JSON de livros do snapshot, montado com o JSON já pronto de cada
+        um. Com `fields`, só essas colunas são lidas e codificadas.
+        """
+        with timed("serialize"):
+            if fields is not None:
+                return dumps([{field: record[field] for field in fields} for record in records])
+            encoded = self.encoded
+            return join_encoded([encoded[record["id"]] for record in records])
+
+    def search(self, title=None, category=None, limit=None, offset=0):
+        return self.rows(self.search_index.search(
+            title=title, category=category, limit=limit, offset=offset
+        ))
+
+    def top_rated(self, limit):
+        return self.rows(self._top_rated_order[:limit])
+
+    def price_range(self, min_price, max_price, limit=None):
+        start = np.searchsorted(self._sorted_prices, min_price, side="left")
+        stop = np.searchsorted(self._sorted_prices, max_price, side="right")
+        return self.rows(np.sort(self._price_order[start:stop])[:limit])
+
+    # --------------------------
+    # Estatísticas
+    # --------------------------
+    def overview(self):
+        return self.stats.overview
+
+    def category_stats(self):
+        return self.stats.categories
+
+
+# ===============================
+# Versão do catálogo
+# ===============================
+# Número persistido em 'catalog_meta' (core/schema.py) e incrementado pela
+# ingestão sempre que algum livro muda. Identifica o conteúdo do catálogo
+# entre processos (chave de cache e ETag das respostas).
+def bump_catalog_version(conn):
+    """
+    Incrementa a versão do catálogo (chamar dentro da transação de escrita).
+    """
+    ensure_catalog_meta(conn)
+    conn.execute(
+        "UPDATE catalog_meta SET version = version + 1, updated_at = ? WHERE id = 1",
+        (datetime.now(timezone.utc).isoformat(),)
+    )
+    return conn.execute("SELECT version FROM catalog_meta WHERE id = 1").fetchone()[0]
+
+
+def read_data_version(conn):
+    """
+    Versão dos dados do banco, ou None se ele ainda não tem catalog_meta.
+    """
+    try:
+        row = conn.execute("SELECT data_version FROM catalog_meta WHERE id = 1").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return None if row is None else row[0]
+
+
+def read_catalog_meta(conn):
+    """
+    (versão, updated_at, data_version) do banco, ou None se ele não tem
+    catalog_meta.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'catalog_meta'").fetchone() is None:
+        return None
+    row = conn.execute("SELECT version, updated_at FROM catalog_meta WHERE id = 1").fetchone()
+    return None if row is None else (*row, read_data_version(conn))
+
+
+def read_catalog_version(conn):
+    meta = read_catalog_meta(conn)
+    return None if meta is None else meta[0]
+
+
+def published_version(db_path=None):
+    """
+    Versão publicada no banco, lida com uma conexão própria aberta e fechada
+    na hora (não usa o pool: segura no processo mestre, antes do fork).
+    """
+    path = db_path or database.BOOKS_DB_PATH
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        return read_catalog_version(conn)
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+class CatalogVersionWatcher:
+    """
+    Thread que consulta a versão publicada a cada `interval` segundos e
+    chama `on_change(versão)` quando ela muda (ex.: recarregar os workers).
+    """
+
+    def __init__(self, on_change, interval=CATALOG_POLL_INTERVAL, db_path=None, version=None):
+        self.on_change = on_change
+        self.interval = interval
+        self.db_path = db_path
+        self.version = published_version(db_path) if version is None else version
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        version = published_version(self.db_path)
+        if version is None or version == self.version:
+            return False
+        self.version = version
+        self.on_change(version)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="catalog-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+# ===============================
+# Snapshot compartilhado pelo processo
+# ===============================
+_snapshot = None
+_version = 0
+_lock = threading.Lock()
+
+
+def load_catalog(db_path=None, version=0):
+    """
+    Lê a tabela 'books' inteira e constrói um novo snapshot. A versão do
+    snapshot é a do banco (`catalog_meta`); sem ela, usa `version`.
+
+    Se existir um artefato do catálogo (core/artifact.py) gravado para a
+    mesma versão publicada e a mesma versão dos dados (que os triggers de
+    'books' incrementam a cada escrita), o snapshot é carregado dele em vez
+    do banco.
+    """
+    path = db_path or database.BOOKS_DB_PATH
+    with read_connection(path) as conn:
+        meta = read_catalog_meta(conn)
+        if meta is not None:
+            snapshot = _load_artifact(path, meta)
+            if snapshot is not None:
+                return snapshot
+            version = meta[0] or version
+        rows = [
+            tuple(row) for row in
+            conn.execute(f"SELECT {', '.join(COLUMNS)} FROM books ORDER BY id")
+        ]
+        cells = load_cells(conn)
+    snapshot = CatalogSnapshot(rows, version=version, stats_cells=cells)
+    if meta is not None:
+        snapshot.updated_at, snapshot.data_version = meta[1], meta[2]
+    return snapshot
+
+
+def _artifact_key(header):
+    return header["version"], header["updated_at"], header.get("data_version")
+
+
+def _load_artifact(db_path, meta):
+    if not artifact.CATALOG_ARTIFACT:
+        return None
+    path = artifact.artifact_path(db_path)
+    header = artifact.read_header(path)
+    if header is None or _artifact_key(header) != meta:
+        return None
+    try:
+        _, parts = artifact.read_artifact(path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Artefato do catálogo {path} ignorado: {e}")
+        return None
+    snapshot = CatalogSnapshot.from_columns(**parts)
+    snapshot.updated_at, snapshot.data_version = meta[1], meta[2]
+    return snapshot
+
+
+def save_artifact(snapshot, db_path=None):
+    """
+    Grava o artefato do snapshot se o do disco não for da mesma versão
+    (publicada e dos dados).
+    Devolve True quando grava. Falhas de escrita (disco somente leitura)
+    só geram um aviso: o artefato é uma otimização da subida.
+    """
+    if not artifact.CATALOG_ARTIFACT or snapshot.updated_at is None:
+        return False
+    path = artifact.artifact_path(db_path or database.BOOKS_DB_PATH)
+    header = artifact.read_header(path)
+    if header is not None and _artifact_key(header) == (snapshot.version, snapshot.updated_at, snapshot.data_version):
+        return False
+    try:
+        artifact.write_artifact(snapshot, path, snapshot.updated_at, snapshot.data_version)
+    except OSError as e:
+        logger.warning(f"Não foi possível gravar o artefato do catálogo {path}: {e}")
+        return False
+    return True
+
+
+def get_catalog():
+    """
+    Retorna o snapshot atual, construindo-o na primeira chamada.
+    """
+    snapshot = _snapshot
+    if snapshot is None:
+        with _lock:
+            if _snapshot is None:
+                _swap(load_catalog(version=_version + 1))
+            snapshot = _snapshot
+    return snapshot
+
+
+def refresh_catalog():
+    """
+    Reconstrói o snapshot a partir do banco e o troca atomicamente.
+    Requisições em andamento continuam usando o snapshot antigo.
+    """
+    with _lock:
+        _swap(load_catalog(version=_version + 1))
+        return _snapshot
+
+
+def _swap(snapshot):
+    global _snapshot, _version
+    _version = snapshot.version
+    _snapshot = snapshot
@@ -0,0 +1,324 @@
+import asyncio
+import contextvars
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from core.metrics import record_phase
+
+# --- Configuração (sobrescrita por variáveis de ambiente) ---
+BOOKS_DB_PATH = os.getenv("BOOKS_DB_PATH", "data/books.db")
+USERS_DB_PATH = os.getenv("USERS_DB_PATH", "data/users.db")
+READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", str(64 * 1024)))
+STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+# Executor das consultas dos endpoints assíncronos
+QUERY_WORKERS = int(os.getenv("DB_QUERY_WORKERS", str(READ_POOL_SIZE)))
+QUERY_QUEUE_SIZE = int(os.getenv("DB_QUERY_QUEUE_SIZE", "128"))
+QUERY_TIMEOUT = float(os.getenv("DB_QUERY_TIMEOUT", "10"))
+
+
+def _connect(path):
+    conn = sqlite3.connect(
+        path,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        isolation_level=None,
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+# ===============================
+# Pool de conexões de leitura
+# ===============================
+class ReadPool:
+    """
+    Pool limitado de conexões somente leitura (`query_only`) para um banco.
+
+    As conexões são criadas sob demanda até `size` e reaproveitadas entre
+    requisições, preservando o cache de páginas, o mapeamento em memória e
+    o cache de statements preparados. Quando todas estão em uso, quem pede
+    uma conexão espera até `timeout` segundos.
+    """
+
+    def __init__(self, path, size=READ_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self, timeout):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    conn = _connect(self.path)
+                    conn.execute("PRAGMA query_only=1")
+                    return conn
+                except Exception:
+                    self._created -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"Nenhuma conexão livre no pool de '{self.path}'.")
+
+    @contextmanager
+    def connection(self, timeout=30):
+        start = time.perf_counter()
+        conn = self._acquire(timeout)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+            # Tempo de banco da requisição: espera pelo pool + uso da conexão
+            record_phase("db", time.perf_counter() - start)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+
+# ===============================
+# Conexão única de escrita
+# ===============================
+class Writer:
+    """
+    Conexão única de escrita por banco (ingestão, migrações), em modo WAL
+    para que os leitores não sejam bloqueados durante a gravação.
+    As transações são serializadas por um lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = _connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Abre uma transação explícita (BEGIN IMMEDIATE) e faz commit ao sair,
+        ou rollback em caso de erro.
+        """
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+# ===============================
+# Executor de consultas (endpoints assíncronos)
+# ===============================
+class DatabaseBusy(Exception):
+    """
+    A fila do executor de consultas está cheia; o chamador deve responder 503.
+    """
+
+
+class QueryTimeout(Exception):
+    """
+    A consulta passou do tempo limite e foi interrompida.
+    """
+
+
+class _Running:
+    """
+    Conexão em uso por uma chamada, protegida por lock: o `interrupt` do
+    tempo limite nunca atinge uma conexão já devolvida ao pool.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.conn = None
+
+    def interrupt(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.interrupt()
+
+
+class QueryExecutor:
+    """
+    Roda as leituras dos endpoints `async def` em threads próprias, fora do
+    threadpool do Starlette e sem bloquear o event loop.
+
+    No máximo `workers` consultas rodam ao mesmo tempo e `queue_size` ficam
+    pendentes (em execução + na fila); além disso a chamada falha na hora
+    com DatabaseBusy, em vez de acumular espera. Cada chamada tem um tempo
+    limite (fila incluída): se ainda estiver na fila, é cancelada; se já
+    estiver no SQLite, a conexão é interrompida (`conn.interrupt()`).
+    """
+
+    def __init__(self, workers=QUERY_WORKERS, queue_size=QUERY_QUEUE_SIZE, timeout=QUERY_TIMEOUT):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._counts = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="db-query")
+        return self._executor
+
+    def _release(self, _future):
+        with self._counts:
+            self.pending -= 1
+        self._slots.release()
+
+    async def run(self, fn, *args, path=None, timeout=None):
+        """
+        `await executor.run(fn, *args)` chama `fn(conn, *args)` com uma
+        conexão do pool de leitura de `path` e devolve o resultado.
+        """
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise DatabaseBusy("Fila de consultas ao banco cheia.")
+        with self._counts:
+            self.pending += 1
+        running = _Running()
+
+        def call():
+            with read_connection(path) as conn:
+                with running.lock:
+                    running.conn = conn
+                try:
+                    return fn(conn, *args)
+                finally:
+                    with running.lock:
+                        running.conn = None
+
+        try:
+            # Contexto da requisição (fases do core/metrics.py) segue para a thread
+            future = self._pool().submit(contextvars.copy_context().run, call)
+        except BaseException:
+            self._release(None)
+            raise
+        # A vaga só volta quando a thread termina, mesmo após o tempo limite
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            running.interrupt()
+            self.timeouts += 1
+            raise QueryTimeout("Consulta ao banco excedeu o tempo limite.")
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "timeout": self.timeout,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+# Compartilhado pelos routers; as threads só são criadas no primeiro uso
+query_executor = QueryExecutor()
+
+
+# ===============================
+# Registro por caminho
+# ===============================
+_read_pools = {}
+_writers = {}
+_registry_lock = threading.RLock()
+
+
+def read_pool(path=None):
+    """
+    Pool de leitura do banco `path` (padrão: banco de livros).
+    """
+    path = path or BOOKS_DB_PATH
+    pool = _read_pools.get(path)
+    if pool is None:
+        with _registry_lock:
+            pool = _read_pools.get(path)
+            if pool is None:
+                writer(path)  # garante o arquivo criado e o modo WAL
+                pool = _read_pools[path] = ReadPool(path)
+    return pool
+
+
+def writer(path=None):
+    """
+    Conexão de escrita do banco `path` (padrão: banco de livros).
+    """
+    path = path or BOOKS_DB_PATH
+    instance = _writers.get(path)
+    if instance is None:
+        with _registry_lock:
+            instance = _writers.get(path)
+            if instance is None:
+                instance = _writers[path] = Writer(path)
+    return instance
+
+
+def read_connection(path=None, timeout=30):
+    """
+    Atalho: `with read_connection() as conn: ...`
+    """
+    return read_pool(path).connection(timeout)
+
+
+def close_all():
+    """
+    Fecha todas as conexões abertas (fim do processo, testes).
+    """
+    query_executor.shutdown()
+    with _registry_lock:
+        for pool in _read_pools.values():
+            pool.close()
+        for instance in _writers.values():
+            instance.close()
+        _read_pools.clear()
+        _writers.clear()
@@ -0,0 +1,220 @@
+import copy
+import csv
+import io
+import os
+import zlib
+from core.catalog import COLUMNS
+from core.database import read_connection
+from core.query import SORTS
+from core.serialization import dumps
+
+# --- Dependências opcionais ---
+# Importadas no primeiro uso (o pyarrow sozinho pesa dezenas de ms na subida
+# da API); None depois da tentativa significa "não instalado".
+_NOT_LOADED = object()
+pa = pq = zstandard = _NOT_LOADED
+
+
+def _load_optional():
+    global pa, pq, zstandard
+    if pa is _NOT_LOADED:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            pa = pq = None
+    if zstandard is _NOT_LOADED:
+        try:
+            import zstandard
+        except ImportError:
+            zstandard = None
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+# formato -> (media type, extensão)
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+COMPRESSIONS = ("none", "gzip", "zstd")
+
+
+class ExportUnavailable(ValueError):
+    """
+    Formato ou compressão que depende de um pacote opcional não instalado.
+    """
+
+
+def check_available(fmt, compression):
+    _load_optional()
+    if fmt in ("arrow", "parquet") and pa is None:
+        raise ExportUnavailable(f"O formato '{fmt}' requer o pacote opcional pyarrow (pip install pyarrow).")
+    if compression == "zstd" and zstandard is None:
+        raise ExportUnavailable("A compressão 'zstd' requer o pacote opcional zstandard (pip install zstandard).")
+
+
+# ===============================
+# Leitura em blocos
+# ===============================
+def iter_chunks(query, chunk_size=EXPORT_CHUNK_SIZE, db_path=None):
+    """
+    Percorre o resultado da consulta em blocos de tuplas, paginando por
+    chave (`(coluna, id) > (?, ?)`, como o cursor de /books). Cada bloco
+    pega uma conexão do pool e a devolve antes de ser entregue ao cliente:
+    um cliente lento não segura conexões do pool. Os blocos são lidos em
+    transações separadas; com um scraping gravando ao mesmo tempo, um livro
+    alterado pode sair com os valores novos, mas nenhum livro se repete.
+    """
+    page = copy.copy(query)
+    page.limit = chunk_size
+    column = SORTS[query.sort][0]
+    sort_pos, id_pos = query.columns.index(column), query.columns.index("id")
+    while True:
+        sql, params = page.to_sql()
+        with read_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            try:
+                rows = cursor.execute(sql, params).fetchmany(chunk_size)
+            finally:
+                cursor.close()
+        if not rows:
+            break
+        yield rows
+        if len(rows) < chunk_size:
+            break
+        page.after = (rows[-1][sort_pos], rows[-1][id_pos])
+
+
+# ===============================
+# Codificadores (um bloco de linhas -> bytes)
+# ===============================
+def _ndjson(chunks):
+    for rows in chunks:
+        yield b"".join(dumps(dict(zip(COLUMNS, row))) + b"\n" for row in rows)
+
+
+def _csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+
+class _Sink:
+    """
+    Arquivo só de escrita cujo conteúdo é esvaziado a cada bloco, para que
+    o pyarrow grave direto na resposta sem montar o arquivo inteiro.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def _arrow_schema():
+    return pa.schema([
+        ("id", pa.int64()),
+        ("title", pa.string()),
+        ("category", pa.string()),
+        ("price", pa.float64()),
+        ("rating", pa.int64()),
+        ("is_in_stock", pa.bool_()),
+        ("availability_text", pa.string()),
+        ("image_url", pa.string()),
+        ("book_page_url", pa.string()),
+    ])
+
+
+def _record_batch(schema, rows):
+    columns = list(zip(*rows))
+    columns[5] = [None if v is None else bool(v) for v in columns[5]]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+        schema=schema
+    )
+
+
+def _arrow(chunks):
+    schema = _arrow_schema()
+    sink = _Sink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for rows in chunks:
+            writer.write_batch(_record_batch(schema, rows))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _parquet(chunks):
+    # Cada bloco vira um row group; o rodapé é gravado no fechamento
+    schema = _arrow_schema()
+    sink = _Sink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for rows in chunks:
+            writer.write_batch(_record_batch(schema, rows))
+            yield sink.drain()
+    yield sink.drain()
+
+
+_ENCODERS = {"ndjson": _ndjson, "csv": _csv, "arrow": _arrow, "parquet": _parquet}
+
+
+# ===============================
+# Compressão em fluxo
+# ===============================
+def _compress(stream, compression):
+    if compression == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        flush = compressor.flush
+    elif compression == "zstd":
+        compressor = zstandard.ZstdCompressor().compressobj()
+        flush = compressor.flush
+    else:
+        yield from stream
+        return
+    for data in stream:
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+    yield flush()
+
+
+def export_books(query, fmt="ndjson", compression="none", chunk_size=EXPORT_CHUNK_SIZE, db_path=None):
+    """
+    Gerador de bytes com o resultado de `query` no formato pedido.
+    Memória constante: só um bloco de `chunk_size` linhas é mantido por vez.
+    """
+    check_available(fmt, compression)
+    stream = _ENCODERS[fmt](iter_chunks(query, chunk_size, db_path))
+    for data in _compress(stream, compression):
+        if data:
+            yield data
@@ -0,0 +1,272 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import core.database as database
+from core.schema import migrate_books
+
+logger = logging.getLogger(__name__)
+
+# --- Configuração (sobrescrita por variáveis de ambiente) ---
+# Intervalo (s) em que o processo dono grava o progresso do job no banco
+JOB_HEARTBEAT = float(os.getenv("JOB_HEARTBEAT", "1"))
+# Job ativo sem heartbeat há mais que isso: o processo dono morreu
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "30"))
+
+# Estados possíveis de um job
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+ACTIVE = (QUEUED, RUNNING)
+# `status IN (?, ?)`: os estados ativos vão como parâmetros da consulta
+_IN_ACTIVE = f"status IN ({', '.join('?' * len(ACTIVE))})"
+
+_COLUMNS = "id, kind, status, progress, error, cancel_requested, created_at, started_at, finished_at, heartbeat_at"
+
+
+class JobCancelled(Exception):
+    """
+    Levantada pela tarefa quando percebe que o job foi cancelado.
+    """
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Job:
+    """
+    Execução em segundo plano de uma tarefa longa, no processo atual.
+
+    `progress` é qualquer objeto com `as_dict()` que a tarefa atualiza
+    enquanto roda; `cancel_event` é o sinal de cancelamento cooperativo.
+    """
+
+    def __init__(self, kind, progress):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.progress = progress
+        self.cancel_event = threading.Event()
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+
+    @property
+    def done(self):
+        return self.status not in ACTIVE
+
+    def as_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "progress": self.progress.as_dict(),
+        }
+
+
+class StoredJob:
+    """
+    Job lido da tabela 'jobs' (executado por outro processo, ou já
+    encerrado): mesma interface de leitura de `Job`.
+    """
+
+    def __init__(self, row):
+        self.id, self.kind, self.status = row["id"], row["kind"], row["status"]
+        self.created_at, self.started_at, self.finished_at = row["created_at"], row["started_at"], row["finished_at"]
+        self.error = row["error"]
+        self._progress = json.loads(row["progress"]) if row["progress"] else {}
+
+    @property
+    def done(self):
+        return self.status not in ACTIVE
+
+    def as_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "progress": self._progress,
+        }
+
+
+class JobManager:
+    """
+    Executa tarefas em um worker dedicado, fora das threads que atendem
+    requisições, com execução única (single-flight): enquanto um job está
+    ativo, novos disparos devolvem o job em andamento em vez de iniciar outro.
+
+    O estado fica na tabela 'jobs' do banco de livros, gravada pela conexão
+    de escrita: a verificação do job ativo e a criação do novo acontecem na
+    mesma transação (BEGIN IMMEDIATE), então a execução única vale entre os
+    workers, e qualquer worker consulta ou cancela o job. O processo dono
+    grava o progresso a cada `heartbeat` segundos e, nessa hora, lê os
+    pedidos de cancelamento feitos por outros processos; um job ativo sem
+    heartbeat há `stale_after` segundos é dado como falho.
+
+    A tarefa roda em uma thread do processo que a disparou: morre com ele
+    (reinício do worker) e divide a CPU com as requisições que ele atende.
+    """
+
+    def __init__(self, kind, db_path=None, history=100, heartbeat=JOB_HEARTBEAT, stale_after=JOB_STALE_AFTER):
+        self.kind = kind
+        self._db_path = db_path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"job-{kind}")
+        # Jobs executados por este processo (progresso ao vivo)
+        self._jobs = OrderedDict()
+        self._history = history
+        self.heartbeat = heartbeat
+        self.stale_after = stale_after
+        self._ready = set()
+        self._lock = threading.Lock()
+
+    @property
+    def db_path(self):
+        return self._db_path or database.BOOKS_DB_PATH
+
+    def _ensure_table(self):
+        path = self.db_path
+        if path in self._ready:
+            return path
+        with self._lock:
+            if path not in self._ready:
+                with database.writer(path).transaction() as conn:
+                    migrate_books(conn)
+                self._ready.add(path)
+        return path
+
+    def submit(self, target, progress):
+        """
+        Agenda `target(job)` e devolve (job, criado). Se já houver um job
+        ativo (neste ou em outro processo), devolve esse job e `criado=False`.
+        """
+        path = self._ensure_table()
+        with self._lock, database.writer(path).transaction() as conn:
+            active = self._active_row(conn)
+            if active is not None:
+                return self._view(active), False
+            job = Job(self.kind, progress)
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, progress, created_at, heartbeat_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job.id, job.kind, job.status, json.dumps(progress.as_dict()), job.created_at, time.time())
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE kind = ? AND id NOT IN "
+                "(SELECT id FROM jobs WHERE kind = ? ORDER BY created_at DESC LIMIT ?)",
+                (self.kind, self.kind, self._history)
+            )
+            self._jobs[job.id] = job
+            while len(self._jobs) > self._history:
+                self._jobs.popitem(last=False)
+        self._executor.submit(self._run, job, target)
+        return job, True
+
+    def get(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        with database.read_connection(self._ensure_table()) as conn:
+            row = conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ? AND kind = ?", (job_id, self.kind)).fetchone()
+        return StoredJob(row) if row is not None else None
+
+    def cancel(self, job_id):
+        """
+        Pede o cancelamento do job. Se ele roda em outro processo, o pedido
+        fica na tabela e é atendido no próximo heartbeat do dono.
+        """
+        job = self._jobs.get(job_id)
+        if job is not None:
+            if not job.done:
+                job.cancel_event.set()
+            return job
+        with database.writer(self._ensure_table()).transaction() as conn:
+            conn.execute(
+                f"UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND kind = ? AND {_IN_ACTIVE}",
+                (job_id, self.kind, *ACTIVE)
+            )
+        return self.get(job_id)
+
+    def _active_row(self, conn):
+        row = conn.execute(
+            f"SELECT {_COLUMNS} FROM jobs WHERE kind = ? AND {_IN_ACTIVE} ORDER BY created_at DESC LIMIT 1",
+            (self.kind, *ACTIVE)
+        ).fetchone()
+        if row is None or row["id"] in self._jobs:
+            return row
+        if row["heartbeat_at"] is not None and time.time() - row["heartbeat_at"] <= self.stale_after:
+            return row
+        logger.warning(f"Job {self.kind} {row['id']} sem heartbeat; marcando como falho.")
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+            (FAILED, "O processo que executava o job parou de responder.", _now(), row["id"])
+        )
+        return None
+
+    def _view(self, row):
+        return self._jobs.get(row["id"]) or StoredJob(row)
+
+    def _run(self, job, target):
+        if job.cancel_event.is_set():
+            self._finish(job, CANCELLED)
+            return
+        job.status = RUNNING
+        job.started_at = _now()
+        self._sync(job)
+        stop = threading.Event()
+        beat = threading.Thread(target=self._beat, args=(job, stop), name=f"job-{self.kind}-heartbeat", daemon=True)
+        beat.start()
+        try:
+            target(job)
+            self._finish(job, CANCELLED if job.cancel_event.is_set() else SUCCEEDED)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            logger.exception(f"Job {job.kind} {job.id} falhou.")
+            self._finish(job, FAILED, str(e))
+        finally:
+            stop.set()
+            beat.join()
+
+    def _beat(self, job, stop):
+        while not stop.wait(self.heartbeat):
+            try:
+                self._sync(job)
+            except Exception:
+                logger.exception(f"Falha ao gravar o progresso do job {job.kind} {job.id}.")
+
+    def _sync(self, job):
+        """
+        Grava estado e progresso do job e atende um cancelamento pedido por
+        outro processo.
+        """
+        with database.writer(self.db_path).transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, progress = ?, error = ?, started_at = ?, finished_at = ?, "
+                "heartbeat_at = ? WHERE id = ?",
+                (job.status, json.dumps(job.progress.as_dict()), job.error, job.started_at, job.finished_at,
+                 time.time(), job.id)
+            )
+            cancel_requested, = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job.id,)).fetchone()
+        if cancel_requested and not job.done:
+            job.cancel_event.set()
+
+    def _finish(self, job, status, error=None):
+        job.error = error
+        job.finished_at = _now()
+        job.status = status
+        try:
+            self._sync(job)
+        except Exception:
+            logger.exception(f"Falha ao gravar o fim do job {job.kind} {job.id}.")
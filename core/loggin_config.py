@@ -1,16 +1,213 @@
-
+import atexit
+import copy
+import json
 import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# --- Configuração (sobrescrita por variáveis de ambiente) ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Níveis por módulo: "scripts.scrape_books=DEBUG,urllib3=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text (console; o arquivo é sempre JSON)
+LOG_FILE = os.getenv("LOG_FILE", "tech_challenge.log")
+# Um arquivo por processo (tech_challenge.<pid>.log): a rotação do
+# RotatingFileHandler não é segura com vários processos no mesmo arquivo.
+# O gunicorn.conf.py liga quando há mais de um worker.
+LOG_PER_PROCESS = os.getenv("LOG_PER_PROCESS", "0") == "1"
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Repetições de um mesmo aviso/erro (mesma linha de código) aceitas por janela
+LOG_RATE_LIMIT_BURST = int(os.getenv("LOG_RATE_LIMIT_BURST", "10"))
+LOG_RATE_LIMIT_WINDOW = float(os.getenv("LOG_RATE_LIMIT_WINDOW", "60"))
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+TEXT_DATEFMT = "%m/%d/%Y %I:%M:%S %p"
+
+# Atributos padrão do LogRecord; o resto vem de `extra=` e vai para o JSON
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+# ===============================
+# Formato e filtros
+# ===============================
+class JsonFormatter(logging.Formatter):
+    """
+    Um objeto JSON por linha: ts, level, logger, msg, local da chamada,
+    campos passados em `extra=` e o traceback (exc), quando houver.
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limita avisos e erros repetidos: cada linha de código que loga WARNING
+    ou acima passa no máximo `burst` vezes por janela de `window` segundos.
+    O primeiro registro aceito depois da janela leva o total suprimido no
+    campo `suppressed`. Registros INFO/DEBUG passam sempre.
+    """
+
+    def __init__(self, burst=LOG_RATE_LIMIT_BURST, window=LOG_RATE_LIMIT_WINDOW):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._sites = {}
+        self._lock = threading.Lock()
 
-def logging_config():
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            started, count, suppressed = self._sites.get(key, (now, 0, 0))
+            if now - started >= self.window:
+                started, count = now, 0
+            if count >= self.burst:
+                self._sites[key] = (started, count, suppressed + 1)
+                return False
+            self._sites[key] = (started, count + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
     """
-    Padroniza o formato do logging.
+    Enfileira o registro sem nunca bloquear a thread que loga: com a fila
+    cheia o registro é descartado e contado em `dropped`. A mensagem é
+    formatada aqui (args podem não ser serializáveis mais tarde), mas o
+    traceback fica separado em exc_text para o formato JSON.
     """
-    logging.basicConfig(
-        level=logging.INFO, 
-        format="%(asctime)s - %(levelname)s - %(message).200s",
-        datefmt='%m/%d/%Y %I:%M:%S %p',
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler(".logs")
-        ]
-    )
\ No newline at end of file
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# ===============================
+# Configuração central
+# ===============================
+_lock = threading.Lock()
+_state = {"handler": None, "listener": None}
+
+
+def parse_levels(spec):
+    """
+    "mod.a=DEBUG,mod.b=warning" -> {"mod.a": "DEBUG", "mod.b": "WARNING"}
+    """
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def process_log_file(log_file, pid=None):
+    """
+    "logs/app.log" -> "logs/app.<pid>.log"
+    """
+    base, ext = os.path.splitext(log_file)
+    return f"{base}.{pid or os.getpid()}{ext}"
+
+
+def logging_config(level=LOG_LEVEL, levels=LOG_LEVELS, log_file=LOG_FILE, fmt=LOG_FORMAT,
+                   max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT, queue_size=LOG_QUEUE_SIZE,
+                   per_process=LOG_PER_PROCESS):
+    """
+    Configura o logging do processo: o logger raiz só enfileira registros
+    (NonBlockingQueueHandler) e uma thread de fundo (QueueListener) grava no
+    console e no arquivo com rotação por tamanho. Chame uma vez por processo
+    (no worker, depois do fork); chamadas seguintes não fazem nada.
+    Com `per_process`, cada processo grava no seu próprio arquivo.
+    """
+    with _lock:
+        if _state["listener"] is not None:
+            return _state["handler"]
+
+        console = logging.StreamHandler()
+        console.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT, TEXT_DATEFMT))
+        handlers = [console]
+        if log_file:
+            if per_process:
+                log_file = process_log_file(log_file)
+            directory = os.path.dirname(log_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            file_handler = RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+            )
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+        handler.addFilter(RateLimitFilter())
+        listener = QueueListener(handler.queue, *handlers, respect_handler_level=True)
+        listener.start()
+
+        root = logging.getLogger()
+        root.addHandler(handler)
+        root.setLevel(level.upper())
+        for name, module_level in parse_levels(levels).items():
+            logging.getLogger(name).setLevel(module_level)
+
+        _state.update(handler=handler, listener=listener)
+        return handler
+
+
+def shutdown_logging():
+    """
+    Remove o handler da fila e esvazia a fila (grava o que estiver pendente).
+    """
+    with _lock:
+        handler, listener = _state["handler"], _state["listener"]
+        if listener is None:
+            return
+        logging.getLogger().removeHandler(handler)
+        listener.stop()
+        for target in listener.handlers:
+            target.close()
+        _state.update(handler=None, listener=None)
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,143 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Limites (le) dos histogramas, no padrão do Prometheus
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Tempos por fase da requisição atual (banco, serialização). O objeto é
+# mutável e compartilhado com as threads do threadpool, que recebem uma
+# cópia do contexto.
+_phases = ContextVar("request_phases", default=None)
+
+
+def start_request():
+    phases = {}
+    _phases.set(phases)
+    return phases
+
+
+def record_phase(name, seconds):
+    phases = _phases.get()
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + seconds
+
+
+@contextmanager
+def timed(name):
+    """
+    Soma o tempo do bloco na fase `name` da requisição atual (se houver).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - start)
+
+
+# ===============================
+# Métricas
+# ===============================
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Métricas das requisições HTTP, por rota (template do caminho, não a URL),
+    expostas no formato texto do Prometheus. Os valores são por processo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def _histogram(self, name, labels, buckets):
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(buckets)
+        return histogram
+
+    def observe_request(self, method, route, status, seconds, size, phases):
+        labels = (("method", method), ("route", route))
+        with self._lock:
+            key = labels + (("status", str(status)),)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self._histogram("http_request_duration_seconds", labels, LATENCY_BUCKETS).observe(seconds)
+            self._histogram("http_response_size_bytes", labels, SIZE_BUCKETS).observe(size)
+            for phase, metric in (("db", "db_time_seconds"), ("serialize", "serialization_time_seconds")):
+                if phase in phases:
+                    self._histogram(metric, labels, LATENCY_BUCKETS).observe(phases[phase])
+
+    def register_collector(self, name, kind, help_text, collect):
+        """
+        Métrica calculada na hora da coleta: `collect()` devolve
+        [(labels dict, valor), ...].
+        """
+        self._collectors.append((name, kind, help_text, collect))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP http_requests_total Requisições HTTP atendidas.",
+                "# TYPE http_requests_total counter",
+            ]
+            for labels, value in sorted(self._requests.items()):
+                lines.append(f"http_requests_total{_labels(labels)} {value}")
+
+            by_name = {}
+            for (name, labels), histogram in self._histograms.items():
+                by_name.setdefault(name, []).append((labels, histogram))
+            for name in sorted(by_name):
+                lines += [f"# HELP {name} {_HELP[name]}", f"# TYPE {name} histogram"]
+                for labels, histogram in sorted(by_name[name], key=lambda item: item[0]):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+        for name, kind, help_text, collect in self._collectors:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, value in collect():
+                lines.append(f"{name}{_labels(tuple(labels.items()))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+_HELP = {
+    "http_request_duration_seconds": "Latência das requisições HTTP.",
+    "http_response_size_bytes": "Tamanho do corpo das respostas.",
+    "db_time_seconds": "Tempo com conexão de banco em uso por requisição.",
+    "serialization_time_seconds": "Tempo de serialização JSON por requisição.",
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+registry = MetricsRegistry()
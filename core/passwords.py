@@ -0,0 +1,139 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from passlib.context import CryptContext
+
+# --- Configuração (sobrescrita por variáveis de ambiente) ---
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "64"))
+# Prioridade menor para os processos de hashing: as leituras vencem a disputa por CPU
+HASH_NICE = int(os.getenv("PASSWORD_HASH_NICE", "10"))
+
+
+def make_context(rounds=BCRYPT_ROUNDS):
+    """
+    Contexto do passlib com custo fixo: hashes com custo diferente (maior ou
+    menor) são marcados para atualização e refeitos no próximo login.
+    """
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+# ===============================
+# Funções executadas nos processos do pool
+# ===============================
+_contexts = {}
+
+
+def _init_worker(nice):
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+
+
+def _context(rounds):
+    context = _contexts.get(rounds)
+    if context is None:
+        context = _contexts[rounds] = make_context(rounds)
+    return context
+
+
+def hash_password(password, rounds=BCRYPT_ROUNDS):
+    return _context(rounds).hash(password)
+
+
+def verify_password(password, hashed_password, rounds=BCRYPT_ROUNDS):
+    """
+    Devolve (senha confere, novo hash ou None). O novo hash vem preenchido
+    quando o custo configurado mudou e o hash precisa ser refeito.
+    """
+    try:
+        return _context(rounds).verify_and_update(password, hashed_password)
+    except ValueError:
+        # Hash em formato desconhecido (ex.: senha legada em texto puro)
+        return False, None
+
+
+# ===============================
+# Pool de processos com fila limitada
+# ===============================
+class HasherBusy(Exception):
+    """
+    A fila do pool de hashing está cheia; o chamador deve responder 503.
+    """
+
+
+class PasswordHasher:
+    """
+    Executa o bcrypt (~100–300 ms de CPU por chamada) em um pool dedicado de
+    processos, fora do event loop e do threadpool que atende as leituras.
+
+    No máximo `queue_size` operações ficam pendentes (em execução + na fila);
+    além disso a chamada falha imediatamente com HasherBusy em vez de
+    acumular espera. O pool é criado no primeiro uso, dentro do worker.
+    """
+
+    def __init__(self, workers=HASH_WORKERS, queue_size=HASH_QUEUE_SIZE, rounds=BCRYPT_ROUNDS, nice=HASH_NICE):
+        self.workers = workers
+        self.nice = nice
+        self.queue_size = queue_size
+        self.rounds = rounds
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # forkserver: os filhos não herdam as threads do servidor
+                    methods = multiprocessing.get_all_start_methods()
+                    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=context,
+                        initializer=_init_worker,
+                        initargs=(self.nice,)
+                    )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HasherBusy("Fila de hashing de senhas cheia.")
+        self.pending += 1
+        try:
+            return await asyncio.wrap_future(self._pool().submit(fn, *args))
+        finally:
+            self.pending -= 1
+            self._slots.release()
+
+    async def hash(self, password):
+        return await self._run(hash_password, password, self.rounds)
+
+    async def verify(self, password, hashed_password):
+        return await self._run(verify_password, password, hashed_password, self.rounds)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "rounds": self.rounds,
+            "pending": self.pending,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,90 @@
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+# --- Configuração (sobrescrita por variáveis de ambiente) ---
+# Fração das requisições amostradas (0 desliga o profiler)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_STACKS = int(os.getenv("PROFILE_MAX_STACKS", "10000"))
+
+
+class StackSampler:
+    """
+    Profiler por amostragem de pilhas (no estilo do py-spy), feito para rodar
+    em produção: enquanto houver ao menos uma requisição amostrada em
+    andamento, uma thread lê as pilhas de todas as threads a cada
+    `interval` segundos e conta as pilhas no formato "folded"
+    (`arquivo:função;arquivo:função N`), aceito por flamegraph.pl/speedscope.
+
+    Sem requisições amostradas a thread fica parada, sem custo.
+    """
+
+    def __init__(self, sample_rate=PROFILE_SAMPLE_RATE, interval=PROFILE_INTERVAL_MS / 1000, max_stacks=PROFILE_MAX_STACKS):
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.stacks = Counter()
+        self.samples = 0
+        self.requests = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._thread = None
+
+    def should_sample(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def begin(self):
+        with self._lock:
+            self._active += 1
+            self.requests += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+            self._wake.notify()
+
+    def end(self):
+        with self._lock:
+            self._active -= 1
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            with self._lock:
+                while self._active == 0:
+                    self._wake.wait()
+            self._sample(own)
+            time.sleep(self.interval)
+
+    def _sample(self, own):
+        frames = sys._current_frames()
+        with self._lock:
+            self.samples += 1
+            for thread_id, frame in frames.items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                if key in self.stacks or len(self.stacks) < self.max_stacks:
+                    self.stacks[key] += 1
+
+    def folded(self):
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+            self.requests = 0
+
+
+sampler = StackSampler()
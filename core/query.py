@@ -0,0 +1,173 @@
+import base64
+import json
+from core.catalog import COLUMNS
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Ordenações aceitas (todas cobertas por índice); o id desempata e torna a
+# ordem total, o que permite paginação por cursor (keyset). Preço e
+# avaliação podem ser nulos: como no SQLite, os nulos vêm primeiro na ordem
+# crescente e por último na decrescente.
+SORTS = {
+    "id": ("id", "ASC"),
+    "-id": ("id", "DESC"),
+    "price": ("price", "ASC"),
+    "-price": ("price", "DESC"),
+    "rating": ("rating", "ASC"),
+    "-rating": ("rating", "DESC"),
+}
+
+
+# Tipos aceitos no valor do cursor, por coluna de ordenação (JSON não
+# distingue 10 de 10.0 em preços inteiros); None vem de colunas nulas
+CURSOR_TYPES = {
+    "id": (int,),
+    "price": (int, float, type(None)),
+    "rating": (int, type(None)),
+}
+
+
+class InvalidCursor(ValueError):
+    """
+    Cursor malformado ou gerado para outra ordenação.
+    """
+
+
+def encode_cursor(sort, row, columns=COLUMNS):
+    column, _ = SORTS[sort]
+    payload = json.dumps([sort, row[columns.index(column)], row[columns.index("id")]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Cursor inválido.")
+    if cursor_sort != sort:
+        raise InvalidCursor("O cursor foi gerado para outra ordenação.")
+    # bool é subclasse de int, mas nunca sai de uma coluna do catálogo
+    column, _ = SORTS[sort]
+    if (
+        isinstance(value, bool) or not isinstance(value, CURSOR_TYPES[column])
+        or isinstance(last_id, bool) or not isinstance(last_id, int)
+    ):
+        raise InvalidCursor("Cursor inválido.")
+    return value, last_id
+
+
+class BookQuery:
+    """
+    Consulta composta sobre a tabela 'books' (filtros, ordenação e paginação
+    por cursor) traduzida para SQL parametrizado.
+
+    A paginação usa a última chave vista (`(coluna, id) > (?, ?)`) em vez de
+    OFFSET, então cada página custa o mesmo independentemente da posição.
+    Como `(NULL, id) > (?, ?)` nunca é verdadeiro, o predicado trata à parte
+    as chaves nulas de preço e avaliação.
+
+    `fields` restringe as colunas lidas (projeção no SELECT); com
+    paginação, o id e a coluna da ordenação entram no fim da lista para
+    montar o cursor. Só colunas de índice (ex.: `id,price` ordenado por
+    preço) dispensam a leitura da tabela.
+    """
+
+    def __init__(
+        self,
+        category=None,
+        min_price=None,
+        max_price=None,
+        min_rating=None,
+        max_rating=None,
+        in_stock=None,
+        sort="id",
+        limit=DEFAULT_LIMIT,
+        cursor=None,
+        fields=None,
+    ):
+        if sort not in SORTS:
+            raise ValueError(f"Ordenação inválida: {sort}")
+        unknown = set(fields or ()) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Campos inválidos: {', '.join(sorted(unknown))}")
+        self.category = category
+        self.min_price = min_price
+        self.max_price = max_price
+        self.min_rating = min_rating
+        self.max_rating = max_rating
+        self.in_stock = in_stock
+        self.sort = sort
+        # limit=None: sem paginação (exportação em fluxo)
+        self.limit = None if limit is None else min(limit, MAX_LIMIT)
+        self.after = decode_cursor(cursor, sort) if cursor else None
+        # Colunas devolvidas ao cliente e colunas lidas (as primeiras + as do cursor)
+        self.fields = tuple(fields) if fields else COLUMNS
+        keys = ("id", SORTS[sort][0]) if self.limit is not None else ()
+        self.columns = self.fields + tuple(dict.fromkeys(key for key in keys if key not in self.fields))
+
+    def to_sql(self):
+        where, params = [], []
+        for clause, value in (
+            ("category = ?", self.category),
+            ("price >= ?", self.min_price),
+            ("price <= ?", self.max_price),
+            ("rating >= ?", self.min_rating),
+            ("rating <= ?", self.max_rating),
+        ):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        if self.in_stock is not None:
+            where.append("is_in_stock = ?")
+            params.append(1 if self.in_stock else 0)
+
+        column, direction = SORTS[self.sort]
+        if self.after is not None:
+            value, last_id = self.after
+            operator = ">" if direction == "ASC" else "<"
+            if column == "id":
+                where.append(f"id {operator} ?")
+                params.append(last_id)
+            elif value is None:
+                # Comparar com NULL nunca é verdadeiro: o resto dos nulos
+                # segue pelo id e, na ordem crescente, depois vêm os não nulos
+                where.append(
+                    f"({column} IS NULL AND id > ? OR {column} IS NOT NULL)" if direction == "ASC"
+                    else f"{column} IS NULL AND id < ?"
+                )
+                params.append(last_id)
+            else:
+                # Na ordem decrescente os nulos ficam depois de qualquer valor
+                where.append(
+                    f"({column}, id) > (?, ?)" if direction == "ASC"
+                    else f"(({column}, id) < (?, ?) OR {column} IS NULL)"
+                )
+                params.extend((value, last_id))
+
+        order = f"{column} {direction}" if column == "id" else f"{column} {direction}, id {direction}"
+        sql = f"SELECT {', '.join(self.columns)} FROM books"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order}"
+        if self.limit is not None:
+            # Busca uma linha a mais para saber se existe próxima página
+            sql += " LIMIT ?"
+            params.append(self.limit + 1)
+        return sql, params
+
+    def execute(self, conn):
+        """
+        Executa a consulta e devolve (linhas, cursor da próxima página ou None).
+        As linhas são tuplas na ordem de `self.columns` (COLUMNS sem projeção).
+        """
+        sql, params = self.to_sql()
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        rows = cursor.execute(sql, params).fetchall()
+        if len(rows) <= self.limit:
+            return rows, None
+        rows = rows[:self.limit]
+        return rows, encode_cursor(self.sort, rows[-1], self.columns)
+
@@ -0,0 +1,83 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Limitador de taxa do tipo token bucket, seguro para múltiplas threads.
+
+    `rate` é a quantidade de fichas repostas por segundo e `capacity` o
+    tamanho da rajada permitida. Com `rate` nulo ou zero não há limite.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate or 0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """
+        Consome fichas se houver saldo; não bloqueia.
+        """
+        if not self.rate:
+            return True
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        """
+        Bloqueia até conseguir consumir as fichas pedidas.
+        """
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class ConcurrencyLimit:
+    """
+    Limita quantas operações simultâneas cada chave (ex.: IP) pode ter.
+    Com `limit` nulo ou zero não há limite.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key):
+        if not self.limit:
+            return True
+        with self._lock:
+            active = self._active.get(key, 0)
+            if active >= self.limit:
+                return False
+            self._active[key] = active + 1
+            return True
+
+    def release(self, key):
+        if not self.limit:
+            return
+        with self._lock:
+            active = self._active.get(key, 0) - 1
+            if active > 0:
+                self._active[key] = active
+            else:
+                self._active.pop(key, None)
@@ -0,0 +1,435 @@
+import logging
+import os
+import re
+import threading
+import zlib
+import numpy as np
+import core.database as database
+from core.search import normalize
+
+logger = logging.getLogger(__name__)
+
+# --- Configuração (sobrescrita por variáveis de ambiente) ---
+# Vizinhos guardados por livro (teto do `limit` de /books/{id}/similar)
+NEIGHBORS_K = int(os.getenv("RECOMMEND_NEIGHBORS", "20"))
+# Dimensões do TF-IDF dos títulos (tokens espalhados por hash)
+TITLE_DIMS = int(os.getenv("RECOMMEND_TITLE_DIMS", "256"))
+# Acima desta fração de livros alterados, recalcula o índice inteiro
+FULL_REBUILD_RATIO = float(os.getenv("RECOMMEND_FULL_REBUILD_RATIO", "0.2"))
+# Similaridades calculadas por bloco da multiplicação (limita a memória a
+# ~64 MB em float32, qualquer que seja o tamanho do catálogo)
+BLOCK_ELEMENTS = 16_000_000
+
+# Peso de cada grupo de atributos no vetor do livro
+WEIGHTS = {"category": 1.0, "title": 1.0, "price": 0.5, "rating": 0.5, "in_stock": 0.2}
+
+_TOKEN = re.compile(r"\w+")
+
+
+def neighbors_path(db_path):
+    """
+    Índice ao lado do banco: data/books.db -> data/books.neighbors.npz
+    """
+    return os.path.splitext(db_path)[0] + ".neighbors.npz"
+
+
+def fingerprints(snapshot):
+    """
+    Hash (crc32) dos atributos que entram no vetor de cada livro, na ordem
+    de `snapshot.ids`: só os livros com hash diferente são recalculados.
+    """
+    return np.fromiter(
+        (
+            zlib.crc32(
+                f"{r['title']}\x1f{r['category']}\x1f{r['price']}\x1f{r['rating']}\x1f{bool(r['is_in_stock'])}"
+                .encode()
+            )
+            for r in snapshot.records
+        ),
+        dtype=np.uint32, count=len(snapshot),
+    )
+
+
+# ===============================
+# Vetores dos livros
+# ===============================
+class FeatureSpace:
+    """
+    Transforma as colunas do snapshot em uma matriz float32 com uma linha
+    normalizada (L2) por livro, de forma que o produto escalar seja a
+    similaridade de cosseno:
+
+    - categoria: one-hot
+    - título: TF-IDF dos tokens, com cada token espalhado em `dims` colunas
+      por hash (tamanho fixo, independente do vocabulário)
+    - preço: log do preço padronizado (média 0, desvio 1); sem preço, 0
+    - avaliação: centrada em 3 e dividida por 2 (de -1,5 a 1)
+    - estoque: +1 / -1
+
+    Os parâmetros (categorias, IDF, média e desvio do preço) vêm do catálogo
+    da última reconstrução completa e são reaproveitados nas atualizações
+    incrementais, para que os vetores antigos continuem comparáveis.
+    """
+
+    def __init__(self, categories, idf, price_mean, price_std, dims=TITLE_DIMS):
+        self.categories = list(categories)
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.price_mean = float(price_mean)
+        self.price_std = float(price_std)
+        self.dims = dims
+        self._category_index = {name: i for i, name in enumerate(self.categories)}
+
+    @classmethod
+    def fit(cls, snapshot, dims=TITLE_DIMS):
+        counts = _title_counts(snapshot.titles, dims)
+        df = np.count_nonzero(counts, axis=0)
+        idf = np.log((1 + len(snapshot)) / (1 + df)) + 1
+        prices = np.log1p(snapshot.prices[~np.isnan(snapshot.prices)])
+        mean, std = (float(prices.mean()), float(prices.std())) if len(prices) else (0.0, 0.0)
+        return cls(snapshot.category_names, idf, mean, std or 1.0, dims)
+
+    def covers(self, snapshot):
+        return all(name in self._category_index for name in snapshot.category_names)
+
+    def transform(self, snapshot):
+        n = len(snapshot)
+        n_categories = len(self.categories)
+        features = np.zeros((n, n_categories + self.dims + 3), dtype=np.float32)
+
+        for row, category in enumerate(snapshot.categories):
+            column = self._category_index.get(category)
+            if column is not None:
+                features[row, column] = WEIGHTS["category"]
+
+        title = _title_counts(snapshot.titles, self.dims) * self.idf
+        norms = np.linalg.norm(title, axis=1, keepdims=True)
+        np.divide(title, norms, out=title, where=norms > 0)
+        features[:, n_categories:n_categories + self.dims] = title * WEIGHTS["title"]
+
+        prices = (np.log1p(snapshot.prices) - self.price_mean) / self.price_std
+        features[:, -3] = np.nan_to_num(prices, nan=0.0) * WEIGHTS["price"]
+        features[:, -2] = (snapshot.ratings - 3) / 2 * WEIGHTS["rating"]
+        features[:, -1] = np.where(snapshot.in_stock, 1.0, -1.0) * WEIGHTS["in_stock"]
+
+        norms = np.linalg.norm(features, axis=1, keepdims=True)
+        np.divide(features, norms, out=features, where=norms > 0)
+        return features
+
+
+def _title_counts(titles, dims):
+    counts = np.zeros((len(titles), dims), dtype=np.float32)
+    for row, title in enumerate(titles):
+        for token in _TOKEN.findall(normalize(title)):
+            counts[row, zlib.crc32(token.encode()) % dims] += 1
+    return counts
+
+
+def _top_k(scores, ids, k):
+    """
+    Os `k` maiores de cada linha de `scores` (desc), como (ids, scores).
+    Linhas com menos candidatos válidos (-inf) completam com id -1.
+    """
+    ids = np.broadcast_to(ids, scores.shape) if ids.ndim == 1 else ids
+    if scores.shape[1] < k:
+        missing = k - scores.shape[1]
+        scores = np.pad(scores, ((0, 0), (0, missing)), constant_values=-np.inf)
+        ids = np.pad(ids, ((0, 0), (0, missing)), constant_values=-1)
+    if k < scores.shape[1]:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.argsort(-scores, axis=1)
+    top = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-top, axis=1, kind="stable")
+    part = np.take_along_axis(part, order, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    chosen = np.take_along_axis(ids, part, axis=1)
+    return np.where(np.isfinite(top), chosen, -1), top
+
+
+# ===============================
+# Índice de vizinhos
+# ===============================
+class NeighborIndex:
+    """
+    Os `k` livros mais parecidos com cada livro do catálogo, pré-calculados.
+
+    `neighbors[i]` traz os ids dos vizinhos de `ids[i]` em ordem decrescente
+    de similaridade (`scores[i]`), completados com -1 em catálogos pequenos.
+    Consultar os vizinhos de um livro é O(k); o custo (multiplicação de
+    matrizes em blocos) fica na construção, feita na ingestão e na subida.
+
+    Os candidatos de um livro são os da sua categoria quando ela tem mais de
+    `k` outros livros (`restricted[i]`); nas categorias menores (e sem
+    categoria), o catálogo inteiro. Assim a construção custa a soma dos
+    quadrados das categorias em vez do quadrado do catálogo.
+    """
+
+    def __init__(self, ids, fingerprints, neighbors, scores, restricted, space):
+        self.ids = ids
+        self.fingerprints = fingerprints
+        self.neighbors = neighbors
+        self.scores = scores
+        self.restricted = restricted
+        self.space = space
+        # Versão do catálogo com que o índice foi conferido (refresh_neighbors)
+        self.version = None
+        self._positions = {int(book_id): pos for pos, book_id in enumerate(ids)}
+
+    @property
+    def k(self):
+        return self.neighbors.shape[1]
+
+    def matches(self, snapshot, prints=None):
+        prints = fingerprints(snapshot) if prints is None else prints
+        return np.array_equal(self.ids, snapshot.ids) and np.array_equal(self.fingerprints, prints)
+
+    # --------------------------
+    # Construção
+    # --------------------------
+    @classmethod
+    def build(cls, snapshot, k=NEIGHBORS_K, prints=None):
+        space = FeatureSpace.fit(snapshot)
+        features = space.transform(snapshot)
+        ids = np.asarray(snapshot.ids, dtype=np.int64)
+        n = len(ids)
+        neighbors = np.full((n, k), -1, dtype=np.int64)
+        scores = np.full((n, k), -np.inf, dtype=np.float32)
+        partitions, restricted = _partitions(snapshot.categories, k)
+        for rows, candidates in partitions:
+            block_rows = _block_rows(len(candidates))
+            for start in range(0, len(rows), block_rows):
+                block = rows[start:start + block_rows]
+                neighbors[block], scores[block] = _rows_top_k(features, ids, block, candidates, k)
+        prints = fingerprints(snapshot) if prints is None else prints
+        return cls(ids, prints, neighbors, scores, restricted, space)
+
+    def update(self, snapshot, prints=None):
+        """
+        Novo índice para `snapshot` a partir deste, recalculando só o que as
+        mudanças afetam:
+
+        - livros novos ou alterados: linha inteira (contra seus candidatos)
+        - livros cuja lista tinha um livro alterado ou removido, ou cujo
+          conjunto de candidatos mudou: linha inteira
+        - os demais: a lista atual é combinada com a similaridade contra os
+          livros novos ou alterados, que podem ter entrado no top-k
+
+        Com muitas mudanças (ou categorias novas) reconstrói tudo.
+        """
+        prints = fingerprints(snapshot) if prints is None else prints
+        old = {int(book_id): int(fp) for book_id, fp in zip(self.ids, self.fingerprints)}
+        current = snapshot.ids.tolist()
+        dirty = [pos for pos, book_id in enumerate(current) if old.get(book_id) != int(prints[pos])]
+        removed = set(old) - set(current)
+        stale = {current[pos] for pos in dirty} | removed
+        if not self.space.covers(snapshot) or len(dirty) + len(removed) > FULL_REBUILD_RATIO * max(len(current), 1):
+            return NeighborIndex.build(snapshot, self.k, prints)
+
+        n, k = len(current), self.k
+        ids = np.asarray(snapshot.ids, dtype=np.int64)
+        neighbors = np.full((n, k), -1, dtype=np.int64)
+        scores = np.full((n, k), -np.inf, dtype=np.float32)
+        kept = np.array([self._positions.get(book_id, -1) for book_id in current], dtype=np.int64)
+        has_old = kept >= 0
+        neighbors[has_old] = self.neighbors[kept[has_old]]
+        scores[has_old] = self.scores[kept[has_old]]
+        partitions, restricted = _partitions(snapshot.categories, k)
+
+        is_dirty = np.zeros(n, dtype=bool)
+        is_dirty[dirty] = True
+        recompute = is_dirty.copy()
+        recompute |= np.isin(neighbors, np.fromiter(stale, dtype=np.int64, count=len(stale))).any(axis=1)
+        recompute[has_old] |= self.restricted[kept[has_old]] != restricted[has_old]
+
+        features = self.space.transform(snapshot)
+        for rows, candidates in partitions:
+            block_rows = _block_rows(len(candidates))
+            again = rows[recompute[rows]]
+            for start in range(0, len(again), block_rows):
+                block = again[start:start + block_rows]
+                neighbors[block], scores[block] = _rows_top_k(features, ids, block, candidates, k)
+
+            clean = rows[~recompute[rows]]
+            changed = candidates[is_dirty[candidates]]
+            if not len(clean) or not len(changed):
+                continue
+            for start in range(0, len(clean), block_rows):
+                block = clean[start:start + block_rows]
+                similarity = features[block] @ features[changed].T
+                merged_ids = np.concatenate([neighbors[block], np.broadcast_to(ids[changed], similarity.shape)], axis=1)
+                merged = np.concatenate([scores[block], similarity], axis=1)
+                neighbors[block], scores[block] = _top_k(merged, merged_ids, k)
+
+        return NeighborIndex(ids, prints, neighbors, scores, restricted, self.space)
+
+    # --------------------------
+    # Consultas
+    # --------------------------
+    def similar(self, book_id, limit=NEIGHBORS_K):
+        """
+        Ids dos livros mais parecidos com `book_id`, ou None se ele não existe.
+        """
+        pos = self._positions.get(book_id)
+        if pos is None:
+            return None
+        row = self.neighbors[pos, :limit]
+        return row[row >= 0].tolist()
+
+    def recommend(self, book_ids, limit=NEIGHBORS_K):
+        """
+        Livros recomendados para quem gostou de `book_ids`: soma das
+        similaridades dos vizinhos de cada um (O(len(book_ids) * k)), sem os
+        próprios livros de entrada. Ids desconhecidos são ignorados.
+        """
+        positions = [self._positions[book_id] for book_id in book_ids if book_id in self._positions]
+        if not positions:
+            return []
+        candidates = self.neighbors[positions].ravel()
+        weights = self.scores[positions].ravel()
+        valid = (candidates >= 0) & ~np.isin(candidates, book_ids)
+        unique, inverse = np.unique(candidates[valid], return_inverse=True)
+        totals = np.zeros(len(unique), dtype=np.float64)
+        np.add.at(totals, inverse, weights[valid])
+        order = np.lexsort((unique, -totals))[:limit]
+        return unique[order].tolist()
+
+    # --------------------------
+    # Arquivo
+    # --------------------------
+    def save(self, path):
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp,
+            ids=self.ids, fingerprints=self.fingerprints, neighbors=self.neighbors, scores=self.scores,
+            restricted=self.restricted,
+            categories=np.array(self.space.categories, dtype=str), idf=self.space.idf,
+            price=np.array([self.space.price_mean, self.space.price_std]),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            space = FeatureSpace(
+                data["categories"].tolist(), data["idf"], *data["price"].tolist(), dims=len(data["idf"])
+            )
+            return cls(
+                data["ids"], data["fingerprints"], data["neighbors"], data["scores"], data["restricted"], space
+            )
+
+
+def _block_rows(n):
+    return max(1, BLOCK_ELEMENTS // max(n, 1))
+
+
+def _partitions(categories, k):
+    """
+    Divide o catálogo em [(linhas, candidatos)] (posições em ordem
+    crescente) e devolve também a máscara das linhas restritas à própria
+    categoria.
+    """
+    by_category = {}
+    for pos, category in enumerate(categories):
+        by_category.setdefault(category, []).append(pos)
+    restricted = np.zeros(len(categories), dtype=bool)
+    partitions, everyone = [], []
+    for category, positions in by_category.items():
+        if category is not None and len(positions) > k:
+            positions = np.asarray(positions, dtype=np.int64)
+            restricted[positions] = True
+            partitions.append((positions, positions))
+        else:
+            everyone.extend(positions)
+    if everyone:
+        partitions.append((np.asarray(sorted(everyone), dtype=np.int64), np.arange(len(categories))))
+    return partitions, restricted
+
+
+def _rows_top_k(features, ids, rows, candidates, k):
+    scores = features[rows] @ features[candidates].T
+    # O próprio livro não é vizinho de si mesmo
+    own = np.searchsorted(candidates, rows)
+    inside = own < len(candidates)
+    inside[inside] = candidates[own[inside]] == rows[inside]
+    scores[np.flatnonzero(inside), own[inside]] = -np.inf
+    return _top_k(scores, ids[candidates], k)
+
+
+# ===============================
+# Índice compartilhado pelo processo
+# ===============================
+_index = None
+_rebuilding = False
+_lock = threading.Lock()
+
+
+def refresh_neighbors(snapshot, db_path=None):
+    """
+    Índice de vizinhos em dia com `snapshot`: reaproveita o arquivo gravado
+    se ele corresponde ao catálogo, atualiza incrementalmente se só parte
+    dos livros mudou, e grava o resultado ao lado do banco. Falhas de
+    escrita só geram um aviso.
+    """
+    path = neighbors_path(db_path or database.BOOKS_DB_PATH)
+    prints = fingerprints(snapshot)
+    index = None
+    if os.path.exists(path):
+        try:
+            index = NeighborIndex.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Índice de vizinhos {path} ignorado: {e}")
+    if index is not None and index.k != NEIGHBORS_K:
+        index = None  # outro RECOMMEND_NEIGHBORS: reconstrói
+    if index is not None and index.matches(snapshot, prints):
+        index.version = snapshot.version
+        return index
+
+    index = NeighborIndex.build(snapshot, prints=prints) if index is None else index.update(snapshot, prints)
+    index.version = snapshot.version
+    try:
+        index.save(path)
+    except OSError as e:
+        logger.warning(f"Não foi possível gravar o índice de vizinhos em {path}: {e}")
+    return index
+
+
+def load_neighbors(snapshot, db_path=None):
+    """
+    Prepara o índice de `snapshot` e o instala para as rotas. Roda fora das
+    requisições: na subida (warm_up), depois de uma ingestão e na
+    reconstrução em segundo plano agendada por `get_neighbors`.
+    """
+    global _index
+    index = refresh_neighbors(snapshot, db_path)
+    with _lock:
+        _index = index
+    return index
+
+
+def get_neighbors(snapshot):
+    """
+    Índice de vizinhos da versão de `snapshot`, ou None se o instalado é de
+    outra versão. A requisição nunca calcula o índice: a troca de versão
+    agenda uma reconstrução em segundo plano e a rota responde 503 até ela
+    terminar.
+    """
+    global _rebuilding
+    with _lock:
+        index = _index
+        if index is not None and index.version == snapshot.version:
+            return index
+        start, _rebuilding = not _rebuilding, True
+    if start:
+        threading.Thread(target=_rebuild, args=(snapshot,), name="neighbors-rebuild", daemon=True).start()
+    return None
+
+
+def _rebuild(snapshot):
+    global _rebuilding
+    try:
+        load_neighbors(snapshot)
+    except Exception:
+        logger.exception(f"Falha ao reconstruir o índice de vizinhos da versão {snapshot.version}.")
+    finally:
+        with _lock:
+            _rebuilding = False
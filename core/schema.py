@@ -0,0 +1,271 @@
+import logging
+from datetime import datetime, timezone
+from core.stats import ensure_stats
+
+logger = logging.getLogger(__name__)
+
+# ===============================
+# Esquema único dos bancos
+# ===============================
+# Toda a DDL do projeto mora aqui. A API, o scraper, core/database_config.py
+# e init_db.py chamam `migrate_books`/`migrate_users`, que aplicam em ordem as
+# migrações ainda não registradas em `PRAGMA user_version`. Cada migração só
+# avança o esquema (nunca volta) e é idempotente, então bancos antigos sem
+# versão passam por todas sem perder dados.
+BOOKS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS books (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        category TEXT,
+        price REAL,
+        rating INTEGER,
+        is_in_stock BOOLEAN,
+        availability_text TEXT,
+        image_url TEXT,
+        book_page_url TEXT UNIQUE
+    )
+'''
+BOOK_COLUMNS = (
+    "id", "title", "category", "price", "rating",
+    "is_in_stock", "availability_text", "image_url", "book_page_url",
+)
+
+# Estado das páginas para o crawl incremental
+CRAWL_STATE_TABLE = '''
+    CREATE TABLE IF NOT EXISTS crawl_state (
+        url TEXT PRIMARY KEY,
+        etag TEXT,
+        last_modified TEXT,
+        content_hash TEXT,
+        next_url TEXT,
+        fetched_at TEXT
+    )
+'''
+
+# Índices compostos que cobrem os filtros e ordenações de /books e da
+# exportação. O rowid (id) fica implícito no fim de cada índice, então
+# `ORDER BY coluna, id` e o cursor `(coluna, id) > (?, ?)` são resolvidos
+# pelo próprio índice; lido de trás para frente, (rating) atende
+# `rating DESC, id DESC`.
+BOOK_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_books_category_price ON books (category, price)",
+    "CREATE INDEX IF NOT EXISTS idx_books_category_rating ON books (category, rating)",
+    "CREATE INDEX IF NOT EXISTS idx_books_price ON books (price)",
+    "CREATE INDEX IF NOT EXISTS idx_books_rating ON books (rating)",
+)
+
+# Categoria em ordem de id (`category = ? ORDER BY id` sem ordenação
+# temporária) e o ranking do top-rated (`rating DESC, price DESC, id`):
+# com o rowid implícito, o segundo cobre a consulta que devolve os ids.
+HOT_QUERY_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_books_category ON books (category)",
+    "CREATE INDEX IF NOT EXISTS idx_books_top_rated ON books (rating DESC, price DESC)",
+)
+
+# Número persistido no banco e incrementado pela ingestão sempre que algum
+# livro muda. Identifica o conteúdo do catálogo entre processos (chave de
+# cache e ETag das respostas).
+# `data_version` é incrementado pelos triggers de 'books' a cada linha
+# inserida, alterada ou removida, por qualquer escritor (ingestão, init_db.py,
+# sqlite3 direto): identifica o que as rotas que leem o banco direto
+# (/books, /books/export) enxergam durante um crawl e invalida o artefato
+# do catálogo gravado antes da mudança.
+CATALOG_META_TABLE = '''
+    CREATE TABLE IF NOT EXISTS catalog_meta (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL,
+        updated_at TEXT,
+        data_version INTEGER NOT NULL DEFAULT 0
+    )
+'''
+
+_BUMP_DATA_VERSION = "UPDATE catalog_meta SET data_version = data_version + 1 WHERE id = 1;"
+DATA_VERSION_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS catalog_data_version_insert AFTER INSERT ON books BEGIN {_BUMP_DATA_VERSION} END",
+    f"CREATE TRIGGER IF NOT EXISTS catalog_data_version_delete AFTER DELETE ON books BEGIN {_BUMP_DATA_VERSION} END",
+    f"CREATE TRIGGER IF NOT EXISTS catalog_data_version_update AFTER UPDATE ON books BEGIN {_BUMP_DATA_VERSION} END",
+)
+
+# Jobs em segundo plano (ex.: scraping), compartilhados entre os workers:
+# qualquer processo consulta ou cancela um job, e só um fica ativo por tipo.
+# `heartbeat_at` (epoch) é renovado pelo processo que executa o job.
+JOBS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        status TEXT NOT NULL,
+        progress TEXT,
+        error TEXT,
+        cancel_requested INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL,
+        started_at TEXT,
+        finished_at TEXT,
+        heartbeat_at REAL
+    )
+'''
+
+USERS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE,
+        password TEXT
+    )
+'''
+
+
+# ===============================
+# Migrações
+# ===============================
+def _books_table(conn):
+    """
+    Cria 'books' e 'crawl_state'. Uma tabela 'books' no formato antigo do
+    init_db.py (rating REAL, sem estoque nem URL) é reconstruída no esquema
+    atual, preservando ids e copiando as colunas que existem.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(books)")]
+    if columns and set(BOOK_COLUMNS) - set(columns):
+        logger.info("Convertendo a tabela 'books' antiga para o esquema atual.")
+        conn.execute("ALTER TABLE books RENAME TO books_legacy")
+        conn.execute(BOOKS_TABLE)
+        copied = [column for column in BOOK_COLUMNS if column in columns]
+        select = ["CAST(ROUND(rating) AS INTEGER)" if column == "rating" else column for column in copied]
+        conn.execute(
+            f"INSERT INTO books ({', '.join(copied)}) SELECT {', '.join(select)} FROM books_legacy"
+        )
+        conn.execute("DROP TABLE books_legacy")
+    else:
+        conn.execute(BOOKS_TABLE)
+    conn.execute(CRAWL_STATE_TABLE)
+
+
+def _book_indexes(conn):
+    for ddl in BOOK_INDEXES:
+        conn.execute(ddl)
+
+
+def ensure_catalog_meta(conn):
+    conn.execute(CATALOG_META_TABLE)
+    conn.execute(
+        "INSERT OR IGNORE INTO catalog_meta (id, version, updated_at) VALUES (1, 1, ?)",
+        (datetime.now(timezone.utc).isoformat(),)
+    )
+
+
+def _hot_query_indexes(conn):
+    for ddl in HOT_QUERY_INDEXES:
+        conn.execute(ddl)
+
+
+def _jobs_table(conn):
+    conn.execute(JOBS_TABLE)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_kind_status ON jobs (kind, status)")
+
+
+def _data_version(conn):
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(catalog_meta)")]
+    if "data_version" not in columns:
+        conn.execute("ALTER TABLE catalog_meta ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0")
+
+
+def _data_version_triggers(conn):
+    for ddl in DATA_VERSION_TRIGGERS:
+        conn.execute(ddl)
+
+
+def _users_table(conn):
+    conn.execute(USERS_TABLE)
+
+
+def _hash_plaintext_passwords(conn):
+    """
+    Senhas legadas em texto puro (ex.: o 'admin' do users.db antigo) viram
+    hash bcrypt, como no registro pela API; o login recusa texto puro.
+    """
+    rows = conn.execute("SELECT id, password FROM users WHERE password NOT LIKE '$2_$%'").fetchall()
+    if not rows:
+        return
+    # Import tardio: o passlib só é carregado quando há senha legada
+    from core.passwords import hash_password
+    logger.info(f"Gravando o hash bcrypt de {len(rows)} senha(s) legada(s) em texto puro.")
+    conn.executemany(
+        "UPDATE users SET password = ? WHERE id = ?",
+        [(hash_password(password), user_id) for user_id, password in rows]
+    )
+
+
+# A posição na lista é o número da versão (1, 2, ...): só acrescente no fim.
+BOOKS_MIGRATIONS = (
+    ("tabelas books e crawl_state", _books_table),
+    ("índices de filtro e ordenação", _book_indexes),
+    ("resumo das estatísticas (book_stats e triggers)", ensure_stats),
+    ("versão publicada do catálogo", ensure_catalog_meta),
+    ("índices de categoria e do top-rated", _hot_query_indexes),
+    ("tabela jobs", _jobs_table),
+    ("versão dos dados por lote (catalog_meta.data_version)", _data_version),
+    ("triggers de catalog_meta.data_version em books", _data_version_triggers),
+)
+
+USERS_MIGRATIONS = (
+    ("tabela users", _users_table),
+    ("hash bcrypt das senhas legadas em texto puro", _hash_plaintext_passwords),
+)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, migrations):
+    """
+    Aplica as migrações pendentes e devolve a versão final do esquema.
+
+    Tudo roda em uma única transação (a do chamador, se já houver uma; senão
+    uma BEGIN IMMEDIATE própria), junto com a gravação de `user_version`:
+    ou o banco avança inteiro ou nada muda. Processos subindo ao mesmo
+    tempo se enfileiram na trava de escrita e o segundo não encontra nada
+    pendente.
+    """
+    owns = not conn.in_transaction
+    if owns:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        current = schema_version(conn)
+        if current > len(migrations):
+            raise RuntimeError(
+                f"Banco na versão {current} do esquema, mais nova que a do código ({len(migrations)})."
+            )
+        for version, (description, apply) in enumerate(migrations, start=1):
+            if version <= current:
+                continue
+            logger.info(f"Migração {version}: {description}")
+            apply(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+    except BaseException:
+        if owns:
+            conn.rollback()
+        raise
+    if owns:
+        conn.commit()
+    return len(migrations)
+
+
+def migrate_books(conn):
+    return migrate(conn, BOOKS_MIGRATIONS)
+
+
+def migrate_users(conn):
+    return migrate(conn, USERS_MIGRATIONS)
+
+
+# ===============================
+# Planos de consulta
+# ===============================
+def full_scans(conn, sql, params=()):
+    """
+    Passos do plano (EXPLAIN QUERY PLAN) que percorrem uma tabela inteira
+    sem índice. Lista vazia: toda leitura da consulta usa um índice.
+    """
+    return [
+        row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)
+        if row[3].startswith("SCAN ") and "INDEX" not in row[3]
+    ]
@@ -0,0 +1,168 @@
+import heapq
+import unicodedata
+import numpy as np
+
+# Tamanho dos n-gramas do índice invertido
+GRAM_SIZE = 3
+
+# Classes de relevância (menor é melhor)
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING = range(4)
+
+
+def normalize(text):
+    """
+    Normaliza um texto para busca: remove acentos e ignora maiúsculas/minúsculas.
+    """
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def _grams(text):
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+# ===============================
+# Índice de busca por título/categoria
+# ===============================
+class SearchIndex:
+    """
+    Índice invertido de trigramas sobre os títulos do catálogo.
+
+    Cada trigrama aponta para um array ordenado de posições; uma consulta
+    intersecta as listas dos seus trigramas (começando pela menor) e só então
+    confirma a substring nos candidatos. Assim o custo acompanha o tamanho do
+    resultado e não o tamanho da tabela. Consultas com menos de três
+    caracteres não têm trigramas e caem na varredura completa.
+    """
+
+    def __init__(self, titles, categories):
+        self._titles = [normalize(t) for t in titles]
+        self._size = len(self._titles)
+
+        postings = {}
+        for pos, title in enumerate(self._titles):
+            for gram in _grams(title):
+                postings.setdefault(gram, []).append(pos)
+        self._postings = {
+            gram: np.array(positions, dtype=np.int32)
+            for gram, positions in postings.items()
+        }
+
+        by_category = {}
+        for pos, category in enumerate(categories):
+            if category is not None:
+                by_category.setdefault(normalize(category), []).append(pos)
+        self._categories = {
+            category: np.array(positions, dtype=np.int32)
+            for category, positions in by_category.items()
+        }
+
+    @classmethod
+    def from_parts(cls, titles, postings, categories):
+        """
+        Índice a partir das estruturas já calculadas (títulos normalizados,
+        trigrama -> posições, categoria normalizada -> posições), como as
+        gravadas no artefato do catálogo.
+        """
+        index = cls.__new__(cls)
+        index._titles = titles
+        index._size = len(titles)
+        index._postings = postings
+        index._categories = categories
+        return index
+
+    def parts(self):
+        return self._titles, self._postings, self._categories
+
+    def __len__(self):
+        return self._size
+
+    def match_title(self, query):
+        """
+        Posições (em ordem crescente) cujo título contém a consulta.
+        """
+        needle = normalize(query)
+        if len(needle) < GRAM_SIZE:
+            return np.array(
+                [pos for pos, title in enumerate(self._titles) if needle in title],
+                dtype=np.int32
+            )
+
+        lists = []
+        for gram in _grams(needle):
+            positions = self._postings.get(gram)
+            if positions is None:
+                return np.empty(0, dtype=np.int32)
+            lists.append(positions)
+        lists.sort(key=len)
+
+        candidates = lists[0]
+        for positions in lists[1:]:
+            candidates = np.intersect1d(candidates, positions, assume_unique=True)
+            if not len(candidates):
+                return candidates
+
+        titles = self._titles
+        return np.array(
+            [pos for pos in candidates.tolist() if needle in titles[pos]],
+            dtype=np.int32
+        )
+
+    def match_category(self, query):
+        """
+        Posições (em ordem crescente) cuja categoria contém a consulta.
+        """
+        needle = normalize(query)
+        matches = [
+            positions for category, positions in self._categories.items()
+            if needle in category
+        ]
+        if not matches:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(matches))
+
+    def search(self, title=None, category=None, limit=None, offset=0):
+        """
+        Busca por título e/ou categoria e devolve as posições paginadas.
+
+        Com título, os resultados vêm ordenados por relevância (título igual,
+        prefixo do título, prefixo de palavra e por fim substring); só com
+        categoria, mantêm a ordem do catálogo.
+        """
+        positions = None
+        if title:
+            positions = self.match_title(title)
+        if category:
+            by_category = self.match_category(category)
+            positions = by_category if positions is None else np.intersect1d(
+                positions, by_category, assume_unique=True
+            )
+        if positions is None:
+            positions = np.arange(self._size, dtype=np.int32)
+
+        positions = positions.tolist()
+        end = None if limit is None else offset + limit
+        if title:
+            needle = normalize(title)
+            titles = self._titles
+            key = lambda pos: (*_rank(titles[pos], needle), pos)
+            if end is None:
+                positions.sort(key=key)
+            else:
+                positions = heapq.nsmallest(end, positions, key=key)
+        return positions[offset:end]
+
+
+def _rank(text, needle):
+    index = text.find(needle)
+    if text == needle:
+        kind = EXACT
+    elif index == 0:
+        kind = PREFIX
+    elif not text[index - 1].isalnum():
+        kind = WORD_PREFIX
+    else:
+        kind = SUBSTRING
+    return kind, index, len(text)
@@ -0,0 +1,41 @@
+import orjson
+from fastapi.responses import Response
+from core.metrics import timed
+
+# Chaves não-string aparecem em rating_distribution ({5: 196, ...})
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def dumps(content):
+    return orjson.dumps(content, option=_OPTIONS)
+
+
+def join_encoded(chunks):
+    """
+    Monta um array JSON a partir de objetos já codificados, sem decodificar
+    nem recodificar cada um.
+    """
+    return b"[" + b",".join(chunks) + b"]"
+
+
+def encode_rows(columns, rows):
+    """
+    Codifica linhas (tuplas) do cursor como um array JSON de objetos em uma
+    única chamada ao orjson.
+    """
+    with timed("serialize"):
+        return dumps([dict(zip(columns, row)) for row in rows])
+
+
+class JSONBytesResponse(Response):
+    """
+    Resposta JSON serializada com orjson. Aceita bytes já codificados
+    (repassados como estão) ou qualquer valor serializável.
+    """
+    media_type = "application/json"
+
+    def render(self, content):
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            return bytes(content)
+        with timed("serialize"):
+            return dumps(content)
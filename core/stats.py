@@ -0,0 +1,234 @@
+from decimal import Decimal, ROUND_HALF_UP
+import numpy as np
+
+# Largura (em £) dos intervalos de preço guardados na tabela de resumo
+PRICE_BUCKET_WIDTH = 1
+PERCENTILES = (10, 25, 50, 75, 90, 95, 99)
+
+# ===============================
+# Tabela de resumo mantida por triggers
+# ===============================
+# Cada linha é uma célula (categoria, avaliação, faixa de preço) com os
+# agregados dos livros que caem nela. Os triggers ajustam só a célula
+# afetada a cada INSERT/UPDATE/DELETE em 'books', então qualquer caminho de
+# ingestão (upsert em lote, linha a linha, scripts) mantém o resumo em dia
+# sem reprocessar a tabela. Valores nulos viram '' / 0 / -1 para que a
+# chave primária funcione no upsert.
+STATS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS book_stats (
+        category TEXT NOT NULL,
+        rating INTEGER NOT NULL,
+        price_bucket INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        price_sum REAL NOT NULL,
+        price_count INTEGER NOT NULL,
+        in_stock INTEGER NOT NULL,
+        PRIMARY KEY (category, rating, price_bucket)
+    ) WITHOUT ROWID
+'''
+
+_KEY = {
+    "category": "COALESCE({row}.category, '')",
+    "rating": "COALESCE({row}.rating, 0)",
+    "price_bucket": f"COALESCE(CAST({{row}}.price / {PRICE_BUCKET_WIDTH} AS INTEGER), -1)",
+}
+
+_ADD = f'''
+    INSERT INTO book_stats (category, rating, price_bucket, count, price_sum, price_count, in_stock)
+    VALUES (
+        {_KEY["category"]}, {_KEY["rating"]}, {_KEY["price_bucket"]}, 1,
+        COALESCE({{row}}.price, 0), {{row}}.price IS NOT NULL, COALESCE({{row}}.is_in_stock, 0) != 0
+    )
+    ON CONFLICT (category, rating, price_bucket) DO UPDATE SET
+        count = count + 1,
+        price_sum = price_sum + excluded.price_sum,
+        price_count = price_count + excluded.price_count,
+        in_stock = in_stock + excluded.in_stock;
+'''.format(row="NEW")
+
+_MATCH = " AND ".join(f"{column} = {expr}" for column, expr in _KEY.items()).format(row="OLD")
+
+_REMOVE = f'''
+    UPDATE book_stats SET
+        count = count - 1,
+        price_sum = price_sum - COALESCE(OLD.price, 0),
+        price_count = price_count - (OLD.price IS NOT NULL),
+        in_stock = in_stock - (COALESCE(OLD.is_in_stock, 0) != 0)
+    WHERE {_MATCH};
+    DELETE FROM book_stats WHERE {_MATCH} AND count <= 0;
+'''
+
+STATS_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS book_stats_insert AFTER INSERT ON books BEGIN {_ADD} END",
+    f"CREATE TRIGGER IF NOT EXISTS book_stats_delete AFTER DELETE ON books BEGIN {_REMOVE} END",
+    "CREATE TRIGGER IF NOT EXISTS book_stats_update "
+    f"AFTER UPDATE OF category, price, rating, is_in_stock ON books BEGIN {_REMOVE} {_ADD} END",
+)
+
+# Recalcula todas as células a partir de 'books' (criação e reparo)
+REBUILD_STATS_SQL = f'''
+    INSERT INTO book_stats (category, rating, price_bucket, count, price_sum, price_count, in_stock)
+    SELECT {_KEY["category"]}, {_KEY["rating"]}, {_KEY["price_bucket"]},
+           COUNT(*), COALESCE(SUM(books.price), 0), COUNT(books.price),
+           SUM(COALESCE(books.is_in_stock, 0) != 0)
+    FROM books
+    GROUP BY 1, 2, 3
+'''.format(row="books")
+
+
+def ensure_stats(conn):
+    """
+    Cria a tabela de resumo e os triggers (idempotente). Na primeira vez,
+    preenche o resumo com os livros já existentes.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books'").fetchone() is None:
+        return
+    created = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'book_stats'"
+    ).fetchone() is None
+    conn.execute(STATS_TABLE)
+    for ddl in STATS_TRIGGERS:
+        conn.execute(ddl)
+    if created:
+        rebuild_stats(conn)
+
+
+def rebuild_stats(conn):
+    conn.execute("DELETE FROM book_stats")
+    conn.execute(REBUILD_STATS_SQL)
+
+
+def load_cells(conn):
+    """
+    Lê as células do resumo, ou None se o banco ainda não tem a tabela.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'book_stats'").fetchone() is None:
+        return None
+    return [
+        tuple(row) for row in conn.execute(
+            "SELECT category, rating, price_bucket, count, price_sum, price_count, in_stock FROM book_stats"
+        )
+    ]
+
+
+def cells_from_rows(rows):
+    """
+    Mesmas células de 'book_stats', calculadas a partir das linhas de 'books'
+    (bancos sem a tabela de resumo e snapshots montados em memória).
+    """
+    cells = {}
+    for row in rows:
+        category, price, rating, in_stock = row[2], row[3], row[4], row[5]
+        key = (
+            category or "",
+            rating or 0,
+            -1 if price is None else int(price // PRICE_BUCKET_WIDTH),
+        )
+        count, price_sum, price_count, stock = cells.get(key, (0, 0.0, 0, 0))
+        cells[key] = (
+            count + 1,
+            price_sum + (price or 0),
+            price_count + (price is not None),
+            stock + bool(in_stock),
+        )
+    return [key + value for key, value in cells.items()]
+
+
+# ===============================
+# Estatísticas prontas para a API
+# ===============================
+class CatalogStats:
+    """
+    Estatísticas do catálogo pré-calculadas a partir das células do resumo
+    (contagens, médias e histogramas) e dos preços ordenados (percentis).
+    Cada consulta da API devolve um valor já montado.
+    """
+
+    def __init__(self, cells, sorted_prices, category_prices):
+        by_category = {}
+        for category, rating, bucket, count, price_sum, price_count, in_stock in cells:
+            for scope in (None, category):
+                if scope == "":
+                    continue
+                entry = by_category.setdefault(scope, {
+                    "count": 0, "price_sum": 0.0, "price_count": 0, "in_stock": 0,
+                    "ratings": {}, "buckets": {},
+                })
+                entry["count"] += count
+                entry["price_sum"] += price_sum
+                entry["price_count"] += price_count
+                entry["in_stock"] += in_stock
+                entry["ratings"][rating] = entry["ratings"].get(rating, 0) + count
+                if bucket >= 0:
+                    entry["buckets"][bucket] = entry["buckets"].get(bucket, 0) + count
+        totals = by_category.pop(None, None) or {
+            "count": 0, "price_sum": 0.0, "price_count": 0, "in_stock": 0, "ratings": {}, "buckets": {},
+        }
+
+        self.category_names = sorted(by_category)
+        ratings = sorted(totals["ratings"].items(), key=lambda item: (-item[1], item[0]))
+        self.overview = {
+            "total_books": totals["count"],
+            "avg_price": round(totals["price_sum"] / totals["price_count"], 2) if totals["price_count"] else 0,
+            "rating_distribution": {rating: count for rating, count in ratings},
+        }
+        self.categories = [
+            {
+                "category": category,
+                "count": by_category[category]["count"],
+                "avg_price": _avg(by_category[category]),
+            }
+            for category in self.category_names
+        ]
+
+        self._scopes = {None: totals, **by_category}
+        self._percentiles = {None: _percentiles(sorted_prices)}
+        for category, prices in category_prices.items():
+            self._percentiles[category] = _percentiles(prices)
+
+    def has_scope(self, category):
+        return category in self._scopes
+
+    def price_percentiles(self, category=None):
+        return self._percentiles.get(category)
+
+    def rating_histogram(self, category=None):
+        ratings = self._scopes[category]["ratings"]
+        return [{"rating": rating, "count": ratings[rating]} for rating in sorted(ratings)]
+
+    def price_histogram(self, category=None, width=5):
+        """
+        Histograma de preços em faixas de `width` £ (múltiplo da largura
+        guardada no resumo), sem faixas vazias.
+        """
+        merged = {}
+        for bucket, count in self._scopes[category]["buckets"].items():
+            start = bucket * PRICE_BUCKET_WIDTH // width * width
+            merged[start] = merged.get(start, 0) + count
+        return [
+            {"min": float(start), "max": float(start + width), "count": merged[start]}
+            for start in sorted(merged)
+        ]
+
+
+def _avg(entry):
+    return _sql_round(entry["price_sum"] / entry["price_count"]) if entry["price_count"] else None
+
+
+def _sql_round(value, digits=2):
+    """
+    Arredonda como o ROUND() do SQLite (meio para longe do zero).
+    """
+    quantum = Decimal(1).scaleb(-digits)
+    return float(Decimal(format(value, ".15g")).quantize(quantum, rounding=ROUND_HALF_UP))
+
+
+def _percentiles(sorted_prices):
+    prices = sorted_prices[~np.isnan(sorted_prices)]
+    if not len(prices):
+        return {"count": 0}
+    values = np.percentile(prices, PERCENTILES)
+    result = {"count": int(len(prices)), "min": float(prices[0])}
+    result.update({f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, values)})
+    result["max"] = float(prices[-1])
+    return result
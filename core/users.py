@@ -0,0 +1,109 @@
+import os
+import sqlite3
+import threading
+from anyio import to_thread
+import core.database as database
+from core.cache import LRUCache
+from core.schema import migrate_users
+
+# --- Configuração (sobrescrita por variáveis de ambiente) ---
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+# Validade curta: alterações feitas por outro worker aparecem em até N segundos
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+
+
+class UserRepository:
+    """
+    Usuários persistidos em 'users.db', compartilhados por todos os workers.
+
+    Leituras usam o pool de conexões e passam por um cache LRU de registros
+    com validade curta; gravações usam a conexão de escrita do banco. Só
+    usuários encontrados vão para o cache, então um usuário recém-criado em
+    outro processo já é visto na próxima consulta.
+    """
+
+    def __init__(self, db_path=None, cache_size=USER_CACHE_SIZE, cache_ttl=USER_CACHE_TTL):
+        self._db_path = db_path
+        self.cache = LRUCache(cache_size, cache_ttl)
+        self._ready = set()
+        self._lock = threading.Lock()
+
+    @property
+    def db_path(self):
+        return self._db_path or database.USERS_DB_PATH
+
+    def ensure_table(self):
+        """
+        Aplica as migrações pendentes de 'users.db' uma vez por banco. A API
+        chama no warm_up; as rotas assíncronas que chegam antes disso (ou
+        com outro banco) a executam no threadpool, fora do event loop.
+        """
+        path = self.db_path
+        if path in self._ready:
+            return path
+        with self._lock:
+            if path not in self._ready:
+                with database.writer(path).transaction() as conn:
+                    migrate_users(conn)
+                self._ready.add(path)
+        return path
+
+    async def _ensure_table_async(self):
+        path = self.db_path
+        if path in self._ready:
+            return path
+        return await to_thread.run_sync(self.ensure_table)
+
+    def get(self, username):
+        """
+        Registro {"username", "hashed_password"} do usuário, ou None.
+        """
+        user = self.cache.get(username)
+        if user is not None:
+            return user
+        with database.read_connection(self.ensure_table()) as conn:
+            return self._select(conn, username)
+
+    async def get_async(self, username):
+        """
+        Como `get`, mas a leitura roda no executor de consultas
+        (core/database.py) em vez de bloquear o event loop.
+        """
+        user = self.cache.get(username)
+        if user is not None:
+            return user
+        return await database.query_executor.run(self._select, username, path=await self._ensure_table_async())
+
+    def _select(self, conn, username):
+        row = conn.execute("SELECT username, password FROM users WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            return None
+        user = {"username": row["username"], "hashed_password": row["password"]}
+        self.cache.put(username, user)
+        return user
+
+    def create(self, username, hashed_password):
+        """
+        Cria o usuário; devolve False se o nome já existe.
+        """
+        try:
+            with database.writer(self.ensure_table()).transaction() as conn:
+                conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed_password))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    async def create_async(self, username, hashed_password):
+        """
+        Como `create`, mas a gravação (que pode esperar pela trava de escrita
+        do banco) roda no threadpool em vez de bloquear o event loop.
+        """
+        return await to_thread.run_sync(self.create, username, hashed_password)
+
+    def update_password(self, username, hashed_password):
+        with database.writer(self.ensure_table()).transaction() as conn:
+            conn.execute("UPDATE users SET password = ? WHERE username = ?", (hashed_password, username))
+        self.cache.pop(username)
+
+    async def update_password_async(self, username, hashed_password):
+        await to_thread.run_sync(self.update_password, username, hashed_password)
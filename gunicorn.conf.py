@@ -0,0 +1,70 @@
+"""
+Modo de produção: gunicorn com workers uvicorn.
+
+    gunicorn -c gunicorn.conf.py api.main:app   (ou ./start.sh production)
+
+Com `preload_app` o mestre importa a API e constrói o snapshot do catálogo
+uma única vez; os workers nascem por fork e compartilham essa memória
+(copy-on-write). Quando a ingestão publica uma nova versão do catálogo, o
+mestre reconstrói o snapshot e troca os workers sem derrubar conexões
+(SIGHUP: sobem os novos, os antigos terminam as requisições em andamento).
+"""
+import gc
+import os
+import signal
+from core.catalog import CATALOG_POLL_INTERVAL, CatalogVersionWatcher, refresh_catalog
+from core.database import close_all
+
+# --- Servidor ---
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+# Vários workers não podem rotacionar o mesmo arquivo de log: um por worker
+if workers > 1:
+    os.environ.setdefault("LOG_PER_PROCESS", "1")
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+
+def _prepare_fork():
+    # Conexões SQLite abertas no mestre não podem ser herdadas pelos workers
+    close_all()
+    # Objetos já criados saem do GC: as coletas nos workers não escrevem nas
+    # páginas compartilhadas (o que desfaria o copy-on-write)
+    gc.collect()
+    gc.freeze()
+
+
+# --- Hooks ---
+def when_ready(server):
+    """
+    Mestre pronto, antes do primeiro fork: aquece o catálogo e passa a
+    observar a versão publicada.
+    """
+    from api.main import warm_up
+    catalog = warm_up()
+    _prepare_fork()
+    server.log.info(f"Catálogo versão {catalog.version} carregado ({len(catalog)} livros) antes do fork.")
+
+    # A thread vive só no mestre (threads não atravessam o fork)
+    if CATALOG_POLL_INTERVAL > 0:
+        CatalogVersionWatcher(
+            lambda version: os.kill(os.getpid(), signal.SIGHUP),
+            interval=CATALOG_POLL_INTERVAL,
+            version=catalog.version,
+        ).start()
+
+
+def on_reload(server):
+    """
+    SIGHUP (nova versão publicada): reconstrói o snapshot no mestre antes
+    de criar os novos workers.
+    """
+    from api.main import warm_up
+    gc.unfreeze()
+    refresh_catalog()
+    catalog = warm_up()
+    _prepare_fork()
+    server.log.info(f"Catálogo versão {catalog.version} carregado; trocando os workers.")
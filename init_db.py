@@ -1,50 +1,45 @@
 import os
 import sqlite3
-import pandas as pd
+from core.schema import migrate_books
 
 # Caminho do banco
-DB_PATH = "data/books.db"
+DB_PATH = os.getenv("BOOKS_DB_PATH", "data/books.db")
 
 # Dados iniciais (mock)
 initial_books = [
-    {"title": "Book A", "category": "Fiction", "price": 10.99, "rating": 4.5},
-    {"title": "Book B", "category": "Travel", "price": 15.50, "rating": 4.7},
-    {"title": "Book C", "category": "Science", "price": 8.99, "rating": 4.2}
+    ("Book A", "Fiction", 10.99, 4, 1, "In stock", "", "mock://book-a"),
+    ("Book B", "Travel", 15.50, 5, 1, "In stock", "", "mock://book-b"),
+    ("Book C", "Science", 8.99, 4, 1, "In stock", "", "mock://book-c"),
 ]
 
 def init_db():
-    # Garante que a pasta data/ existe
-    os.makedirs("data", exist_ok=True)
+    # Só sqlite3 (sem pandas): este script roda a cada subida, antes da API
+    os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
 
     # Cria conexão
     conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    # Cria tabela
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS books (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            category TEXT NOT NULL,
-            price REAL NOT NULL,
-            rating REAL NOT NULL
-        )
-    """)
-
-    # Verifica se já tem dados
-    cursor.execute("SELECT COUNT(*) FROM books")
-    count = cursor.fetchone()[0]
-
-    if count == 0:
-        # Insere dados iniciais
-        df = pd.DataFrame(initial_books)
-        df.to_sql("books", conn, if_exists="append", index=False)
-        print("📚 Banco criado e populado com dados iniciais.")
-    else:
-        print("✅ Banco já possui dados, nenhuma inserção feita.")
-
-    conn.commit()
-    conn.close()
+    try:
+        # Esquema único (core/schema.py): cria ou atualiza as tabelas e índices
+        migrate_books(conn)
+        with conn:
+            # Verifica se já tem dados
+            count = conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+            if count == 0:
+                # Insere dados iniciais
+                conn.executemany("""
+                    INSERT INTO books (title, category, price, rating, is_in_stock, availability_text, image_url, book_page_url)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, initial_books)
+                # Publica uma nova versão: os workers e o artefato do
+                # catálogo (data/books.catalog) não reaproveitam o catálogo
+                # vazio. Import tardio: core.catalog traz o NumPy
+                from core.catalog import bump_catalog_version
+                bump_catalog_version(conn)
+                print("📚 Banco criado e populado com dados iniciais.")
+            else:
+                print("✅ Banco já possui dados, nenhuma inserção feita.")
+    finally:
+        conn.close()
 
 if __name__ == "__main__":
     init_db()
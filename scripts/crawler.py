@@ -0,0 +1,86 @@
+import os
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from core.ratelimit import TokenBucket
+
+# --- Configuração padrão (sobrescrita por variáveis de ambiente) ---
+DEFAULT_WORKERS = int(os.getenv("SCRAPER_WORKERS", "8"))
+DEFAULT_HOST_CONCURRENCY = int(os.getenv("SCRAPER_HOST_CONCURRENCY", "4"))
+DEFAULT_RATE = float(os.getenv("SCRAPER_RATE", "10"))
+DEFAULT_RETRIES = int(os.getenv("SCRAPER_RETRIES", "3"))
+DEFAULT_BACKOFF = float(os.getenv("SCRAPER_BACKOFF", "0.5"))
+DEFAULT_TIMEOUT = float(os.getenv("SCRAPER_TIMEOUT", "10"))
+
+
+class Crawler:
+    """
+    Cliente HTTP concorrente usado pelo scraper.
+
+    Mantém um único `requests.Session` (pool de conexões com keep-alive),
+    limita a concorrência por host, respeita um token bucket de
+    requisições por segundo e refaz requisições com backoff exponencial
+    em falhas de conexão e respostas 429/5xx.
+    """
+
+    def __init__(
+        self,
+        max_workers=DEFAULT_WORKERS,
+        per_host_limit=DEFAULT_HOST_CONCURRENCY,
+        rate=DEFAULT_RATE,
+        burst=None,
+        retries=DEFAULT_RETRIES,
+        backoff=DEFAULT_BACKOFF,
+        timeout=DEFAULT_TIMEOUT,
+    ):
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET", "HEAD"),
+        )
+        adapter = HTTPAdapter(
+            pool_connections=max_workers,
+            pool_maxsize=max(max_workers, per_host_limit),
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._bucket = TokenBucket(rate, burst)
+        self._host_slots = {}
+        self._host_lock = threading.Lock()
+
+    def _slot(self, url):
+        host = urlsplit(url).netloc
+        with self._host_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+        return slot
+
+    def fetch(self, url, headers=None):
+        """
+        Baixa uma URL respeitando os limites de concorrência e de taxa.
+        """
+        with self._slot(url):
+            self._bucket.acquire()
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,169 @@
+import os
+import logging
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+# --- Backends opcionais ---
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxHTMLParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxHTMLParser
+    except ImportError:
+        SelectolaxHTMLParser = None
+
+DEFAULT_PARSER = os.getenv("SCRAPER_PARSER", "auto")
+# Trecho do HTML incluído nos logs de erro de extração
+LOG_SNIPPET_CHARS = 200
+
+# Constantes da extração (calculadas uma única vez, não por livro)
+RATING_MAP = {'One': 1, 'Two': 2, 'Three': 3, 'Four': 4, 'Five': 5}
+IMAGE_BASE_URL = "https://books.toscrape.com/"
+CATALOGUE_BASE_URL = "https://books.toscrape.com/catalogue/"
+
+# Só os livros e o link da próxima página são montados na árvore
+PAGE_STRAINER = SoupStrainer(["article", "li"], attrs={"class": ["product_pod", "next"]})
+
+
+def _snippet(html):
+    html = " ".join((html or "").split())
+    return html if len(html) <= LOG_SNIPPET_CHARS else html[:LOG_SNIPPET_CHARS] + "..."
+
+
+def get_book_details(book_article, category_name):
+    """
+    Extrai detalhes de cada livro a partir de um elemento <article> (BeautifulSoup).
+    """
+    try:
+        title = book_article.h3.a['title']
+        price_str = book_article.find('p', class_='price_color').text
+        price = float(price_str.replace('£', ''))
+        rating_class = book_article.find('p', class_='star-rating')['class'][1]
+        rating = RATING_MAP.get(rating_class, 0)
+        availability_tag = book_article.find('p', class_='instock availability')
+        availability_text = availability_tag.text.strip() if availability_tag else "N/A"
+        is_in_stock = "In stock" in availability_text
+        image_url = requests.compat.urljoin(IMAGE_BASE_URL, book_article.find('img')['src'])
+        book_full_url = requests.compat.urljoin(CATALOGUE_BASE_URL, book_article.h3.a['href'])
+
+        return {
+            'title': title,
+            'price': price,
+            'rating': rating,
+            'availability_text': availability_text,
+            'is_in_stock': is_in_stock,
+            'image_url': image_url,
+            'book_page_url': book_full_url,
+            'category': category_name
+        }
+    except Exception as e:
+        logger.error(f"Erro ao extrair detalhes de um livro: {e}. Problema em: {_snippet(str(book_article))}")
+        return None
+
+
+# ===============================
+# Backends de parsing
+# ===============================
+class SoupParser:
+    """
+    Parser baseado em BeautifulSoup (html.parser ou lxml) com extração
+    direcionada: o SoupStrainer descarta tudo que não é `article.product_pod`
+    ou `li.next` durante o parsing.
+    """
+
+    def __init__(self, features="html.parser"):
+        self.features = features
+        self.name = features
+
+    def parse_category_page(self, content, category_name, page_url):
+        soup = BeautifulSoup(content, self.features, parse_only=PAGE_STRAINER)
+        books = []
+        for book_article in soup.find_all('article', class_='product_pod'):
+            details = get_book_details(book_article, category_name)
+            if details:
+                books.append(details)
+
+        next_url = None
+        next_button = soup.find('li', class_='next')
+        if next_button and next_button.find('a'):
+            next_url = requests.compat.urljoin(page_url, next_button.find('a')['href'])
+        return books, next_url
+
+
+class SelectolaxParser:
+    """
+    Parser baseado em selectolax (lexbor), usando seletores CSS diretamente.
+    """
+    name = "selectolax"
+
+    def parse_category_page(self, content, category_name, page_url):
+        tree = SelectolaxHTMLParser(content)
+        books = []
+        for node in tree.css("article.product_pod"):
+            details = self._book_details(node, category_name)
+            if details:
+                books.append(details)
+
+        next_url = None
+        next_link = tree.css_first("li.next a")
+        if next_link is not None and next_link.attributes.get("href"):
+            next_url = requests.compat.urljoin(page_url, next_link.attributes["href"])
+        return books, next_url
+
+    @staticmethod
+    def _book_details(node, category_name):
+        try:
+            link = node.css_first("h3 a")
+            price = float(node.css_first("p.price_color").text().replace('£', ''))
+            rating_class = node.css_first("p.star-rating").attributes["class"].split()[1]
+            availability_tag = node.css_first("p.instock.availability")
+            availability_text = availability_tag.text().strip() if availability_tag else "N/A"
+            return {
+                'title': link.attributes['title'],
+                'price': price,
+                'rating': RATING_MAP.get(rating_class, 0),
+                'availability_text': availability_text,
+                'is_in_stock': "In stock" in availability_text,
+                'image_url': requests.compat.urljoin(IMAGE_BASE_URL, node.css_first("img").attributes['src']),
+                'book_page_url': requests.compat.urljoin(CATALOGUE_BASE_URL, link.attributes['href']),
+                'category': category_name
+            }
+        except Exception as e:
+            logger.error(f"Erro ao extrair detalhes de um livro: {e}. Problema em: {_snippet(node.html)}")
+            return None
+
+
+def available_parsers():
+    """
+    Nomes dos backends disponíveis neste ambiente, do mais rápido ao mais lento.
+    """
+    names = []
+    if SelectolaxHTMLParser is not None:
+        names.append("selectolax")
+    if HAS_LXML:
+        names.append("lxml")
+    names.append("html.parser")
+    return names
+
+
+def get_parser(name=None):
+    """
+    Devolve o backend pedido; "auto" escolhe o mais rápido instalado e cai
+    no html.parser da biblioteca padrão se nenhum opcional estiver presente.
+    """
+    name = name or DEFAULT_PARSER
+    if name == "auto":
+        name = available_parsers()[0]
+    if name not in available_parsers():
+        raise ValueError(f"Parser '{name}' indisponível. Opções: {', '.join(available_parsers())}")
+    if name == "selectolax":
+        return SelectolaxParser()
+    return SoupParser(name)
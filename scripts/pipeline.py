@@ -0,0 +1,219 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from core.database import writer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = int(os.getenv("SCRAPER_BATCH_SIZE", "200"))
+DEFAULT_QUEUE_SIZE = int(os.getenv("SCRAPER_QUEUE_SIZE", "64"))
+
+_DONE = object()
+
+# Marca no fluxo de livros: `callback` roda depois que tudo o que veio antes
+# dela estiver gravado (ex.: confirmar a página no estado do crawl)
+Checkpoint = namedtuple('Checkpoint', 'callback')
+
+
+# --- Métricas ---
+
+class PipelineMetrics:
+    """
+    Contadores do pipeline: páginas processadas, linhas/s e latência dos lotes.
+    Podem ser lidos enquanto o pipeline roda (progresso de um job).
+    """
+
+    def __init__(self, window=1000):
+        self.started = time.monotonic()
+        self.finished = None
+        self.pages = 0
+        self.pages_unchanged = 0
+        self.rows_written = 0
+        self.rows_changed = 0
+        self.batches = 0
+        self.errors = 0
+        self._batch_seconds = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_batch(self, rows, changed, seconds):
+        with self._lock:
+            self.rows_written += rows
+            self.rows_changed += changed
+            self.batches += 1
+            self._batch_seconds.append(seconds)
+
+    def record_page(self, unchanged=False):
+        with self._lock:
+            self.pages += 1
+            if unchanged:
+                self.pages_unchanged += 1
+
+    def record_error(self, count=1):
+        with self._lock:
+            self.errors += count
+
+    def finish(self):
+        self.finished = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def as_dict(self):
+        with self._lock:
+            samples = sorted(self._batch_seconds)
+        elapsed = self.elapsed
+
+        def percentile(p):
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 3)
+
+        return {
+            "pages": self.pages,
+            "pages_unchanged": self.pages_unchanged,
+            "rows_written": self.rows_written,
+            "rows_changed": self.rows_changed,
+            "batches": self.batches,
+            "errors": self.errors,
+            "elapsed_s": round(elapsed, 3),
+            "pages_per_sec": round(self.pages / elapsed, 1) if elapsed else 0.0,
+            "rows_per_sec": round(self.rows_written / elapsed, 1) if elapsed else 0.0,
+            "batch_latency_ms": {
+                "p50": percentile(0.50),
+                "p99": percentile(0.99),
+                "max": round(samples[-1] * 1000, 3) if samples else 0.0,
+            },
+        }
+
+
+# --- Produtores ---
+
+def stream(producer, items, max_workers, queue_size=DEFAULT_QUEUE_SIZE):
+    """
+    Executa `producer(item)` (um gerador de listas) para cada item em um pool
+    de threads e devolve um iterador único sobre todos os elementos
+    produzidos, na ordem em que ficam prontos.
+
+    A fila entre produtores e consumidor é limitada: se a gravação ficar para
+    trás os produtores esperam, mantendo o uso de memória constante.
+    """
+    channel = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(value):
+        while not stop.is_set():
+            try:
+                channel.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(item):
+        try:
+            for chunk in producer(item):
+                if not put(chunk):
+                    return
+        finally:
+            put(_DONE)
+
+    items = list(items)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="producer") as pool:
+        futures = [pool.submit(run, item) for item in items]
+        try:
+            remaining = len(futures)
+            while remaining:
+                chunk = channel.get()
+                if chunk is _DONE:
+                    remaining -= 1
+                    continue
+                yield from chunk
+        finally:
+            stop.set()
+    for future in futures:
+        future.result()
+
+
+# --- Gravação em lotes ---
+
+class BatchWriter:
+    """
+    Estágio de gravação: acumula linhas e as grava com `executemany` em
+    lotes, cada um em uma transação explícita na conexão única de escrita
+    do banco (modo WAL, ver core/database.py). Cada lote confirmado já fica
+    visível para os leitores (a API) enquanto o crawl continua.
+    """
+
+    def __init__(self, db_file, sql, batch_size=DEFAULT_BATCH_SIZE, metrics=None):
+        self.sql = sql
+        self.batch_size = batch_size
+        self.metrics = metrics or PipelineMetrics()
+        self._buffer = []
+        self._callbacks = []
+        self._writer = writer(db_file)
+
+    def add(self, row):
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def after_commit(self, callback):
+        """
+        Executa `callback` quando as linhas já adicionadas estiverem gravadas:
+        na hora, se não há nada pendente, ou depois do próximo lote. Um lote
+        com linhas que falharam descarta os callbacks que esperavam por ele.
+        """
+        if self._buffer:
+            self._callbacks.append(callback)
+        else:
+            callback()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+        callbacks, self._callbacks = self._callbacks, []
+        start = time.perf_counter()
+        failed = 0
+        try:
+            # rowcount (e não total_changes) para não contar as linhas
+            # alteradas pelos triggers do resumo de estatísticas
+            with self._writer.transaction() as conn:
+                changed = conn.executemany(self.sql, rows).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"Falha ao gravar lote de {len(rows)} linhas ({e}); gravando linha a linha.")
+            changed, failed = self._write_one_by_one(rows)
+        self.metrics.record_batch(len(rows), changed, time.perf_counter() - start)
+        if not failed:
+            for callback in callbacks:
+                callback()
+
+    def _write_one_by_one(self, rows):
+        changed = failed = 0
+        with self._writer.transaction() as conn:
+            for row in rows:
+                try:
+                    changed += conn.execute(self.sql, row).rowcount
+                except sqlite3.Error as e:
+                    failed += 1
+                    self.metrics.record_error()
+                    logger.error(f"Erro ao gravar a linha {row[:2]}: {e}")
+        return changed, failed
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.metrics.finish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
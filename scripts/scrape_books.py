@@ -1,35 +1,144 @@
 import requests
 from bs4 import BeautifulSoup
-import pandas as pd
 import os
-import time
-import sqlite3
+import functools
+import hashlib
 import logging
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+from core.catalog import bump_catalog_version, load_catalog
+from core.database import BOOKS_DB_PATH, read_connection, writer
+from core.loggin_config import logging_config
+from core.recommend import refresh_neighbors
+from core.schema import migrate_books
+from scripts.crawler import Crawler
+from scripts.parsers import get_book_details, get_parser
+from scripts.pipeline import BatchWriter, Checkpoint, PipelineMetrics, stream, DEFAULT_BATCH_SIZE
 
-# --- Configuração de Logging ---
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt='%m/%d/%Y %I:%M:%S %p',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("tech_challenge.log")
-    ]
-)
+logger = logging.getLogger(__name__)
+
+DB_FILE = BOOKS_DB_PATH
+
+# --- Estado do crawl incremental ---
+
+PageState = namedtuple('PageState', 'url etag last_modified content_hash next_url')
+
+class CrawlState:
+    """
+    Guarda, por URL de página de categoria, o ETag, o Last-Modified, o hash do
+    conteúdo e o link da próxima página da última raspagem (tabela 'crawl_state').
+
+    Em modo incremental as páginas são pedidas com requisições condicionais e,
+    se o servidor responder 304 ou o conteúdo tiver o mesmo hash, o parsing é
+    pulado e a navegação segue pelo `next_url` salvo.
+    """
+
+    def __init__(self, pages=(), conditional=False):
+        self._known = {page.url: page for page in pages}
+        # Páginas processadas cujos livros ainda não foram gravados
+        self._pending = {}
+        self._updates = {}
+        self._lock = threading.Lock()
+        self.conditional = conditional
+        self.pages_unchanged = 0
+
+    @classmethod
+    def load(cls, db_file=None):
+        with read_connection(db_file or DB_FILE) as conn:
+            rows = conn.execute(
+                "SELECT url, etag, last_modified, content_hash, next_url FROM crawl_state"
+            ).fetchall()
+        return cls([PageState(*row) for row in rows], conditional=True)
+
+    def pages(self):
+        """
+        Estado conhecido de todas as páginas, incluindo as desta execução.
+        """
+        with self._lock:
+            return list({**self._known, **self._updates}.values())
+
+    def request_headers(self, url):
+        known = self._known.get(url) if self.conditional else None
+        if known is None:
+            return None
+        headers = {}
+        if known.etag:
+            headers['If-None-Match'] = known.etag
+        if known.last_modified:
+            headers['If-Modified-Since'] = known.last_modified
+        return headers
+
+    def unchanged(self, url, response, content_hash):
+        """
+        Retorna o estado salvo da página se ela não mudou desde a última raspagem.
+        """
+        known = self._known.get(url) if self.conditional else None
+        if known is None:
+            return None
+        if response.status_code == 304 or known.content_hash == content_hash:
+            with self._lock:
+                self.pages_unchanged += 1
+            return known
+        return None
+
+    def record(self, url, response, content_hash, next_url):
+        """
+        Registra a página como processada, mas pendente: ela só entra no
+        estado salvo depois de `commit`, quando os seus livros já estão
+        gravados no banco.
+        """
+        page = PageState(
+            url,
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'),
+            content_hash,
+            next_url
+        )
+        with self._lock:
+            self._pending[url] = page
+
+    def commit(self, url):
+        with self._lock:
+            page = self._pending.pop(url, None)
+            if page is not None:
+                self._updates[url] = page
+
+    def save(self, db_file=None):
+        """
+        Persiste as páginas (re)processadas nesta execução cujos livros já
+        foram gravados; as pendentes são raspadas de novo na próxima.
+        """
+        fetched_at = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            pages = list(self._updates.values())
+        with writer(db_file or DB_FILE).transaction() as conn:
+            conn.executemany('''
+                INSERT INTO crawl_state (url, etag, last_modified, content_hash, next_url, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    content_hash = excluded.content_hash,
+                    next_url = excluded.next_url,
+                    fetched_at = excluded.fetched_at
+            ''', [(*page, fetched_at) for page in pages])
+        self._known.update({page.url: page for page in pages})
+        self._updates.clear()
 
 # --- Scraping ---
 
-def get_all_categories():
+BASE_URL = os.getenv("SCRAPER_BASE_URL", "https://books.toscrape.com/")
+
+def get_all_categories(crawler, base_url=BASE_URL):
     """
     Coleta os nomes e URLs de todas as categorias na barra lateral da pagina principal.
     """
-    base_url = "https://books.toscrape.com/"
     categories_data = []
     
-    logging.info("Iniciando a raspagem das categorias...")
+    logger.info("Iniciando a raspagem das categorias...")
     try:
-        response = requests.get(base_url, timeout=5)
-        response.raise_for_status()
+        response = crawler.fetch(base_url)
         soup = BeautifulSoup(response.content, 'html.parser')
 
         side_categories_ul = soup.find('div', class_='side_categories')
@@ -47,190 +156,249 @@ def get_all_categories():
                             'url': category_full_url
                         })
     except requests.exceptions.RequestException as e:
-        logging.error(f"Erro ao recuperar a página principal para raspar categorias: {e}")
+        logger.error(f"Erro ao recuperar a página principal para raspar categorias: {e}")
     
-    logging.info(f"Raspagem de categorias concluída. Encontradas {len(categories_data)} categorias.")
+    logger.info(f"Raspagem de categorias concluída. Encontradas {len(categories_data)} categorias.")
     return categories_data
 
-def get_book_details(book_article, category_name):
+def iter_category_pages(crawler, category_info, state=None, parser=None, metrics=None, cancel_event=None):
+    """
+    Percorre todas as páginas de uma categoria, produzindo a lista de livros
+    de cada página assim que ela é processada.
+    As páginas de uma mesma categoria são sequenciais (cada uma aponta para a
+    próxima), mas categorias diferentes são raspadas em paralelo.
+    Com `state`, páginas sem mudança desde a última raspagem são puladas e
+    cada página processada termina com um `Checkpoint` que a confirma no
+    estado depois que os seus livros forem gravados.
+    `metrics` recebe o progresso e `cancel_event` interrompe o laço.
+    """
+    parser = parser or get_parser()
+    category_name = category_info['name']
+    current_category_page_url = category_info['url']
+    logger.info(f"Iniciando scraping da categoria: '{category_name}'")
+
+    page_num = 1
+    while current_category_page_url:
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        logger.debug(f"Scrapping pagina {page_num} da categoria '{category_name}'")
+        headers = state.request_headers(current_category_page_url) if state else None
+        try:
+            response = crawler.fetch(current_category_page_url, headers=headers)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Erro ao recuperar a página de categoria {current_category_page_url}: {e}. Pulando para a próxima categoria.")
+            if metrics is not None:
+                metrics.record_error()
+            break
+
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        known = state.unchanged(current_category_page_url, response, content_hash) if state else None
+        if known is not None:
+            if metrics is not None:
+                metrics.record_page(unchanged=True)
+            current_category_page_url = known.next_url
+            page_num += 1
+            continue
+
+        books, next_url = parser.parse_category_page(
+            response.content, category_name, current_category_page_url
+        )
+        if not books and next_url is None:
+            break
+
+        if metrics is not None:
+            metrics.record_page()
+        if state is not None:
+            state.record(current_category_page_url, response, content_hash, next_url)
+            books = books + [Checkpoint(functools.partial(state.commit, current_category_page_url))]
+        yield books
+        current_category_page_url = next_url
+        page_num += 1
+
+def iter_books(
+    base_url=BASE_URL, crawler=None, state=None, parser=None, metrics=None, cancel_event=None, checkpoints=False
+):
     """
-    Extrai detalhes de cada livro a partir de um elemento <article>.
+    Descobre as categorias e produz os livros em fluxo, à medida que as
+    páginas de categoria (raspadas em paralelo) ficam prontas.
+    Com `checkpoints`, os `Checkpoint` das páginas seguem no fluxo para o
+    estágio de gravação (`write_books`); sem ele, são confirmados na hora.
+    Nada é guardado por livro: um livro repetido é regravado pelo upsert
+    (`ON CONFLICT(book_page_url)`), sem duplicar a linha.
     """
+    owns_crawler = crawler is None
+    crawler = crawler or Crawler()
+    parser = parser or get_parser()
     try:
-        title = book_article.h3.a['title']
-        price_str = book_article.find('p', class_='price_color').text
-        price = float(price_str.replace('£', ''))
-        rating_class = book_article.find('p', class_='star-rating')['class'][1]
-        rating_map = {'One': 1, 'Two': 2, 'Three': 3, 'Four': 4, 'Five': 5}
-        rating = rating_map.get(rating_class, 0)
-        availability_tag = book_article.find('p', class_='instock availability')
-        availability_text = availability_tag.text.strip() if availability_tag else "N/A"
-        is_in_stock = "In stock" in availability_text
-        image_url_relative = book_article.find('img')['src']
-        base_image_url = "https://books.toscrape.com/"
-        image_url = requests.compat.urljoin(base_image_url, image_url_relative)
-        book_relative_url = book_article.h3.a['href']
-        base_catalogue_url = "https://books.toscrape.com/catalogue/"
-        book_full_url = requests.compat.urljoin(base_catalogue_url, book_relative_url)
-
-        return {
-            'title': title,
-            'price': price,
-            'rating': rating,
-            'availability_text': availability_text,
-            'is_in_stock': is_in_stock,
-            'image_url': image_url,
-            'book_page_url': book_full_url,
-            'category': category_name
-        }
-    except Exception as e:
-        logging.error(f"Erro ao extrair detalhes de um livro: {e}. Problema em: {book_article}")
-        return None
+        categories = get_all_categories(crawler, base_url)
+        if not categories:
+            logger.error("Nenhuma categoria válida encontrada. Encerrando o scraping.")
+            return
 
-def scrape_all_books_by_category():
-    """
-    Orquestra o processo de scraping, descobrindo categorias e depois
-    visitando cada página de categoria para extrair os livros.
-    """
-    all_books_data = []
-    categories = get_all_categories()
-    if not categories:
-        logging.error("Nenhuma categoria válida encontrada. Encerrando o scraping.")
-        return []
-
-    processed_book_urls = set()
-
-    for category_info in categories:
-        category_name = category_info['name']
-        initial_category_url = category_info['url']
-        logging.info(f"Iniciando scraping da categoria: '{category_name}'")
-
-        current_category_page_url = initial_category_url
-        page_num = 1
-        has_next_page = True
-
-        while has_next_page:
-            logging.info(f"Scrapping pagina {page_num} da categoria '{category_name}'")
-            try:
-                response = requests.get(current_category_page_url, timeout=10)
-                response.raise_for_status()
-
-                soup = BeautifulSoup(response.content, 'html.parser')
-                books_on_page = soup.find_all('article', class_='product_pod')
-
-                if not books_on_page:
-                    has_next_page = False
-                    break
-
-                for book_article in books_on_page:
-                    details = get_book_details(book_article, category_name)
-                    if details and details['book_page_url'] not in processed_book_urls:
-                        all_books_data.append(details)
-                        processed_book_urls.add(details['book_page_url'])
-                    
-                next_button = soup.find('li', class_='next')
-                if next_button and next_button.find('a'):
-                    next_relative_url = next_button.find('a')['href']
-                    current_category_page_url = requests.compat.urljoin(current_category_page_url, next_relative_url)
-                    page_num += 1
+        pages = stream(
+            lambda category: iter_category_pages(crawler, category, state, parser, metrics, cancel_event),
+            categories,
+            max_workers=crawler.max_workers
+        )
+        for details in pages:
+            if cancel_event is not None and cancel_event.is_set():
+                logger.warning("Scraping cancelado.")
+                return
+            if isinstance(details, Checkpoint):
+                if checkpoints:
+                    yield details
                 else:
-                    has_next_page = False
-                
-                time.sleep(0.1)
+                    details.callback()
+                continue
+            yield details
+    finally:
+        if owns_crawler:
+            crawler.close()
 
-            except requests.exceptions.RequestException as e:
-                logging.error(f"Erro ao recuperar a página de categoria {current_category_page_url}: {e}. Pulando para a próxima categoria.")
-                has_next_page = False
-
-    return all_books_data
+def scrape_all_books_by_category(base_url=BASE_URL, crawler=None, state=None):
+    """
+    Raspa o catálogo inteiro e devolve a lista de livros.
+    Para catálogos grandes prefira `iter_books`, que não acumula tudo em memória.
+    """
+    return list(iter_books(base_url, crawler, state))
 
 # --- Funções de Banco de Dados ---
 
 def init_books_db():
     """
-    Inicializa o banco de dados 'books.db', cria a tabela se ela não existir.
+    Inicializa o banco de dados 'books.db', cria as tabelas se elas não existirem.
     """
-    DB_FILE = 'data/books.db'
-    if not os.path.exists('data'):
-        os.makedirs('data')
+    with writer(DB_FILE).transaction() as conn:
+        # Tabelas 'books', 'crawl_state', 'book_stats', índices e versão do catálogo
+        migrate_books(conn)
+    logger.info(f"Banco de dados '{DB_FILE}' e tabelas 'books', 'crawl_state' e 'book_stats' prontos.")
 
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    # Cria a tabela de livros se ela não existir
-    cursor.execute('''
-         CREATE TABLE IF NOT EXISTS books (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT,
-        category TEXT,
-        price REAL,
-        rating INTEGER,
-        is_in_stock BOOLEAN,
-        availability_text TEXT,
-        image_url TEXT,
-        book_page_url TEXT UNIQUE
-        )
-    ''')
-    conn.commit()
-    conn.close()
-    logging.info(f"Banco de dados '{DB_FILE}' e tabela 'books' prontos.")
+# Upsert pela URL do livro: livros novos ganham um id novo; livros existentes
+# mantêm o id e só são atualizados se algum campo mudou.
+UPSERT_BOOK_SQL = '''
+    INSERT INTO books (
+        title, category, price, rating, is_in_stock, availability_text, image_url, book_page_url
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(book_page_url) DO UPDATE SET
+        title = excluded.title,
+        category = excluded.category,
+        price = excluded.price,
+        rating = excluded.rating,
+        is_in_stock = excluded.is_in_stock,
+        availability_text = excluded.availability_text,
+        image_url = excluded.image_url
+    WHERE (title, category, price, rating, is_in_stock, availability_text, image_url)
+        IS NOT (excluded.title, excluded.category, excluded.price, excluded.rating,
+                excluded.is_in_stock, excluded.availability_text, excluded.image_url)
+'''
+
+def _book_row(book):
+    return (
+        book['title'],
+        book['category'],
+        book['price'],
+        book['rating'],
+        1 if book['is_in_stock'] else 0,
+        book['availability_text'],
+        book['image_url'],
+        book['book_page_url']
+    )
 
-def insert_books_into_db(books_data):
+def write_books(books, batch_size=DEFAULT_BATCH_SIZE, metrics=None):
     """
-    Insere os dados dos livros coletados no banco de dados.
+    Estágio de gravação: consome um iterável de livros e os grava em lotes
+    (`executemany` em transações explícitas, banco em WAL). Um `Checkpoint`
+    no fluxo é executado quando o lote com os livros anteriores a ele é
+    confirmado. Cada linha alterada incrementa a versão dos dados (triggers
+    de core/schema.py); a versão do catálogo é publicada uma vez, no fim.
+    Retorna as métricas do pipeline (linhas/s, latência dos lotes).
     """
-    DB_FILE = 'data/books.db'
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    logging.info(f"Iniciando a inserção de {len(books_data)} livros no banco de dados...")
-    for book in books_data:
-        try:
-           
-            is_in_stock_int = 1 if book['is_in_stock'] else 0
-            cursor.execute('''
-                INSERT OR IGNORE INTO books (
-                    id, title, category, price, rating, is_in_stock, availability_text, image_url, book_page_url
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                book['id'],
-                book['title'],
-                book['category'],
-                book['price'],
-                book['rating'],
-                is_in_stock_int,
-                book['availability_text'],
-                book['image_url'],
-                book['book_page_url']
-            ))
-        except sqlite3.IntegrityError as e:
-            logging.warning(f"Livro com URL duplicada '{book['book_page_url']}' ignorado. Erro: {e}")
-        except Exception as e:
-            logging.error(f"Erro ao inserir o livro '{book['title']}': {e}")
-            
-    conn.commit()
-    conn.close()
-    logging.info("Inserção de dados concluída.")
+    metrics = metrics or PipelineMetrics()
+    try:
+        with BatchWriter(DB_FILE, UPSERT_BOOK_SQL, batch_size, metrics) as batch_writer:
+            for book in books:
+                if isinstance(book, Checkpoint):
+                    batch_writer.after_commit(book.callback)
+                    continue
+                try:
+                    row = _book_row(book)
+                except Exception as e:
+                    metrics.record_error()
+                    logger.error(f"Erro ao preparar o livro '{book.get('title')}': {e}")
+                    continue
+                batch_writer.add(row)
+    finally:
+        # Mesmo se interrompida, os lotes já gravados mudaram o catálogo
+        if metrics.rows_changed:
+            with writer(DB_FILE).transaction() as conn:
+                bump_catalog_version(conn)
+    return metrics
+
+def insert_books_into_db(books_data, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Grava os livros coletados no banco de dados (upsert pela URL do livro).
+    Retorna a quantidade de linhas novas ou alteradas.
+    """
+    logger.info(f"Iniciando a gravação de {len(books_data)} livros no banco de dados...")
+    metrics = write_books(books_data, batch_size)
+    logger.info(f"Gravação de dados concluída. {metrics.rows_changed} livros novos ou alterados.")
+    return metrics.rows_changed
+
+# --- Execução completa ---
+
+def run_scraping(
+    base_url=BASE_URL,
+    crawler=None,
+    incremental=False,
+    batch_size=DEFAULT_BATCH_SIZE,
+    metrics=None,
+    cancel_event=None
+):
+    """
+    Executa o pipeline completo em fluxo: os livros raspados seguem direto
+    para o estágio de gravação, sem acumular o catálogo em memória.
+
+    Em modo incremental só as páginas que mudaram desde a última execução são
+    processadas. Retorna as métricas do pipeline (`rows_changed` traz a
+    quantidade de livros novos ou alterados); passe `metrics` para acompanhar
+    o progresso durante a execução e `cancel_event` para poder interrompê-la
+    (o que já foi gravado é mantido).
+    """
+    init_books_db()
+
+    state = CrawlState.load() if incremental else CrawlState()
+    metrics = metrics or PipelineMetrics()
+    books = iter_books(base_url, crawler, state, metrics=metrics, cancel_event=cancel_event, checkpoints=True)
+    write_books(books, batch_size, metrics)
+
+    if not metrics.rows_written and not state.pages_unchanged:
+        logger.warning("Nenhum dado de livro foi coletado. Verifique os logs de erro.")
+        return metrics
+
+    # Cancelado: o estado não é salvo e a próxima execução refaz as páginas
+    cancelled = cancel_event is not None and cancel_event.is_set()
+    if not cancelled:
+        state.save()
+
+    # Vizinhos dos livros (/similar): só os livros alterados são recalculados
+    if metrics.rows_changed:
+        refresh_neighbors(load_catalog(DB_FILE), DB_FILE)
+
+    logger.info(
+        f"Scraping e armazenamento de dados concluídos com sucesso. "
+        f"{state.pages_unchanged} páginas sem alteração puladas. Métricas: {metrics.as_dict()}"
+    )
+    return metrics
 
 # --- Bloco Principal de Execução ---
 
 if __name__ == "__main__":
-    logging.info("Iniciando o Tech Challenge: Extração de dados de livros.")
-    
-   
-    init_books_db()
-    
-    
-    all_collected_books = scrape_all_books_by_category()
-    
-    if not all_collected_books:
-        logging.warning("Nenhum dado de livro foi coletado. Verifique os logs de erro.")
-    else:
-        
-        for i, book in enumerate(all_collected_books):
-            book['id'] = i + 1
-        
-        
-        insert_books_into_db(all_collected_books)
-        
-        logging.info("Scraping e armazenamento de dados concluídos com sucesso.")
+    # Execute a partir da raiz do projeto: python -m scripts.scrape_books [--incremental]
+    import argparse
+    parser = argparse.ArgumentParser(description="Extração de dados de livros.")
+    parser.add_argument("--incremental", action="store_true", help="processa apenas as páginas alteradas")
+    args = parser.parse_args()
+
+    logging_config()
+    logger.info("Iniciando o Tech Challenge: Extração de dados de livros.")
+    run_scraping(incremental=args.incremental)
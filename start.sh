@@ -1,4 +1,12 @@
 #!/bin/bash
+# Uso: ./start.sh [dev|production]  (ou APP_MODE=production)
+MODE="${1:-${APP_MODE:-dev}}"
 
 python init_db.py
-uvicorn api.main:app --host 0.0.0.0 --port $PORT
+
+if [ "$MODE" = "production" ]; then
+    # N workers (WEB_CONCURRENCY, padrão: nº de CPUs) com preload; ver gunicorn.conf.py
+    exec gunicorn -c gunicorn.conf.py api.main:app
+else
+    uvicorn api.main:app --host 0.0.0.0 --port $PORT
+fi
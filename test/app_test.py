@@ -1,8 +1,10 @@
 import pytest
 from fastapi.testclient import TestClient
 import sqlite3
-import os
-from api.main import app
+from api.main import app, response_cache
+from core import database
+from core.catalog import refresh_catalog
+from core.schema import migrate_books
 
 client = TestClient(app)
 
@@ -10,26 +12,17 @@ client = TestClient(app)
 # FIXTURES
 # ===============================
 @pytest.fixture(scope="module", autouse=True)
-def setup_test_db():
+def setup_test_db(tmp_path_factory):
     """
-    Usa banco de dados SQLite em memória para os testes,
-    isolando do ambiente de produção.
+    Usa bancos SQLite temporários para os testes, isolando do ambiente de
+    produção: a API lê os caminhos de core.database e o catálogo em memória
+    é recarregado a partir do banco de teste.
     """
-    conn = sqlite3.connect(":memory:")
+    directory = tmp_path_factory.mktemp("app")
+    books_db, users_db = str(directory / "books.db"), str(directory / "users.db")
+    conn = sqlite3.connect(books_db)
+    migrate_books(conn)
     cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE books (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT,
-            category TEXT,
-            price REAL,
-            rating INTEGER,
-            is_in_stock BOOLEAN,
-            availability_text TEXT,
-            image_url TEXT,
-            book_page_url TEXT UNIQUE
-        )
-    """)
     cursor.executemany("""
         INSERT INTO books (title, category, price, rating, is_in_stock, availability_text, image_url, book_page_url)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
@@ -40,7 +33,15 @@ def setup_test_db():
     ])
     conn.commit()
     conn.close()
+
+    paths = (database.BOOKS_DB_PATH, database.USERS_DB_PATH)
+    database.BOOKS_DB_PATH, database.USERS_DB_PATH = books_db, users_db
+    refresh_catalog()
+    response_cache.clear()
     yield
+    database.BOOKS_DB_PATH, database.USERS_DB_PATH = paths
+    refresh_catalog()
+    response_cache.clear()
 
 # ===============================
 # TESTES CORE
@@ -74,6 +75,10 @@ def test_search_books_by_category():
     assert r.status_code == 200
     assert all(b["category"] == "Travel" for b in r.json())
 
+def test_search_books_limit_is_bounded():
+    assert client.get("/api/v1/books/search", params={"category": "Travel", "limit": 1000}).status_code == 200
+    assert client.get("/api/v1/books/search", params={"category": "Travel", "limit": 1001}).status_code == 422
+
 def test_get_all_categories():
     r = client.get("/api/v1/categories")
     assert r.status_code == 200
@@ -102,6 +107,39 @@ def test_books_price_range():
     assert r.status_code == 200
     assert all(9 <= b["price"] <= 12 for b in r.json())
 
+# ===============================
+# TESTES LOTE
+# ===============================
+def test_books_by_ids():
+    r = client.get("/api/v1/books", params={"ids": "3,1,9999,1"})
+    assert r.status_code == 200
+    assert [b["id"] for b in r.json()] == [3, 1]  # ordem pedida, sem repetições nem inexistentes
+    assert client.get("/api/v1/books", params={"ids": "1,x"}).status_code == 422
+    assert client.get("/api/v1/books", params={"ids": "1", "category": "Travel"}).status_code == 400
+
+def test_books_batch():
+    r = client.post("/api/v1/books/batch", json={"ids": [2, 1, 9999]})
+    assert r.status_code == 200
+    assert [b["id"] for b in r.json()] == [2, 1]
+    assert client.post("/api/v1/books/batch", json={"ids": list(range(1001))}).status_code == 422
+
+def test_books_multi_query():
+    r = client.post("/api/v1/books/multi", json={"queries": [
+        {"type": "search", "category": "Travel", "limit": 2},
+        {"type": "top_rated", "limit": 1},
+        {"type": "price_range", "min": 9, "max": 12},
+        {"type": "ids", "ids": [1]},
+    ]})
+    assert r.status_code == 200
+    search, top, price, by_id = r.json()
+    assert all(b["category"] == "Travel" for b in search) and len(search) <= 2
+    assert top == client.get("/api/v1/books/top-rated", params={"limit": 1}).json()
+    assert all(9 <= b["price"] <= 12 for b in price)
+    assert [b["id"] for b in by_id] == [1]
+
+    assert client.post("/api/v1/books/multi", json={"queries": [{"type": "search"}]}).status_code == 422
+    assert client.post("/api/v1/books/multi", json={"queries": [{"type": "outra"}]}).status_code == 422
+
 # ===============================
 # TESTES AUTENTICAÇÃO E ENDPOINT PROTEGIDO
 # ===============================
@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import numpy as np
+import pytest
+import init_db
+from core import artifact
+from core.catalog import bump_catalog_version, ensure_catalog_meta, load_catalog, read_catalog_meta, save_artifact
+from core.schema import migrate_books
+
+ROWS = [
+    (1, "A Light in the Attic", "Poetry", 51.77, 3, 1, "In stock", "img1", "url1"),
+    (2, "Tipping the Velvet", "Historical Fiction", 53.74, 1, 1, "In stock", "img2", "url2"),
+    (3, "Soumission", "Fiction", None, 1, 0, "Out of stock", "img3", "url3"),
+    (4, "Café com Açúcar", None, 20.0, 5, 1, "In stock", "img4", "url4"),
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "books.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute('''
+            CREATE TABLE books (
+                id INTEGER PRIMARY KEY, title TEXT, category TEXT, price REAL, rating INTEGER,
+                is_in_stock BOOLEAN, availability_text TEXT, image_url TEXT, book_page_url TEXT UNIQUE
+            )
+        ''')
+        conn.executemany("INSERT INTO books VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", ROWS)
+        ensure_catalog_meta(conn)
+    return path
+
+# ===============================
+# TESTES ARTEFATO DO CATÁLOGO
+# ===============================
+def test_artifact_round_trip_matches_database_snapshot(db):
+    built = load_catalog(db)
+    assert save_artifact(built, db)
+    assert not save_artifact(built, db)  # já está em dia
+
+    loaded = load_catalog(db)
+    assert loaded.stats_cells is not built.stats_cells  # veio do artefato
+    assert isinstance(loaded.encoded[1], memoryview)
+    assert not loaded.prices.flags.writeable  # view do mmap
+
+    assert loaded.version == built.version and loaded.all() == built.all()
+    assert loaded.encode(loaded.all()) == built.encode(built.all())
+    assert loaded.search(title="cafe") == built.search(title="cafe")
+    assert loaded.search(category="fiction") == built.search(category="fiction")
+    assert loaded.top_rated(3) == built.top_rated(3)
+    assert loaded.overview() == built.overview()
+    assert loaded.category_stats() == built.category_stats()
+    assert np.array_equal(loaded.prices, built.prices, equal_nan=True)
+
+def test_stale_or_invalid_artifact_falls_back_to_database(db):
+    save_artifact(load_catalog(db), db)
+    with sqlite3.connect(db) as conn:
+        conn.execute("UPDATE books SET price = 1.0 WHERE id = 1")
+        bump_catalog_version(conn)
+
+    snapshot = load_catalog(db)
+    assert snapshot.get(1)["price"] == 1.0
+    assert save_artifact(snapshot, db)  # regravado para a nova versão
+    assert load_catalog(db).get(1)["price"] == 1.0
+
+    with open(artifact.artifact_path(db), "wb") as f:
+        f.write(b"lixo")
+    assert artifact.read_header(artifact.artifact_path(db)) is None
+    assert load_catalog(db).get(1)["price"] == 1.0
+
+def test_direct_write_without_version_bump_invalidates_artifact(db):
+    with sqlite3.connect(db) as conn:
+        migrate_books(conn)
+    assert save_artifact(load_catalog(db), db)
+
+    # Escritor que não publica versão: os triggers mudam a versão dos dados
+    with sqlite3.connect(db) as conn:
+        version = read_catalog_meta(conn)[0]
+        conn.execute("INSERT INTO books (title, book_page_url) VALUES ('Novo', 'url5')")
+        assert read_catalog_meta(conn)[0] == version
+    snapshot = load_catalog(db)
+    assert len(snapshot) == len(ROWS) + 1
+    assert save_artifact(snapshot, db)
+
+def test_artifact_can_be_disabled(db, monkeypatch):
+    monkeypatch.setattr(artifact, "CATALOG_ARTIFACT", False)
+    assert not save_artifact(load_catalog(db), db)
+    assert not os.path.exists(artifact.artifact_path(db))
+
+# ===============================
+# TESTES SUBIDA
+# ===============================
+def test_api_import_skips_heavy_optional_modules():
+    code = "import sys, api.main; print(sorted(m for m in ('pandas', 'pyarrow', 'zstandard') if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+def test_init_db_uses_api_schema(tmp_path, monkeypatch):
+    path = str(tmp_path / "data" / "books.db")
+    monkeypatch.setattr(init_db, "DB_PATH", path)
+    init_db.init_db()
+    init_db.init_db()  # idempotente
+
+    snapshot = load_catalog(path)
+    assert len(snapshot) == 3 and snapshot.get(1)["title"] == "Book A"
+
+def test_init_db_replaces_the_artifact_of_the_empty_catalog(tmp_path, monkeypatch):
+    # API subindo antes do init_db.py: grava o artefato do catálogo vazio
+    path = str(tmp_path / "books.db")
+    with sqlite3.connect(path) as conn:
+        migrate_books(conn)
+    empty = load_catalog(path)
+    assert len(empty) == 0 and save_artifact(empty, path)
+
+    monkeypatch.setattr(init_db, "DB_PATH", path)
+    init_db.init_db()
+    snapshot = load_catalog(path)
+    assert len(snapshot) == 3 and snapshot.version > empty.version
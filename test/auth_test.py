@@ -0,0 +1,135 @@
+import asyncio
+import sqlite3
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from api.main import app
+from api.routers import auth
+import core.database as database
+from core import passwords
+from core.passwords import HasherBusy, PasswordHasher
+from core.ratelimit import TokenBucket
+from core.users import UserRepository
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def users_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "users.db")
+    monkeypatch.setattr(database, "USERS_DB_PATH", path)
+    auth.users.cache.clear()
+    auth.verified_tokens.clear()
+    yield path
+    auth.users.cache.clear()
+    auth.verified_tokens.clear()
+
+
+def login(username, password):
+    return client.post("/api/v1/auth/login", data={"username": username, "password": password})
+
+# ===============================
+# TESTES USUÁRIOS PERSISTIDOS
+# ===============================
+def test_register_persists_user_across_repositories(users_db):
+    r = client.post("/api/v1/auth/register", json={"username": "ana", "password": "s3cr3t"})
+    assert r.status_code == 200
+    assert client.post("/api/v1/auth/register", json={"username": "ana", "password": "x"}).status_code == 400
+
+    # Outro worker: repositório novo, cache vazio, mesmo banco
+    other = UserRepository()
+    assert other.get("ana")["hashed_password"].startswith("$2")
+    assert other.get("nobody") is None
+
+    assert login("ana", "s3cr3t").status_code == 200
+    assert login("ana", "errada").status_code == 400
+
+def test_user_writes_run_off_the_event_loop(users_db):
+    users = UserRepository()
+    loop_threads = []
+
+    async def write():
+        loop_threads.append(threading.get_ident())
+        assert await users.create_async("duda", "hash")
+        assert not await users.create_async("duda", "outro")
+        await users.update_password_async("duda", "novo")
+
+    written = []
+    create, update = users.create, users.update_password
+    users.create = lambda *args: written.append(threading.get_ident()) or create(*args)
+    users.update_password = lambda *args: written.append(threading.get_ident()) or update(*args)
+    asyncio.run(write())
+    assert len(written) == 3 and loop_threads[0] not in written
+    assert users.get("duda")["hashed_password"] == "novo"
+
+def test_user_table_is_created_off_the_event_loop(users_db):
+    users = UserRepository()
+    migrated = []
+    ensure_table = users.ensure_table
+    users.ensure_table = lambda: migrated.append(threading.get_ident()) or ensure_table()
+
+    async def read():
+        assert await users.get_async("ninguem") is None
+        assert await users.get_async("ninguem") is None
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(read())
+    assert len(migrated) == 1 and loop_thread not in migrated
+
+def test_verified_token_cache(users_db):
+    client.post("/api/v1/auth/register", json={"username": "bia", "password": "s3cr3t"})
+    token = login("bia", "s3cr3t").json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.post("/api/v1/auth/refresh", headers=headers).status_code == 200
+    hits = auth.verified_tokens.stats()["hits"]
+    assert client.post("/api/v1/auth/refresh", headers=headers).status_code == 200
+    assert auth.verified_tokens.stats()["hits"] == hits + 1
+
+    r = client.post("/api/v1/auth/refresh", headers={"Authorization": "Bearer invalido"})
+    assert r.status_code == 401
+
+def test_legacy_plaintext_password_is_hashed_by_migration(users_db):
+    with sqlite3.connect(users_db) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, username TEXT UNIQUE, password TEXT)")
+        conn.execute("INSERT INTO users (username, password) VALUES ('admin', 'senha123')")
+    assert login("admin", "senha123").status_code == 200
+    assert UserRepository().get("admin")["hashed_password"].startswith("$2b$")
+
+    # Depois da migração, texto puro gravado por fora continua recusado
+    with sqlite3.connect(users_db) as conn:
+        conn.execute("INSERT INTO users (username, password) VALUES ('legado', 'senha123')")
+    assert login("legado", "senha123").status_code == 400
+
+# ===============================
+# TESTES HASHING EM PROCESSOS
+# ===============================
+def test_login_rehashes_when_cost_changes(users_db, monkeypatch):
+    users = UserRepository()
+    users.create("caio", passwords.hash_password("s3cr3t", rounds=4))
+    monkeypatch.setattr(auth, "hasher", PasswordHasher(workers=1, rounds=5))
+    try:
+        assert login("caio", "s3cr3t").status_code == 200
+    finally:
+        auth.hasher.shutdown()
+    assert users.get("caio")["hashed_password"].startswith("$2b$05$")
+
+def test_hasher_queue_backpressure():
+    hasher = PasswordHasher(workers=1, queue_size=1, rounds=10)
+
+    async def storm():
+        return await asyncio.gather(*(hasher.hash("x") for _ in range(3)), return_exceptions=True)
+
+    try:
+        results = asyncio.run(storm())
+    finally:
+        hasher.shutdown()
+    assert sum(isinstance(r, HasherBusy) for r in results) == 2
+    assert hasher.stats()["rejected"] == 2
+
+def test_login_rate_limit(users_db, monkeypatch):
+    monkeypatch.setattr(auth, "login_bucket", TokenBucket(0.001, 1))
+    client.post("/api/v1/auth/register", json={"username": "duda", "password": "s3cr3t"})
+    r = login("duda", "s3cr3t")
+    assert r.status_code == 429
+    assert r.headers["Retry-After"] == "1"
@@ -0,0 +1,51 @@
+import sqlite3
+from benchmarks.suite import compare, summarize
+from benchmarks.synthetic import build_database, generate_books
+from core.catalog import load_catalog
+from core.schema import BOOKS_MIGRATIONS, full_scans, schema_version
+from core.stats import load_cells
+
+
+def report(**results):
+    return {"meta": {}, "results": results}
+
+
+def result(p99_ms, throughput, errors=0):
+    return {"p99_ms": p99_ms, "throughput": throughput, "unit": "req/s", "errors": errors}
+
+# ===============================
+# TESTES CATÁLOGO SINTÉTICO
+# ===============================
+def test_build_database_uses_current_schema(tmp_path):
+    path = build_database(str(tmp_path / "books.db"), 1500, batch_size=400)
+    with sqlite3.connect(path) as conn:
+        assert schema_version(conn) == len(BOOKS_MIGRATIONS)
+        assert conn.execute("SELECT COUNT(*) FROM books").fetchone()[0] == 1500
+        assert sum(cell[3] for cell in load_cells(conn)) == 1500  # resumo montado depois da carga
+        assert full_scans(conn, "SELECT * FROM books WHERE category = ? ORDER BY price LIMIT 10", ("Travel",)) == []
+
+    snapshot = load_catalog(path)
+    assert len(snapshot) == 1500
+    assert snapshot.get(1)["title"] == next(generate_books(1))[1]
+
+# ===============================
+# TESTES PORTÃO DE REGRESSÃO
+# ===============================
+def test_summarize_reports_percentiles_and_throughput():
+    summary = summarize([0.001 * i for i in range(1, 101)], elapsed=2.0, operations=1000, unit="rows/s")
+    assert summary["p50_ms"] == 51.0 and summary["p99_ms"] == 100.0
+    assert summary["throughput"] == 500.0 and summary["requests"] == 100
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = report(a=result(10.0, 1000.0), b=result(10.0, 1000.0), c=result(10.0, 1000.0), gone=result(1, 1))
+    current = report(
+        a=result(11.9, 810.0),     # dentro dos 20%
+        b=result(12.5, 1000.0),    # p99 +25%
+        c=result(10.0, 700.0, 3),  # vazão -30% e erros
+        new=result(99.0, 1.0),     # sem linha de base
+    )
+    regressions = compare(baseline, current, p99_threshold=0.2, throughput_threshold=0.2)
+    assert len(regressions) == 3
+    assert regressions[0].startswith("b: p99")
+    assert [line.split(":")[0] for line in regressions[1:]] == ["c", "c"]
+    assert compare(baseline, current, p99_threshold=0.5, throughput_threshold=0.5) == ["c: erros 0 -> 3"]
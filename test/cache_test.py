@@ -0,0 +1,96 @@
+import time
+from fastapi.testclient import TestClient
+from api.main import app, response_cache
+from core.cache import ResponseCache
+import core.catalog as catalog
+
+client = TestClient(app)
+
+# ===============================
+# TESTES CACHE LRU
+# ===============================
+def test_cache_evicts_least_recently_used_and_expires():
+    cache = ResponseCache(max_entries=2, max_bytes=1024, ttl=60)
+    cache.put("a", 200, [], b"1")
+    cache.put("b", 200, [], b"2")
+    assert cache.get("a").body == b"1"  # "a" passa a ser o mais recente
+    cache.put("c", 200, [], b"3")
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+    assert not cache.put("big", 200, [], b"x" * 2048)
+
+    cache.ttl = 0
+    cache.put("d", 200, [], b"4")
+    time.sleep(0.01)
+    assert cache.get("d") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_cache_version_change_drops_entries():
+    cache = ResponseCache()
+    cache.set_version(1)
+    cache.put((1, "/x"), 200, [], b"1")
+    cache.set_version(2)
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["invalidations"] == 1
+
+# ===============================
+# TESTES MIDDLEWARE
+# ===============================
+def test_etag_hit_and_not_modified():
+    response_cache.clear()
+    first = client.get("/api/v1/categories")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"].startswith("public")
+
+    before = response_cache.stats()["hits"]
+    second = client.get("/api/v1/categories")
+    assert second.content == first.content and second.headers["ETag"] == etag
+    assert response_cache.stats()["hits"] == before + 1
+
+    r = client.get("/api/v1/categories", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+
+    stats = client.get("/api/v1/cache/stats").json()
+    assert stats["not_modified"] >= 1
+
+def test_new_catalog_version_changes_etag(monkeypatch):
+    etag = client.get("/api/v1/stats/overview").headers["ETag"]
+    snapshot = catalog.get_catalog()
+    monkeypatch.setattr(snapshot, "version", snapshot.version + 1)
+    r = client.get("/api/v1/stats/overview", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+
+def test_ingested_batch_invalidates_live_routes(tmp_path, monkeypatch):
+    from core import database
+    from scripts import scrape_books
+    db_file = str(tmp_path / "books.db")
+    monkeypatch.setattr(database, "BOOKS_DB_PATH", db_file)
+    monkeypatch.setattr(scrape_books, "DB_FILE", db_file)
+    scrape_books.init_books_db()
+    book = {"title": "Book", "category": "Travel", "price": 10.0, "rating": 3, "is_in_stock": True,
+            "availability_text": "In stock", "image_url": "img", "book_page_url": "page"}
+    scrape_books.write_books([book])
+    response_cache.clear()
+
+    first = client.get("/api/v1/books")
+    assert [b["price"] for b in first.json()] == [10.0]
+    assert client.get("/api/v1/books", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    # Lote gravado no meio de um crawl: o snapshot não muda de versão, mas a
+    # rota que lê o banco deixa de servir a página antiga
+    snapshot_version = catalog.get_catalog().version
+    with scrape_books.BatchWriter(db_file, scrape_books.UPSERT_BOOK_SQL) as w:
+        w.add(scrape_books._book_row({**book, "price": 12.0}))
+    assert catalog.get_catalog().version == snapshot_version
+    r = client.get("/api/v1/books", headers={"If-None-Match": first.headers["ETag"]})
+    assert r.status_code == 200 and [b["price"] for b in r.json()] == [12.0]
+    assert r.headers["ETag"] != first.headers["ETag"]
+    response_cache.clear()
+
+def test_errors_are_not_cached():
+    client.get("/api/v1/books/999999")
+    r = client.get("/api/v1/books/999999")
+    assert r.status_code == 404
+    assert "ETag" not in r.headers
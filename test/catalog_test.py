@@ -0,0 +1,90 @@
+import json
+import sqlite3
+from core.catalog import COLUMNS, CatalogSnapshot
+from core.search import SearchIndex
+from core.stats import ensure_stats, load_cells
+
+ROWS = [
+    (1, "Book A", "Travel", 10.99, 4, 1, "In stock", "url_img_a", "url_page_a"),
+    (2, "Book B", "Travel", 15.50, 5, 1, "In stock", "url_img_b", "url_page_b"),
+    (3, "Book C", "Fiction", 8.00, 3, 0, "Out of stock", "url_img_c", "url_page_c"),
+]
+
+# ===============================
+# TESTES SNAPSHOT
+# ===============================
+def test_snapshot_lookups():
+    catalog = CatalogSnapshot(ROWS)
+    assert catalog.get(2)["title"] == "Book B"
+    assert catalog.get(99) is None
+    assert catalog.category_names == ["Fiction", "Travel"]
+    assert [b["id"] for b in catalog.top_rated(2)] == [2, 1]
+    assert [b["id"] for b in catalog.price_range(8, 11)] == [1, 3]
+
+def test_snapshot_encoded_json_matches_records():
+    catalog = CatalogSnapshot(ROWS)
+    assert json.loads(catalog.encode(catalog.top_rated(3))) == catalog.top_rated(3)
+    assert json.loads(catalog.encoded[3]) == catalog.get(3)
+
+def test_snapshot_prepare_builds_lazy_parts():
+    catalog = CatalogSnapshot(ROWS)
+    assert catalog._encoded is None and catalog._search_index is None
+    assert catalog.prepare() is catalog
+    assert catalog._encoded is not None and catalog._search_index is not None
+    assert catalog.search(title=catalog.get(1)["title"])[0]["id"] == 1
+
+def test_snapshot_stats():
+    catalog = CatalogSnapshot(ROWS)
+    overview = catalog.overview()
+    assert overview["total_books"] == 3
+    assert overview["avg_price"] == 11.5
+    assert catalog.category_stats() == [
+        {"category": "Fiction", "count": 1, "avg_price": 8.0},
+        {"category": "Travel", "count": 2, "avg_price": 13.25},
+    ]
+
+# ===============================
+# TESTES BUSCA
+# ===============================
+def test_search_index_accents_and_relevance():
+    index = SearchIndex(
+        ["Coração Selvagem", "O Coracao", "Descoração", "Outro Livro", "Coração"],
+        ["Romance", "Poetry", "Romance", "Fiction", "Poetry"],
+    )
+    assert index.search(title="CORACAO") == [4, 0, 1, 2]
+    assert index.search(title="coração", category="poe") == [4, 1]
+    assert index.search(title="coração", limit=2, offset=1) == [0, 1]
+    assert index.search(category="romance") == [0, 2]
+    assert index.search(title="xyz") == []
+
+# ===============================
+# TESTES ESTATÍSTICAS MATERIALIZADAS
+# ===============================
+def test_stats_triggers_follow_writes():
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.execute('''
+        CREATE TABLE books (
+            id INTEGER PRIMARY KEY, title TEXT, category TEXT, price REAL, rating INTEGER,
+            is_in_stock BOOLEAN, availability_text TEXT, image_url TEXT, book_page_url TEXT UNIQUE
+        )
+    ''')
+    conn.executemany("INSERT INTO books VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", ROWS)
+    ensure_stats(conn)  # preenche o resumo com as linhas existentes
+    conn.execute("INSERT INTO books VALUES (4, 'Book D', 'Fiction', 12.00, 3, 1, 'In stock', 'i', 'p')")
+    conn.execute("UPDATE books SET price = 20.0, rating = 1 WHERE id = 2")
+    conn.execute("DELETE FROM books WHERE id = 1")
+
+    rows = [tuple(r) for r in conn.execute(f"SELECT {', '.join(COLUMNS)} FROM books ORDER BY id")]
+    catalog = CatalogSnapshot(rows, stats_cells=load_cells(conn))
+    assert catalog.overview() == {"total_books": 3, "avg_price": 13.33, "rating_distribution": {3: 2, 1: 1}}
+    assert catalog.category_stats() == [
+        {"category": "Fiction", "count": 2, "avg_price": 10.0},
+        {"category": "Travel", "count": 1, "avg_price": 20.0},
+    ]
+    assert catalog.stats.price_histogram(width=10) == [
+        {"min": 0.0, "max": 10.0, "count": 1},
+        {"min": 10.0, "max": 20.0, "count": 1},
+        {"min": 20.0, "max": 30.0, "count": 1},
+    ]
+    assert catalog.stats.rating_histogram("Fiction") == [{"rating": 3, "count": 2}]
+    assert catalog.stats.price_percentiles("Fiction")["p50"] == 10.0
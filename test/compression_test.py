@@ -0,0 +1,72 @@
+import gzip
+import pytest
+from fastapi.testclient import TestClient
+from api import middleware
+from api.main import app
+from api.middleware import negotiate_encoding
+
+client = TestClient(app)
+
+# ===============================
+# TESTES NEGOCIAÇÃO
+# ===============================
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("*", "br"),
+    ("gzip;q=0, *;q=0.1", "br"),
+    ("identity", None),
+    ("deflate", None),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header, ("br", "gzip")) == expected
+
+# ===============================
+# TESTES MIDDLEWARE
+# ===============================
+def test_large_responses_are_gzipped():
+    params = {"limit": 200, "sort": "-rating"}
+    plain = client.get("/api/v1/books", params=params, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["vary"]
+
+    r = client.get("/api/v1/books", params=params, headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert int(r.headers["content-length"]) < len(plain.content) / 3
+    assert r.content == plain.content  # httpx descomprime
+
+def test_each_encoding_has_its_own_etag():
+    params = {"limit": 150, "sort": "price"}
+    plain = client.get("/api/v1/books", params=params, headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/api/v1/books", params=params, headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+
+    # Qualquer das formas (e a fraca) valida; o 304 devolve a que o cliente mandou
+    for etag in (gzipped.headers["etag"], plain.headers["etag"], "W/" + gzipped.headers["etag"]):
+        r = client.get("/api/v1/books", params=params, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert r.status_code == 304 and r.headers["etag"] == etag
+
+def test_small_responses_are_not_compressed():
+    r = client.get("/api/v1/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+
+def test_stream_is_compressed_unless_already_encoded():
+    params = {"format": "csv", "category": "Travel"}
+    r = client.get("/api/v1/books/export", params=params, headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip" and "content-length" not in r.headers
+    assert r.text.startswith("id,title")
+
+    # A exportação já comprimida passa intacta (sem dupla compressão)
+    with client.stream(
+        "GET", "/api/v1/books/export", params={**params, "compression": "gzip"}, headers={"Accept-Encoding": "gzip"}
+    ) as r:
+        raw = b"".join(r.iter_raw())
+    assert r.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(raw).decode().startswith("id,title")
+
+def test_brotli_is_optional(monkeypatch):
+    monkeypatch.setattr(middleware, "brotli", None)
+    r = client.get("/api/v1/books", params={"limit": 200}, headers={"Accept-Encoding": "br, gzip;q=0.5"})
+    assert r.headers["content-encoding"] == "gzip"
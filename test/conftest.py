@@ -1,6 +1,29 @@
-
-import sys
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 # Adiciona o diretório raiz do projeto ao PYTHONPATH
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
\ No newline at end of file
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+# ===============================
+# ISOLAMENTO DOS ARQUIVOS VERSIONADOS
+# ===============================
+# Os testes rodam sobre cópias dos bancos em um diretório temporário: as
+# migrações, o WAL, o artefato do catálogo e os vizinhos salvos ao lado do
+# banco não tocam data/. As variáveis precisam estar definidas antes de
+# core.database ser importado (na coleta dos módulos de teste).
+_TMP_DATA = tempfile.mkdtemp(prefix="books_api_test_")
+atexit.register(shutil.rmtree, _TMP_DATA, ignore_errors=True)
+
+for _name in ("books.db", "users.db"):
+    _source = os.path.join(ROOT, "data", _name)
+    if os.path.exists(_source):
+        shutil.copy(_source, os.path.join(_TMP_DATA, _name))
+
+os.environ["BOOKS_DB_PATH"] = os.path.join(_TMP_DATA, "books.db")
+os.environ["USERS_DB_PATH"] = os.path.join(_TMP_DATA, "users.db")
+# Sem arquivo de log: só o console
+os.environ["LOG_FILE"] = ""
@@ -0,0 +1,114 @@
+import asyncio
+import sqlite3
+import time
+import pytest
+from fastapi.testclient import TestClient
+from api.main import app
+from api.routers import books
+from core.database import DatabaseBusy, QueryExecutor, QueryTimeout, ReadPool, read_pool, writer
+
+# Consulta sem fim: só termina interrompida
+ENDLESS = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT COUNT(*) FROM c"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "executor.db")
+    with writer(path).transaction() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.execute("INSERT INTO t VALUES (7)")
+    return path
+
+
+def scalar(conn, sql):
+    return conn.execute(sql).fetchone()[0]
+
+# ===============================
+# TESTES POOL DE CONEXÕES
+# ===============================
+def test_writer_and_read_pool(tmp_path):
+    path = str(tmp_path / "pool.db")
+    with writer(path).transaction() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.execute("INSERT INTO t VALUES (1)")
+
+    pool = ReadPool(path, size=1)
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("SELECT x FROM t").fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO t VALUES (2)")
+        # Pool esgotado: a próxima conexão espera e desiste no timeout
+        with pytest.raises(TimeoutError):
+            with pool.connection(timeout=0.05):
+                pass
+
+    with pool.connection() as again:
+        assert again is conn
+    pool.close()
+
+def test_writer_rolls_back_on_error(tmp_path):
+    path = str(tmp_path / "rollback.db")
+    with writer(path).transaction() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+    with pytest.raises(RuntimeError):
+        with writer(path).transaction() as conn:
+            conn.execute("INSERT INTO t VALUES (1)")
+            raise RuntimeError("falha")
+    with writer(path).transaction() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+# ===============================
+# TESTES EXECUTOR DE CONSULTAS
+# ===============================
+def test_executor_runs_query_off_the_event_loop(db_path):
+    executor = QueryExecutor(workers=2, queue_size=4)
+
+    async def main():
+        return await asyncio.gather(*(executor.run(scalar, "SELECT x FROM t", path=db_path) for _ in range(4)))
+
+    try:
+        assert asyncio.run(main()) == [7, 7, 7, 7]
+        assert executor.stats()["pending"] == 0
+    finally:
+        executor.shutdown()
+
+def test_executor_sheds_load_when_queue_is_full(db_path):
+    executor = QueryExecutor(workers=1, queue_size=2, timeout=0.2)
+
+    async def storm():
+        return await asyncio.gather(
+            *(executor.run(scalar, ENDLESS, path=db_path) for _ in range(4)), return_exceptions=True
+        )
+
+    try:
+        results = asyncio.run(storm())
+    finally:
+        executor.shutdown()
+    assert sum(isinstance(r, DatabaseBusy) for r in results) == 2
+    assert sum(isinstance(r, QueryTimeout) for r in results) == 2
+    assert executor.stats()["rejected"] == 2
+
+def test_executor_timeout_interrupts_query(db_path):
+    executor = QueryExecutor(workers=1, queue_size=1, timeout=0.1)
+    try:
+        with pytest.raises(QueryTimeout):
+            asyncio.run(executor.run(scalar, ENDLESS, path=db_path))
+        # A vaga volta quando a thread sai do SQLite interrompido
+        deadline = time.monotonic() + 5
+        while executor.stats()["pending"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert executor.stats()["pending"] == 0
+        # A conexão interrompida volta ao pool e continua utilizável
+        assert asyncio.run(executor.run(scalar, "SELECT x FROM t", path=db_path)) == 7
+        assert executor.stats()["timeouts"] == 1
+    finally:
+        executor.shutdown()
+        read_pool(db_path).close()
+
+def test_books_returns_503_when_executor_is_full(monkeypatch):
+    monkeypatch.setattr(books, "query_executor", QueryExecutor(queue_size=1))
+    books.query_executor._slots.acquire()  # única vaga ocupada
+    r = TestClient(app).get("/api/v1/books")
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
@@ -0,0 +1,82 @@
+import csv
+import gzip
+import io
+import json
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+from api.main import app
+import core.export as export
+from core.catalog import COLUMNS, get_catalog
+from core.database import read_pool
+from core.query import BookQuery
+from core.schema import migrate_books
+
+client = TestClient(app)
+
+# ===============================
+# TESTES EXPORTAÇÃO
+# ===============================
+def test_export_ndjson_streams_whole_catalog():
+    r = client.get("/api/v1/books/export")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    books = [json.loads(line) for line in r.text.splitlines()]
+    assert len(books) == len(get_catalog())
+    assert books[0] == get_catalog().get(books[0]["id"])
+
+def test_export_csv_with_filters_and_gzip():
+    r = client.get("/api/v1/books/export", params={"format": "csv", "category": "Travel", "compression": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == "gzip"
+    rows = list(csv.reader(io.StringIO(r.text)))
+    assert tuple(rows[0]) == COLUMNS
+    assert len(rows) - 1 == sum(1 for b in get_catalog().all() if b["category"] == "Travel")
+    assert all(row[2] == "Travel" for row in rows[1:])
+
+def test_export_reads_in_chunks():
+    chunks = list(export.iter_chunks(BookQuery(limit=None), chunk_size=300))
+    assert [len(c) for c in chunks[:-1]] == [300] * (len(chunks) - 1)
+    assert sum(len(c) for c in chunks) == len(get_catalog())
+
+    compressed = b"".join(export.export_books(BookQuery(limit=None), "ndjson", "gzip", chunk_size=300))
+    assert len(gzip.decompress(compressed).splitlines()) == len(get_catalog())
+
+def test_export_does_not_hold_a_pooled_connection_between_chunks():
+    pool = read_pool()
+    chunks = export.iter_chunks(BookQuery(limit=None, sort="-price", category="Travel"), chunk_size=3)
+    first = next(chunks)
+    # Cliente lento parado entre dois blocos: a conexão já voltou ao pool
+    assert pool._idle.qsize() == pool._created
+
+    rows = first + [row for chunk in chunks for row in chunk]
+    prices = [row[COLUMNS.index("price")] for row in rows]
+    ids = [row[0] for row in rows]
+    assert prices == sorted(prices, reverse=True) and len(set(ids)) == len(ids)
+    assert len(rows) == sum(1 for b in get_catalog().all() if b["category"] == "Travel")
+
+@pytest.mark.parametrize("sort", ["price", "-price"])
+def test_export_chunks_cross_null_sort_values(tmp_path, sort):
+    db = str(tmp_path / "books.db")
+    with sqlite3.connect(db) as conn:
+        migrate_books(conn)
+        conn.executemany(
+            "INSERT INTO books (id, title, price, book_page_url) VALUES (?, ?, ?, ?)",
+            [(i, f"Book {i}", None if i % 2 else float(i), f"url{i}") for i in range(1, 11)]
+        )
+    chunks = list(export.iter_chunks(BookQuery(limit=None, sort=sort), chunk_size=2, db_path=db))
+    assert sorted(row[0] for chunk in chunks for row in chunk) == list(range(1, 11))
+
+def test_export_parquet_roundtrip():
+    pq = pytest.importorskip("pyarrow.parquet")
+    r = client.get("/api/v1/books/export", params={"format": "parquet", "min_rating": 5})
+    assert r.status_code == 200
+    table = pq.read_table(io.BytesIO(r.content))
+    assert table.column_names == list(COLUMNS)
+    assert set(table.column("rating").to_pylist()) == {5}
+
+def test_export_missing_optional_dependency(monkeypatch):
+    monkeypatch.setattr(export, "pa", None)
+    r = client.get("/api/v1/books/export", params={"format": "arrow"})
+    assert r.status_code == 501
+    assert "pyarrow" in r.json()["detail"]
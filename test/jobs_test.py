@@ -0,0 +1,101 @@
+import threading
+import core.database as database
+from core.jobs import JobManager, StoredJob, SUCCEEDED, CANCELLED, FAILED, RUNNING
+
+class Progress:
+    def __init__(self):
+        self.steps = 0
+
+    def as_dict(self):
+        return {"steps": self.steps}
+
+def wait_done(job, timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        if job.done:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("job não terminou")
+
+# ===============================
+# TESTES JOBS
+# ===============================
+def test_single_flight_and_progress(tmp_path):
+    manager = JobManager("teste", db_path=str(tmp_path / "books.db"))
+    release = threading.Event()
+
+    def target(job):
+        job.progress.steps += 1
+        release.wait(5)
+
+    job, created = manager.submit(target, Progress())
+    again, created_again = manager.submit(target, Progress())
+    assert created and not created_again
+    assert again is job
+
+    release.set()
+    wait_done(job)
+    assert job.status == SUCCEEDED
+    assert job.as_dict()["progress"] == {"steps": 1}
+    assert manager.submit(target, Progress())[1]
+
+def test_cancel_and_failure(tmp_path):
+    manager = JobManager("teste", db_path=str(tmp_path / "books.db"))
+    started = threading.Event()
+
+    def target(job):
+        started.set()
+        job.cancel_event.wait(5)
+
+    job, _ = manager.submit(target, Progress())
+    started.wait(5)
+    manager.cancel(job.id)
+    wait_done(job)
+    assert job.status == CANCELLED
+
+    def broken(job):
+        raise RuntimeError("falhou")
+
+    job, _ = manager.submit(broken, Progress())
+    wait_done(job)
+    assert job.status == FAILED
+    assert job.error == "falhou"
+
+def test_job_state_is_shared_between_workers(tmp_path):
+    # Dois gerenciadores sobre o mesmo banco fazem o papel de dois workers
+    path = str(tmp_path / "books.db")
+    first = JobManager("teste", db_path=path, heartbeat=0.01)
+    second = JobManager("teste", db_path=path, heartbeat=0.01)
+    started = threading.Event()
+
+    def target(job):
+        started.set()
+        job.cancel_event.wait(5)
+
+    job, _ = first.submit(target, Progress())
+    started.wait(5)
+    seen, created = second.submit(target, Progress())
+    assert not created
+    assert isinstance(seen, StoredJob) and seen.id == job.id
+    assert second.get(job.id).status == RUNNING
+
+    # O cancelamento pedido no outro worker chega ao dono pelo heartbeat
+    assert second.cancel(job.id).id == job.id
+    wait_done(job)
+    assert job.status == CANCELLED
+    assert second.get(job.id).status == CANCELLED
+    assert second.get("inexistente") is None
+
+def test_job_without_heartbeat_is_marked_failed(tmp_path):
+    path = str(tmp_path / "books.db")
+    dead = JobManager("teste", db_path=path, stale_after=0.05)
+    job, _ = dead.submit(lambda job: None, Progress())
+    wait_done(job)
+    # Simula um worker que morreu com o job ativo
+    with database.writer(path).transaction() as conn:
+        conn.execute("UPDATE jobs SET status = 'running', heartbeat_at = 0 WHERE id = ?", (job.id,))
+
+    other = JobManager("teste", db_path=path, stale_after=0.05)
+    new, created = other.submit(lambda job: None, Progress())
+    assert created and new.id != job.id
+    assert other.get(job.id).status == FAILED
+    wait_done(new)
@@ -0,0 +1,104 @@
+import importlib
+import json
+import logging
+import os
+import queue
+import sys
+import time
+import pytest
+from core import loggin_config
+from core.loggin_config import JsonFormatter, NonBlockingQueueHandler, RateLimitFilter, parse_levels
+from scripts.parsers import LOG_SNIPPET_CHARS, get_book_details
+
+
+def make_record(msg="falhou", level=logging.ERROR, lineno=10, **extra):
+    record = logging.LogRecord("scripts.teste", level, "/x/teste.py", lineno, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+# ===============================
+# TESTES FORMATO E FILTROS
+# ===============================
+def test_json_formatter_includes_extra_and_exception():
+    try:
+        raise ValueError("quebrou")
+    except ValueError:
+        record = make_record(exc_info=sys.exc_info(), job_id="abc")
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["level"] == "ERROR" and entry["logger"] == "scripts.teste"
+    assert entry["msg"] == "falhou" and entry["job_id"] == "abc"
+    assert "ValueError: quebrou" in entry["exc"]
+
+def test_rate_limit_filter_suppresses_repeated_errors():
+    limiter = RateLimitFilter(burst=3, window=0.05)
+    passed = [limiter.filter(make_record()) for _ in range(10)]
+    assert passed.count(True) == 3
+
+    assert limiter.filter(make_record(lineno=11))  # outra linha de código
+    assert limiter.filter(make_record(level=logging.INFO))
+
+    time.sleep(0.06)
+    record = make_record()
+    assert limiter.filter(record) and record.suppressed == 7
+
+def test_queue_handler_never_blocks_when_full():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+    start = time.perf_counter()
+    for _ in range(100):
+        handler.handle(make_record())
+    assert time.perf_counter() - start < 0.5
+    assert handler.queue.qsize() == 2 and handler.dropped == 98
+
+def test_parse_levels():
+    assert parse_levels("scripts.crawler=debug, urllib3=WARNING,,x") == {"scripts.crawler": "DEBUG", "urllib3": "WARNING"}
+
+# ===============================
+# TESTES CONFIGURAÇÃO
+# ===============================
+@pytest.fixture
+def configured(tmp_path):
+    root = logging.getLogger()
+    level = root.level
+    log_file = tmp_path / "logs" / "app.log"
+    loggin_config.logging_config(level="INFO", levels="scripts.teste=WARNING", log_file=str(log_file), fmt="text")
+    yield log_file
+    loggin_config.shutdown_logging()
+    root.setLevel(level)
+    logging.getLogger("scripts.teste").setLevel(logging.NOTSET)
+
+def test_logging_config_writes_json_lines_in_background(configured):
+    handler = loggin_config._state["handler"]
+    assert loggin_config.logging_config() is handler  # idempotente
+
+    logging.getLogger("core.teste").info("gravado", extra={"rows": 5})
+    logging.getLogger("scripts.teste").info("abaixo do nível do módulo")
+    loggin_config.shutdown_logging()
+
+    lines = [json.loads(line) for line in configured.read_text(encoding="utf-8").splitlines()]
+    assert [(entry["msg"], entry["rows"]) for entry in lines] == [("gravado", 5)]
+    assert handler not in logging.getLogger().handlers
+
+def test_per_process_log_file(tmp_path):
+    log_file = tmp_path / "app.log"
+    assert loggin_config.process_log_file(str(log_file), pid=42) == str(tmp_path / "app.42.log")
+    loggin_config.logging_config(log_file=str(log_file), per_process=True)
+    try:
+        logging.getLogger("core.teste").warning("worker")
+    finally:
+        loggin_config.shutdown_logging()
+    assert not log_file.exists()
+    assert (tmp_path / f"app.{os.getpid()}.log").read_text(encoding="utf-8")
+
+def test_importing_scraper_does_not_configure_logging():
+    handlers = list(logging.getLogger().handlers)
+    import scripts.scrape_books as scrape_books
+    importlib.reload(scrape_books)
+    assert logging.getLogger().handlers == handlers
+
+def test_extraction_error_logs_only_a_snippet(caplog):
+    from bs4 import BeautifulSoup
+    article = BeautifulSoup("<article>" + "<p>x</p>" * 500 + "</article>", "html.parser").article
+    with caplog.at_level(logging.ERROR):
+        assert get_book_details(article, "Teste") is None
+    message = caplog.records[-1].getMessage()
+    assert len(message) < LOG_SNIPPET_CHARS + 200 and message.endswith("...")
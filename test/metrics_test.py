@@ -0,0 +1,98 @@
+import time
+from fastapi.testclient import TestClient
+from api.main import app, response_cache
+from api.routers import auth
+from core import profiler
+from core.metrics import MetricsRegistry
+from core.profiler import StackSampler
+
+client = TestClient(app)
+
+
+def sample_value(text, prefix):
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+# ===============================
+# TESTES REGISTRO
+# ===============================
+def test_registry_renders_cumulative_histograms():
+    registry = MetricsRegistry()
+    registry.observe_request("GET", "/books", 200, 0.003, 2000, {"db": 0.001})
+    registry.observe_request("GET", "/books", 200, 0.2, 100, {})
+    registry.register_collector("fila", "gauge", "Tamanho da fila.", lambda: [({"nome": 'a"b'}, 3)])
+    text = registry.render()
+
+    assert 'http_requests_total{method="GET",route="/books",status="200"} 2' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/books",le="0.005"} 1' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/books",le="+Inf"} 2' in text
+    assert 'db_time_seconds_count{method="GET",route="/books"} 1' in text
+    assert 'http_response_size_bytes_sum{method="GET",route="/books"} 2100' in text
+    assert 'fila{nome="a\\"b"} 3' in text
+
+# ===============================
+# TESTES MIDDLEWARE
+# ===============================
+def test_metrics_are_labelled_by_route_template_with_phases():
+    response_cache.clear()
+    client.get("/api/v1/books", params={"limit": 5})
+    first = client.get("/api/v1/books/1")
+    client.get("/api/v1/books/1", headers={"If-None-Match": first.headers["ETag"]})
+
+    text = client.get("/metrics").text
+    assert "/books/1\"" not in text  # sem cardinalidade por URL
+    count = [line for line in text.splitlines() if line.startswith("http_requests_total") and '/books/{book_id}",status="304"' in line]
+    assert count  # 304 do cache também é atribuído ao template da rota
+
+    assert any(line.startswith("db_time_seconds_count") and "/books\"" in line for line in text.splitlines())
+    assert any(line.startswith("serialization_time_seconds_count") and "/books\"" in line for line in text.splitlines())
+    assert sample_value(text, "response_cache_events_total{event=\"not_modified\"}") >= 1
+
+def test_unmatched_paths_share_one_label():
+    client.get("/nao/existe/1")
+    client.get("/nao/existe/2")
+    text = client.get("/metrics").text
+    assert "/nao/existe" not in text
+    assert 'route="unmatched",status="404"' in text
+
+# ===============================
+# TESTES PROFILER
+# ===============================
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def test_stack_sampler_collects_folded_stacks():
+    sampler = StackSampler(sample_rate=1.0, interval=0.001)
+    assert sampler.should_sample()
+    assert not StackSampler(sample_rate=0).should_sample()
+
+    sampler.begin()
+    busy_loop(0.1)
+    sampler.end()
+
+    folded = sampler.folded()
+    assert "metrics_test.py:busy_loop" in folded
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded.splitlines())
+    sampler.reset()
+    assert sampler.folded() == ""
+
+def test_profile_endpoint_requires_auth_and_returns_folded(monkeypatch):
+    assert client.get("/api/v1/debug/profile").status_code == 401
+
+    sampler = StackSampler(sample_rate=1.0, interval=0.001)
+    monkeypatch.setattr(profiler, "sampler", sampler)
+    sampler.begin()
+    busy_loop(0.05)
+    sampler.end()
+
+    app.dependency_overrides[auth.get_current_user] = lambda: {"username": "admin"}
+    try:
+        r = client.get("/api/v1/debug/profile", params={"reset": True})
+    finally:
+        app.dependency_overrides.clear()
+    assert r.status_code == 200 and "busy_loop" in r.text
+    assert sampler.folded() == ""
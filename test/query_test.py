@@ -0,0 +1,145 @@
+import base64
+import json
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+from api.main import app
+from benchmarks.synthetic import generate_books
+from core.query import DEFAULT_LIMIT, BookQuery, InvalidCursor
+from core.schema import migrate_books
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute('''
+        CREATE TABLE books (
+            id INTEGER PRIMARY KEY, title TEXT, category TEXT, price REAL, rating INTEGER,
+            is_in_stock BOOLEAN, availability_text TEXT, image_url TEXT, book_page_url TEXT UNIQUE
+        )
+    ''')
+    conn.executemany("INSERT INTO books VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", generate_books(500))
+    migrate_books(conn)
+    yield conn
+    conn.close()
+
+
+def walk(conn, **filters):
+    books, cursor = BookQuery(limit=37, **filters).execute(conn)
+    while cursor:
+        page, cursor = BookQuery(limit=37, cursor=cursor, **filters).execute(conn)
+        books.extend(page)
+    return books
+
+# ===============================
+# TESTES CONSULTA / CURSOR
+# ===============================
+@pytest.mark.parametrize("sort", ["id", "-id", "price", "-price", "rating", "-rating"])
+def test_cursor_walks_whole_catalog_in_order(conn, sort):
+    books = walk(conn, sort=sort)
+    column = sort.lstrip("-")
+    expected = conn.execute(
+        f"SELECT id FROM books ORDER BY {column} {'DESC' if sort.startswith('-') else 'ASC'}, id "
+        f"{'DESC' if sort.startswith('-') else 'ASC'}"
+    ).fetchall()
+    assert [b[0] for b in books] == [row[0] for row in expected]
+
+@pytest.mark.parametrize("sort", ["price", "-price", "rating", "-rating"])
+def test_cursor_walks_null_sort_values(conn, sort):
+    # Nulos no começo, no meio (pelo id) e no fim da ordem
+    conn.execute("UPDATE books SET price = NULL, rating = NULL WHERE id % 7 = 0 OR id IN (1, 500)")
+    books = walk(conn, sort=sort)
+    column = sort.lstrip("-")
+    direction = "DESC" if sort.startswith("-") else "ASC"
+    expected = conn.execute(f"SELECT id FROM books ORDER BY {column} {direction}, id {direction}").fetchall()
+    assert [b[0] for b in books] == [row[0] for row in expected]
+
+def test_filters_are_combined(conn):
+    books = walk(conn, category="Mystery", min_price=10, max_price=40, min_rating=3, in_stock=True, sort="-rating")
+    expected = conn.execute(
+        "SELECT COUNT(*) FROM books WHERE category = 'Mystery' AND price BETWEEN 10 AND 40 "
+        "AND rating >= 3 AND is_in_stock = 1"
+    ).fetchone()[0]
+    assert len(books) == expected
+    assert all(b[2] == "Mystery" and 10 <= b[3] <= 40 and b[4] >= 3 for b in books)
+
+def test_queries_use_indexes(conn):
+    for filters in ({"category": "Travel", "sort": "price"}, {"min_rating": 4, "sort": "-rating"}):
+        sql, params = BookQuery(**filters).to_sql()
+        plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+        assert "USING INDEX" in plan and "TEMP B-TREE" not in plan
+
+def test_invalid_cursor(conn):
+    _, cursor = BookQuery(limit=5, sort="price").execute(conn)
+    with pytest.raises(InvalidCursor):
+        BookQuery(sort="rating", cursor=cursor)
+    with pytest.raises(InvalidCursor):
+        BookQuery(cursor="não-é-um-cursor")
+
+def forge_cursor(*payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+@pytest.mark.parametrize("payload", [
+    ("price", [1], 3), ("price", {"a": 1}, 3), ("price", "10", 3), ("price", 10.0, [3]),
+    ("id", 1.5, 3), ("rating", True, 3), ("rating", 4, None), ("price", 10.0),
+])
+def test_cursor_value_must_match_sort_column(payload):
+    with pytest.raises(InvalidCursor):
+        BookQuery(sort=payload[0], cursor=forge_cursor(*payload))
+    r = client.get("/api/v1/books", params={"sort": payload[0], "cursor": forge_cursor(*payload)})
+    assert r.status_code == 400
+
+def test_projection_reads_only_requested_columns(conn):
+    full = walk(conn, sort="-price")
+    projected = walk(conn, sort="-price", fields=("title",))
+    assert [(b[1],) for b in full] == [b[:1] for b in projected]  # cursor usa id e preço lidos no fim
+
+    sql, params = BookQuery(sort="price", fields=("id", "price")).to_sql()
+    assert sql.startswith("SELECT id, price FROM")
+    plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+    assert "COVERING INDEX" in plan
+    with pytest.raises(ValueError):
+        BookQuery(fields=("id", "senha"))
+
+# ===============================
+# TESTES ENDPOINT
+# ===============================
+def test_list_books_pagination_headers():
+    r = client.get("/api/v1/books", params={"limit": 2, "sort": "-price"})
+    assert r.status_code == 200
+    assert len(r.json()) == 2
+    cursor = r.headers["X-Next-Cursor"]
+    assert 'rel="next"' in r.headers["Link"]
+
+    r2 = client.get("/api/v1/books", params={"limit": 2, "sort": "-price", "cursor": cursor})
+    assert r2.json()[0]["price"] <= r.json()[-1]["price"]
+    assert {b["id"] for b in r.json()}.isdisjoint(b["id"] for b in r2.json())
+
+    assert client.get("/api/v1/books", params={"cursor": "xyz"}).status_code == 400
+    assert client.get("/api/v1/books", params={"limit": 5000}).status_code == 422
+
+def test_fields_projection_on_list_endpoints():
+    r = client.get("/api/v1/books", params={"limit": 3, "sort": "price", "fields": "price,id,price"})
+    assert r.status_code == 200
+    assert [list(b) for b in r.json()] == [["price", "id"]] * 3
+    r2 = client.get("/api/v1/books", params={"limit": 3, "sort": "price", "fields": "id", "cursor": r.headers["X-Next-Cursor"]})
+    assert {b["id"] for b in r.json()}.isdisjoint(b["id"] for b in r2.json())
+
+    r = client.get("/api/v1/books/price-range", params={"min": 10, "max": 30, "limit": 5, "fields": "title,price"})
+    assert all(set(b) == {"title", "price"} and 10 <= b["price"] <= 30 for b in r.json())
+    category = client.get("/api/v1/categories").json()[0]
+    r = client.get("/api/v1/books/search", params={"category": category, "limit": 5, "fields": "category"})
+    assert r.json() and all(b == {"category": category} for b in r.json())
+
+    assert client.get("/api/v1/books", params={"fields": "id,senha"}).status_code == 422
+    assert client.get("/api/v1/books/search", params={"title": "a", "fields": ""}).status_code == 422
+
+def test_search_books_default_limit():
+    # Sem `limit`, a busca devolve no máximo DEFAULT_LIMIT livros, como /books
+    r = client.get("/api/v1/books/search", params={"title": "a", "fields": "id"})
+    assert len(r.json()) == DEFAULT_LIMIT
+    r = client.get("/api/v1/books/search", params={"title": "a", "fields": "id", "limit": 1000})
+    assert len(r.json()) > DEFAULT_LIMIT
@@ -0,0 +1,167 @@
+import time
+from collections import Counter
+import numpy as np
+from fastapi.testclient import TestClient
+from api.main import app
+from benchmarks.synthetic import generate_books
+from core import database, recommend
+from core.catalog import CatalogSnapshot, get_catalog
+from core.recommend import FeatureSpace, NeighborIndex, neighbors_path, refresh_neighbors
+
+client = TestClient(app)
+
+ROWS = [
+    (1, "The Lost Mountain", "Travel", 10.99, 4, 1, "In stock", "", "a"),
+    (2, "Lost in the Mountain", "Travel", 12.50, 4, 1, "In stock", "", "b"),
+    (3, "Murder at the Manor", "Mystery", 45.00, 2, 0, "Out of stock", "", "c"),
+    (4, "Manor Murder Again", "Mystery", 40.00, 2, 0, "Out of stock", "", "d"),
+    (5, "Mountain Roads", "Travel", 11.00, 5, 1, "In stock", "", "e"),
+]
+
+
+def brute_force(snapshot, space, k):
+    features = space.transform(snapshot)
+    scores = features @ features.T
+    np.fill_diagonal(scores, -np.inf)
+    # Categorias com mais de k outros livros só comparam dentro da categoria
+    sizes = Counter(snapshot.categories)
+    restricted = np.array([sizes[category] > k for category in snapshot.categories])
+    scores[restricted[:, None] & (snapshot.categories[:, None] != snapshot.categories[None, :])] = -np.inf
+    return recommend._top_k(scores, np.asarray(snapshot.ids), k)
+
+# ===============================
+# TESTES ÍNDICE DE VIZINHOS
+# ===============================
+def test_similar_books_share_category_and_title():
+    index = NeighborIndex.build(CatalogSnapshot(ROWS), k=3)
+    assert index.similar(1, 2) == [2, 5]
+    assert index.similar(3, 1) == [4]
+    assert index.similar(99) is None
+    assert 1 not in index.similar(1)
+
+def test_large_categories_only_compare_within_category():
+    rows = [tuple(row) for row in generate_books(600)]
+    snapshot = CatalogSnapshot(rows)
+    index = NeighborIndex.build(snapshot, k=10)
+    assert index.restricted.any() and not index.restricted.all()
+    expected_ids, expected_scores = brute_force(snapshot, index.space, 10)
+    assert np.allclose(index.scores, expected_scores)
+    for pos in np.flatnonzero(index.restricted)[:20]:
+        category = snapshot.categories[pos]
+        assert all(snapshot.get(i)["category"] == category for i in index.similar(int(snapshot.ids[pos])))
+
+def test_category_growing_past_k_is_restricted_on_update():
+    index = NeighborIndex.build(CatalogSnapshot(ROWS), k=2)
+    assert index.restricted.tolist() == [True, True, False, False, True]  # Travel: 3 livros, Mystery: 2
+
+    snapshot = CatalogSnapshot(ROWS + [(6, "The Manor Mystery", "Mystery", 42.0, 2, 0, "Out of stock", "", "f")])
+    updated = index.update(snapshot)
+    assert updated.space is index.space and updated.restricted.all()
+    expected_ids, expected_scores = brute_force(snapshot, index.space, 2)
+    assert np.allclose(updated.scores, expected_scores)
+    assert set(updated.similar(3)) <= {4, 6}
+
+def test_small_catalog_pads_neighbors():
+    index = NeighborIndex.build(CatalogSnapshot(ROWS[:2]), k=4)
+    assert index.neighbors.shape == (2, 4)
+    assert index.similar(1) == [2]
+
+def test_recommend_sums_neighbor_lists():
+    index = NeighborIndex.build(CatalogSnapshot(ROWS), k=3)
+    recommended = index.recommend([1, 2], 2)
+    assert recommended[0] == 5 and not {1, 2} & set(recommended)
+    assert index.recommend([99]) == []
+
+def test_incremental_update_matches_full_recompute():
+    rows = [tuple(row) for row in generate_books(600)]
+    index = NeighborIndex.build(CatalogSnapshot(rows), k=10)
+
+    changed = list(rows)
+    changed[5] = changed[5][:3] + (99.0,) + changed[5][4:]  # preço
+    changed[40] = changed[40][:1] + ("Mountain Travel Diary",) + changed[40][2:]  # título
+    del changed[100]  # removido
+    changed.append((10_000, "A Brand New Book", rows[0][2], 20.0, 4, 1, "In stock", "", "new"))
+    snapshot = CatalogSnapshot(changed)
+
+    updated = index.update(snapshot)
+    assert updated.space is index.space  # atualização incremental
+    expected_ids, expected_scores = brute_force(snapshot, index.space, 10)
+    assert np.allclose(updated.scores, expected_scores)
+    assert (updated.neighbors == expected_ids).mean() > 0.99  # só empates trocam de ordem
+    assert updated.matches(snapshot)
+
+def test_new_category_rebuilds_index():
+    index = NeighborIndex.build(CatalogSnapshot(ROWS), k=3)
+    snapshot = CatalogSnapshot(ROWS + [(6, "Poems", "Poetry", 9.0, 3, 1, "In stock", "", "f")])
+    assert index.update(snapshot).space is not index.space
+
+def test_refresh_reuses_saved_index(tmp_path):
+    db_path = str(tmp_path / "books.db")
+    snapshot = CatalogSnapshot(ROWS)
+    built = refresh_neighbors(snapshot, db_path)
+    assert (tmp_path / "books.neighbors.npz").exists()
+
+    loaded = refresh_neighbors(snapshot, db_path)
+    assert loaded is not built and np.array_equal(loaded.neighbors, built.neighbors)
+    assert isinstance(loaded.space, FeatureSpace) and loaded.space.categories == ["Mystery", "Travel"]
+
+    changed = CatalogSnapshot([(1, "Murder at the Manor House", "Mystery", 44.0, 2, 0, "", "", "a")] + ROWS[1:])
+    assert refresh_neighbors(changed, db_path).similar(1, 1) == [3]
+    assert NeighborIndex.load(neighbors_path(db_path)).matches(changed)
+
+def test_get_neighbors_never_builds_in_the_request(tmp_path, monkeypatch):
+    monkeypatch.setattr(recommend, "_index", None)
+    db_path = str(tmp_path / "books.db")
+    first = CatalogSnapshot(ROWS, version=1)
+    assert recommend.load_neighbors(first, db_path).version == 1
+    assert recommend.get_neighbors(first) is recommend._index
+
+    # Nova versão: a requisição não espera o cálculo, que roda em segundo plano
+    second = CatalogSnapshot(ROWS[:4], version=2)
+    monkeypatch.setattr(database, "BOOKS_DB_PATH", db_path)
+    assert recommend.get_neighbors(second) is None
+    for _ in range(500):
+        index = recommend.get_neighbors(second)
+        if index is not None:
+            break
+        time.sleep(0.01)
+    assert index.version == 2 and index.similar(5) is None
+
+# ===============================
+# TESTES ENDPOINTS
+# ===============================
+def test_similar_endpoint():
+    with client:
+        book_id = int(get_catalog().ids[0])
+        r = client.get(f"/api/v1/books/{book_id}/similar", params={"limit": 3})
+        assert r.status_code == 200
+        books = r.json()
+        assert 0 < len(books) <= 3 and book_id not in [b["id"] for b in books]
+        assert client.get("/api/v1/books/999999999/similar").status_code == 404
+
+def test_similar_endpoint_while_index_is_rebuilt_and_with_missing_books(monkeypatch):
+    with client:
+        catalog = get_catalog()
+        book_id = int(catalog.ids[0])
+        stale = recommend._index
+        monkeypatch.setattr(recommend, "_index", None)
+        monkeypatch.setattr(recommend, "_rebuilding", True)  # reconstrução em andamento
+        r = client.get(f"/api/v1/books/{book_id}/similar")
+        assert r.status_code == 503 and r.headers["retry-after"]
+
+        # Vizinho que não existe mais no snapshot é ignorado, sem 500
+        monkeypatch.setattr(recommend, "_index", stale)
+        monkeypatch.setattr(stale, "similar", lambda book, limit: [999999999, int(catalog.ids[1])])
+        r = client.get(f"/api/v1/books/{book_id}/similar", params={"limit": 2})
+        assert r.status_code == 200 and [b["id"] for b in r.json()] == [int(catalog.ids[1])]
+
+def test_recommendations_endpoint():
+    with client:
+        ids = [int(i) for i in get_catalog().ids[:2]]
+        r = client.get("/api/v1/recommendations", params={"ids": ids, "limit": 5})
+        assert r.status_code == 200
+        assert not set(ids) & {b["id"] for b in r.json()}
+
+        r = client.get("/api/v1/recommendations", params={"limit": 2})
+        assert [b["id"] for b in r.json()] == [b["id"] for b in get_catalog().top_rated(2)]
+        assert client.get("/api/v1/recommendations", params={"ids": [999999999]}).status_code == 404
@@ -0,0 +1,131 @@
+import itertools
+import sqlite3
+import pytest
+from benchmarks.synthetic import generate_books
+from core.catalog import load_catalog
+from core.query import BookQuery, SORTS
+from core.schema import (
+    BOOK_COLUMNS, BOOKS_MIGRATIONS, USERS_MIGRATIONS, USERS_TABLE, full_scans, migrate, migrate_books,
+    migrate_users, schema_version
+)
+from core.stats import load_cells
+
+FILTERS = {"category": "Travel", "min_price": 10, "max_price": 40, "min_rating": 3, "max_rating": 4, "in_stock": True}
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    migrate_books(conn)
+    with conn:
+        conn.executemany("INSERT INTO books VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", generate_books(2000))
+    yield conn
+    conn.close()
+
+
+def names(conn, kind):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = ?", (kind,))}
+
+# ===============================
+# TESTES MIGRAÇÕES
+# ===============================
+def test_migrations_are_idempotent(tmp_path):
+    path = str(tmp_path / "books.db")
+    with sqlite3.connect(path) as conn:
+        assert migrate_books(conn) == len(BOOKS_MIGRATIONS)
+        schema = sorted(conn.execute("SELECT type, name, sql FROM sqlite_master"))
+        assert migrate_books(conn) == len(BOOKS_MIGRATIONS)
+        assert sorted(conn.execute("SELECT type, name, sql FROM sqlite_master")) == schema
+        assert schema_version(conn) == len(BOOKS_MIGRATIONS)
+
+    assert {"books", "crawl_state", "book_stats", "catalog_meta"} <= names(conn, "table")
+    assert {"idx_books_category", "idx_books_price", "idx_books_rating", "idx_books_top_rated"} <= names(conn, "index")
+    assert {"book_stats_insert", "book_stats_update", "book_stats_delete"} <= names(conn, "trigger")
+
+    with sqlite3.connect(str(tmp_path / "users.db")) as users:
+        assert migrate_users(users) == len(USERS_MIGRATIONS)
+        assert migrate_users(users) == len(USERS_MIGRATIONS)
+
+def test_legacy_init_db_schema_is_upgraded(tmp_path):
+    path = str(tmp_path / "books.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute('''
+            CREATE TABLE books (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, category TEXT NOT NULL,
+                price REAL NOT NULL, rating REAL NOT NULL
+            )
+        ''')
+        conn.executemany(
+            "INSERT INTO books (title, category, price, rating) VALUES (?, ?, ?, ?)",
+            [("Book A", "Fiction", 10.99, 4.5), ("Book B", "Travel", 15.50, 4.2)]
+        )
+    with sqlite3.connect(path) as conn:
+        migrate_books(conn)
+        assert [row[1] for row in conn.execute("PRAGMA table_info(books)")] == list(BOOK_COLUMNS)
+        assert conn.execute("SELECT id, title, rating FROM books ORDER BY id").fetchall() == [
+            (1, "Book A", 5), (2, "Book B", 4)
+        ]
+        assert sum(cell[3] for cell in load_cells(conn)) == 2  # resumo preenchido
+
+    snapshot = load_catalog(path)
+    assert len(snapshot) == 2 and snapshot.get(2)["rating"] == 4
+
+def test_unversioned_database_keeps_its_rows(conn):
+    # Banco criado antes do versionamento: tudo já existe, user_version = 0
+    conn.execute("PRAGMA user_version = 0")
+    migrate_books(conn)
+    assert conn.execute("SELECT COUNT(*) FROM books").fetchone()[0] == 2000
+    assert sum(cell[3] for cell in load_cells(conn)) == 2000
+
+def test_failed_migration_rolls_back(conn):
+    def broken(conn):
+        conn.execute("CREATE TABLE half_done (id INTEGER)")
+        raise sqlite3.OperationalError("falhou")
+
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(conn, BOOKS_MIGRATIONS + (("quebrada", broken),))
+    assert schema_version(conn) == len(BOOKS_MIGRATIONS)
+    assert "half_done" not in names(conn, "table")
+
+def test_newer_schema_is_rejected(conn):
+    conn.execute(f"PRAGMA user_version = {len(BOOKS_MIGRATIONS) + 1}")
+    with pytest.raises(RuntimeError):
+        migrate_books(conn)
+
+# ===============================
+# TESTES PLANOS DE CONSULTA
+# ===============================
+@pytest.mark.parametrize("sort", list(SORTS))
+def test_book_queries_use_indexes(conn, sort):
+    for size in range(3):
+        for keys in itertools.combinations(FILTERS, size):
+            for limit in (100, None):  # página de /books e exportação
+                query = BookQuery(sort=sort, limit=limit, **{key: FILTERS[key] for key in keys})
+                sql, params = query.to_sql()
+                scans = full_scans(conn, sql, params)
+                if sort.lstrip("-") == "id":
+                    # A tabela é a árvore da chave primária: percorrê-la na
+                    # ordem do id é o próprio índice, sem ordenação extra
+                    plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+                    assert not scans or "TEMP B-TREE" not in plan, (keys, plan)
+                else:
+                    assert scans == [], (keys, scans)
+
+def test_category_and_top_rated_queries_use_indexes(conn):
+    sql, params = BookQuery(category="Travel").to_sql()
+    plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+    assert "idx_books_category " in plan and "TEMP B-TREE" not in plan
+
+    top_rated = "SELECT id FROM books ORDER BY rating DESC, price DESC, id LIMIT ?"
+    plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + top_rated, (10,)))
+    assert "COVERING INDEX idx_books_top_rated" in plan and "TEMP B-TREE" not in plan
+
+def test_lookup_queries_use_indexes(conn):
+    conn.execute(USERS_TABLE)  # users.db é outro banco, com sua própria versão
+    for sql, params in (
+        ("SELECT username, password FROM users WHERE username = ?", ("admin",)),
+        ("SELECT etag, last_modified, content_hash, next_url FROM crawl_state WHERE url = ?", ("u",)),
+        ("SELECT id FROM books WHERE book_page_url = ?", ("u",)),
+        ("SELECT version, updated_at FROM catalog_meta WHERE id = 1", ()),
+    ):
+        assert full_scans(conn, sql, params) == [], sql
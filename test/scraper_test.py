@@ -0,0 +1,136 @@
+import sqlite3
+import threading
+import pytest
+from benchmarks.fixture_site import start_fixture_server
+from scripts import scrape_books
+from scripts.crawler import Crawler
+from scripts.parsers import available_parsers, get_parser
+from scripts.pipeline import BatchWriter, PipelineMetrics
+
+# ===============================
+# FIXTURES
+# ===============================
+@pytest.fixture(scope="module")
+def fixture_site():
+    """
+    Site local que imita books.toscrape.com, para testar o scraper offline.
+    """
+    server, base_url = start_fixture_server()
+    _servers[base_url] = server
+    yield base_url
+    server.shutdown()
+
+_servers = {}
+
+def server_pages(base_url):
+    return _servers[base_url].RequestHandlerClass.pages
+
+# ===============================
+# TESTES SCRAPER
+# ===============================
+def test_scrape_all_books_from_fixture_site(fixture_site):
+    with Crawler(max_workers=4, rate=0) as crawler:
+        books = scrape_books.scrape_all_books_by_category(fixture_site, crawler)
+    assert len(books) == 1000
+    assert len({b["book_page_url"] for b in books}) == 1000
+    first = next(b for b in books if b["book_page_url"].endswith("/its-only-the-himalayas_981/index.html"))
+    assert first["category"] == "Travel"
+    assert first["title"] == "It's Only the Himalayas"
+    assert first["price"] == 45.17
+    assert first["rating"] == 2
+
+def test_incremental_rescrape_only_writes_changed_books(fixture_site, tmp_path, monkeypatch):
+    monkeypatch.setattr(scrape_books, "DB_FILE", str(tmp_path / "books.db"))
+    with Crawler(max_workers=4, rate=0) as crawler:
+        assert scrape_books.run_scraping(fixture_site, crawler).rows_changed == 1000
+
+        # Altera o preço de um livro em uma única página do site
+        pages = server_pages(fixture_site)
+        path = "/catalogue/category/books/travel_2/index.html"
+        pages[path] = pages[path].replace("£45.17".encode(), "£40.00".encode())
+
+        metrics = scrape_books.run_scraping(fixture_site, crawler, incremental=True)
+        assert metrics.rows_changed == 1
+
+    conn = sqlite3.connect(tmp_path / "books.db")
+    price, = conn.execute("SELECT price FROM books WHERE title = ?", ("It's Only the Himalayas",)).fetchone()
+    total, = conn.execute("SELECT COUNT(*) FROM books").fetchone()
+    conn.close()
+    assert price == 40.0
+    assert total == 1000
+
+class CancelAfterPages(PipelineMetrics):
+    """
+    Métricas que cancelam a raspagem depois de `limit` páginas processadas.
+    """
+
+    def __init__(self, cancel_event, limit):
+        super().__init__()
+        self.cancel_event = cancel_event
+        self.limit = limit
+
+    def record_page(self, unchanged=False):
+        super().record_page(unchanged)
+        if self.pages >= self.limit:
+            self.cancel_event.set()
+
+def test_cancelled_crawl_is_fetched_again_on_next_run(fixture_site, tmp_path, monkeypatch):
+    db_file = str(tmp_path / "books.db")
+    monkeypatch.setattr(scrape_books, "DB_FILE", db_file)
+    with Crawler(max_workers=4, rate=0) as crawler:
+        cancel_event = threading.Event()
+        metrics = CancelAfterPages(cancel_event, limit=3)
+        scrape_books.run_scraping(fixture_site, crawler, metrics=metrics, cancel_event=cancel_event)
+        # O cancelamento pode chegar antes do primeiro lote ser gravado
+        assert metrics.rows_written < 1000
+
+        # Nada salvo: a execução seguinte processa de novo todas as páginas
+        assert scrape_books.CrawlState.load(db_file).pages() == []
+        metrics = scrape_books.run_scraping(fixture_site, crawler, incremental=True)
+        assert metrics.pages_unchanged == 0
+        assert metrics.rows_written == 1000
+
+    with sqlite3.connect(db_file) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM books").fetchone()[0] == 1000
+        assert conn.execute("SELECT COUNT(*) FROM crawl_state").fetchone()[0] == metrics.pages
+
+def test_after_commit_waits_for_the_pending_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(scrape_books, "DB_FILE", str(tmp_path / "books.db"))
+    scrape_books.init_books_db()
+    committed = []
+    with BatchWriter(scrape_books.DB_FILE, scrape_books.UPSERT_BOOK_SQL, batch_size=10) as batch_writer:
+        batch_writer.after_commit(lambda: committed.append("vazio"))
+        assert committed == ["vazio"]  # nada pendente: roda na hora
+
+        book = {"title": "Book", "category": "Travel", "price": 10.0, "rating": 3,
+                "is_in_stock": True, "availability_text": "In stock",
+                "image_url": "img", "book_page_url": "page"}
+        batch_writer.add(scrape_books._book_row(book))
+        batch_writer.after_commit(lambda: committed.append("lote"))
+        assert committed == ["vazio"]
+    assert committed == ["vazio", "lote"]
+
+def test_write_books_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(scrape_books, "DB_FILE", str(tmp_path / "books.db"))
+    scrape_books.init_books_db()
+    books = (
+        {"title": f"Book {i}", "category": "Travel", "price": 10.0 + i, "rating": 3,
+         "is_in_stock": True, "availability_text": "In stock",
+         "image_url": f"img_{i}", "book_page_url": f"page_{i}"}
+        for i in range(5)
+    )
+    metrics = scrape_books.write_books(books, batch_size=2)
+    assert metrics.batches == 3
+    assert metrics.rows_changed == 5
+    assert metrics.as_dict()["rows_per_sec"] > 0
+
+@pytest.mark.parametrize("name", available_parsers())
+def test_parser_backends_extract_the_same_books(name):
+    page_url = "https://books.toscrape.com/catalogue/category/books/mystery_3/index.html"
+    with open("benchmarks/fixtures/mystery_3_index.html", "rb") as f:
+        content = f.read()
+    expected = get_parser("html.parser").parse_category_page(content, "Mystery", page_url)
+    books, next_url = get_parser(name).parse_category_page(content, "Mystery", page_url)
+    assert (books, next_url) == expected
+    assert len(books) == 20
+    assert next_url.endswith("/mystery_3/page-2.html")
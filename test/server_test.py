@@ -0,0 +1,87 @@
+import gc
+import os
+import runpy
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+from api.main import app
+import core.database as database
+from core.catalog import CatalogVersionWatcher, bump_catalog_version, ensure_catalog_meta, get_catalog, published_version
+
+client = TestClient(app)
+
+# ===============================
+# TESTES HEALTH / READY
+# ===============================
+def test_health_is_always_up():
+    r = client.get("/api/v1/health")
+    assert r.status_code == 200 and r.json()["status"] == "ok"
+
+def test_ready_only_after_warm_up():
+    # Sem lifespan (warm_up não rodou) o worker ainda não está pronto
+    r = client.get("/api/v1/ready")
+    assert r.status_code == 503 and r.json()["status"] == "starting"
+
+    with TestClient(app) as started:
+        body = started.get("/api/v1/ready").json()
+        assert body["status"] == "ready"
+        assert body["catalog_version"] == get_catalog().version
+        # O warm_up deixa o JSON dos livros pronto antes do primeiro request
+        assert get_catalog()._encoded is not None
+
+    assert client.get("/api/v1/ready").status_code == 503
+
+# ===============================
+# TESTES VERSÃO PUBLICADA
+# ===============================
+def test_watcher_fires_once_per_new_version(tmp_path):
+    path = str(tmp_path / "books.db")
+    with sqlite3.connect(path) as conn:
+        ensure_catalog_meta(conn)
+    seen = []
+    watcher = CatalogVersionWatcher(seen.append, interval=60, db_path=path)
+    assert watcher.version == 1 and not watcher.check()
+
+    with sqlite3.connect(path) as conn:
+        bump_catalog_version(conn)
+    assert watcher.check() and seen == [2]
+    assert not watcher.check()
+
+def test_published_version_without_database(tmp_path):
+    assert published_version(str(tmp_path / "nao_existe.db")) is None
+    assert not os.path.exists(tmp_path / "nao_existe.db")
+
+# ===============================
+# TESTES CONFIGURAÇÃO DO GUNICORN
+# ===============================
+class FakeLog:
+    def __init__(self):
+        self.messages = []
+
+    def info(self, message):
+        self.messages.append(message)
+
+class FakeServer:
+    log = FakeLog()
+
+@pytest.fixture
+def gunicorn_conf(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    conf = runpy.run_path("gunicorn.conf.py")
+    yield conf
+    gc.unfreeze()
+
+def test_gunicorn_conf_preloads_one_worker_per_cpu(gunicorn_conf):
+    assert gunicorn_conf["preload_app"] is True
+    assert gunicorn_conf["workers"] == (os.cpu_count() or 1)
+    assert gunicorn_conf["worker_class"] == "uvicorn.workers.UvicornWorker"
+
+def test_reload_hook_rebuilds_catalog_and_closes_connections(gunicorn_conf):
+    before = get_catalog()
+    server = FakeServer()
+    gunicorn_conf["on_reload"](server)
+
+    assert get_catalog() is not before
+    assert database._read_pools == {} and database._writers == {}
+    assert gc.get_freeze_count() > 0
+    assert "trocando os workers" in server.log.messages[-1]